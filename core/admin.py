@@ -1,7 +1,7 @@
 # Register models
 
 from django.contrib import admin
-from .models import PatientRecord
+from .models import AnalysisJob, AnalysisResult, PatientRecord, ProviderResponse
 
 @admin.register(PatientRecord)
 class PatientRecordAdmin(admin.ModelAdmin):
@@ -44,7 +44,7 @@ class PatientRecordAdmin(admin.ModelAdmin):
         }),
         ('AI Diagnosis', {
             'fields': (
-                'ai_diagnosis', 'confidence_score', 'recommended_tests', 'treatment_plan'
+                'ai_diagnosis', 'confidence_score', 'recommended_tests', 'treatment_plan', 'analysis_status'
             )
         }),
         ('Metadata', {
@@ -59,3 +59,61 @@ class PatientRecordAdmin(admin.ModelAdmin):
         if not change:  # Only set created_by for new records
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    """Admin interface for queued report analyses."""
+    
+    list_display = [
+        'patient_record', 'status', 'attempts', 'worker', 'created_at', 'started_at', 'finished_at'
+    ]
+    
+    list_filter = [
+        'status', 'created_at'
+    ]
+    
+    readonly_fields = [
+        'payload', 'attempts', 'error', 'worker', 'created_at', 'started_at', 'finished_at'
+    ]
+
+@admin.register(AnalysisResult)
+class AnalysisResultAdmin(admin.ModelAdmin):
+    """Admin interface for stored report analyses."""
+    
+    list_display = [
+        'digest', 'modality', 'analyzer_version', 'size_bytes', 'hits', 'created_at', 'last_used_at'
+    ]
+    
+    list_filter = [
+        'modality', 'analyzer_version'
+    ]
+    
+    search_fields = [
+        'digest'
+    ]
+    
+    readonly_fields = [
+        'digest', 'modality', 'analyzer_version', 'result', 'size_bytes', 'hits', 'created_at', 'last_used_at'
+    ]
+
+
+@admin.register(ProviderResponse)
+class ProviderResponseAdmin(admin.ModelAdmin):
+    """Admin interface for cached AI provider responses."""
+    
+    list_display = [
+        'provider', 'model_id', 'prompt_version', 'payload_hash', 'size_bytes', 'hits', 'created_at', 'last_used_at'
+    ]
+    
+    list_filter = [
+        'provider', 'model_id', 'prompt_version'
+    ]
+    
+    search_fields = [
+        'payload_hash'
+    ]
+    
+    readonly_fields = [
+        'provider', 'model_id', 'prompt_version', 'payload_hash', 'response', 'size_bytes', 'hits',
+        'created_at', 'last_used_at'
+    ]
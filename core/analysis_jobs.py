@@ -0,0 +1,329 @@
+# Background analysis of uploaded ECG, X-ray and lab reports
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import wait
+from datetime import timedelta
+from functools import partial
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .ai_analysis import MedicalImageAnalyzer
+from .config import AIConfig
+from .executors import get_executor, run_releasing_connections
+from .models import AnalysisJob, PatientRecord
+from .provider_engine import run_provider_calls, run_provider_calls_sync
+
+logger = logging.getLogger(__name__)
+
+# Record fields written when a diagnosis is stored
+DIAGNOSIS_FIELDS = [
+    'ai_diagnosis', 'confidence_score', 'recommended_tests', 'treatment_plan', 'prescribed_medications',
+]
+
+
+def has_uploaded_reports(patient_record):
+    """Whether the record has any report files to analyze."""
+    return bool(patient_record.ecg_report or patient_record.xray_report or patient_record.lab_report)
+
+
+def _format_ecg(ecg_analysis):
+    lines = [f"ECG Analysis: Heart Rate - {ecg_analysis.get('heart_rate', 'Unknown')}, "
+             f"Rhythm - {ecg_analysis.get('rhythm', 'Unknown')}"]
+    if ecg_analysis.get('abnormalities'):
+        lines.append(f"ECG Abnormalities: {', '.join(ecg_analysis['abnormalities'])}")
+    return lines
+
+
+def _format_xray(xray_analysis):
+    lines = [f"X-ray Analysis: {', '.join(xray_analysis.get('findings', []))}"]
+    if xray_analysis.get('abnormalities'):
+        lines.append(f"X-ray Abnormalities: {', '.join(xray_analysis['abnormalities'])}")
+    return lines
+
+
+def _format_lab(report_analysis):
+    lines = []
+    if report_analysis.get('key_findings'):
+        lines.append(f"Lab Report Findings: {', '.join(report_analysis['key_findings'])}")
+    if report_analysis.get('abnormal_values'):
+        lines.append(f"Lab Abnormalities: {', '.join(report_analysis['abnormal_values'])}")
+    return lines
+
+
+# Report modalities in merge order: (name, record field, analyzer method, formatter,
+# confidence increment, failure label)
+MODALITIES = (
+    ('ecg', 'ecg_report', 'analyze_ecg_image', _format_ecg, 0.10, 'ECG'),
+    ('xray', 'xray_report', 'analyze_xray_image', _format_xray, 0.05, 'X-ray'),
+    ('lab', 'lab_report', 'analyze_medical_report', _format_lab, 0.05, 'Lab report'),
+)
+
+
+def _run_modality(function, report):
+    """Run one analyzer on an uploaded file; returns (analysis, error, seconds taken)."""
+    start = time.perf_counter()
+    try:
+        analysis, error = run_releasing_connections(function, report.path), None
+    except Exception as e:
+        analysis, error = None, e
+    return analysis, error, round(time.perf_counter() - start, 4)
+
+
+def _start_modalities(patient_record, analyzer):
+    """Submit the local analyzer of each uploaded report; returns the futures by modality."""
+    executor = get_executor('modality', AIConfig.ANALYSIS_MODALITY_WORKERS)
+    futures = {}
+    for name, field, method, formatter, increment, label in MODALITIES:
+        report = getattr(patient_record, field)
+        if report:
+            futures[name] = executor.submit(_run_modality, partial(getattr(analyzer, method), use_providers=False), report)
+    return futures
+
+
+def _provider_calls(patient_record, analyzer):
+    paths = {}
+    for name, field, method, formatter, increment, label in MODALITIES:
+        report = getattr(patient_record, field)
+        paths[name] = report.path if report else None
+    return analyzer.provider_calls(ecg_path=paths['ecg'], xray_path=paths['xray'], report_path=paths['lab'])
+
+
+def _merge_modalities(patient_record, futures, provider_results, diagnosis_result, ai_analysis_results, started):
+    """Merge finished local analyses, overlaid with their provider results, in modality order."""
+    timings = {}
+    for name, field, method, formatter, increment, label in MODALITIES:
+        future = futures.get(name)
+        if future is None:
+            continue
+        if not future.done():
+            future.cancel()
+            timings[name] = round(time.perf_counter() - started, 4)
+            ai_analysis_results.append(f"{label} analysis timed out")
+            continue
+        analysis, error, timings[name] = future.result()
+        if error is not None:
+            ai_analysis_results.append(f"{label} analysis failed")
+            continue
+        if analysis:
+            try:
+                if name in provider_results:
+                    analysis.update(provider_results[name])
+                ai_analysis_results.extend(formatter(analysis))
+            except Exception as e:
+                logger.error(f"Could not merge the {label} analysis of record {patient_record.pk}: {e}")
+                ai_analysis_results.append(f"{label} analysis failed")
+                continue
+            diagnosis_result['confidence'] += increment
+
+    logger.info(
+        f"Report analysis for record {patient_record.pk} took {time.perf_counter() - started:.3f}s: "
+        + ', '.join(f'{name}={seconds}s' for name, seconds in timings.items())
+    )
+    return timings
+
+
+def analyze_uploaded_reports(patient_record, diagnosis_result, ai_analysis_results, analyzer, deadline=None):
+    """Add the findings of the record's ECG, X-ray and lab reports to a diagnosis in progress.
+
+    The local analyzers and the external API calls all run concurrently
+    under one overall ``deadline`` (seconds, ANALYSIS_DEADLINE by default).
+    Findings are merged in ECG, X-ray, lab order whatever finishes first; a
+    modality that fails or misses the deadline adds a note instead, and one
+    whose API call fails or misses it keeps its local findings. Returns the
+    seconds each modality took.
+    """
+    deadline = AIConfig.ANALYSIS_DEADLINE if deadline is None else deadline
+    started = time.perf_counter()
+    ends_at = time.monotonic() + deadline
+    futures = _start_modalities(patient_record, analyzer)
+    if not futures:
+        return {}
+
+    provider_results = run_provider_calls_sync(_provider_calls(patient_record, analyzer), ends_at)
+    wait(futures.values(), timeout=max(0.0, ends_at - time.monotonic()))
+    return _merge_modalities(patient_record, futures, provider_results, diagnosis_result, ai_analysis_results, started)
+
+
+async def aanalyze_uploaded_reports(patient_record, diagnosis_result, ai_analysis_results, analyzer, deadline=None):
+    """Async version of ``analyze_uploaded_reports``, for async views to await."""
+    deadline = AIConfig.ANALYSIS_DEADLINE if deadline is None else deadline
+    started = time.perf_counter()
+    ends_at = time.monotonic() + deadline
+    futures = _start_modalities(patient_record, analyzer)
+    if not futures:
+        return {}
+
+    provider_results = await run_provider_calls(_provider_calls(patient_record, analyzer), ends_at)
+    await asyncio.wait(
+        [asyncio.wrap_future(future) for future in futures.values()],
+        timeout=max(0.0, ends_at - time.monotonic()),
+    )
+    return _merge_modalities(patient_record, futures, provider_results, diagnosis_result, ai_analysis_results, started)
+
+
+def finish_diagnosis(diagnosis_result, ai_analysis_results):
+    """Combine the analysis lines into the diagnosis and cap its confidence."""
+    # Combine AI analysis results
+    if ai_analysis_results:
+        diagnosis_result['ai_analysis'] = '\n'.join(ai_analysis_results)
+
+    # Ensure confidence doesn't exceed 1.0
+    diagnosis_result['confidence'] = min(diagnosis_result['confidence'], 1.0)
+
+    return diagnosis_result
+
+
+def apply_diagnosis(patient_record, diagnosis_result):
+    """Copy a finished diagnosis onto the record's diagnosis fields, without saving."""
+    patient_record.ai_diagnosis = diagnosis_result['diagnosis']
+    patient_record.confidence_score = diagnosis_result['confidence']
+    patient_record.recommended_tests = diagnosis_result['recommended_tests']
+    patient_record.treatment_plan = diagnosis_result['treatment_plan']
+
+    # Format and save medications
+    medications_text = ""
+    for med in diagnosis_result['medications']:
+        medications_text += f"• {med['name']} - {med['dosage']}\n"
+        medications_text += f"  Frequency: {med['frequency']}\n"
+        medications_text += f"  Duration: {med['duration']}\n\n"
+    patient_record.prescribed_medications = medications_text.strip()
+
+    # Add AI analysis results if files are uploaded
+    if diagnosis_result.get('ai_analysis'):
+        patient_record.ai_diagnosis += f"\n\nAI Analysis:\n{diagnosis_result['ai_analysis']}"
+
+
+def enqueue_analysis(patient_record, diagnosis_result, ai_analysis_results):
+    """Queue the reports of a saved record for analysis on top of its symptom and vitals diagnosis."""
+    return AnalysisJob.objects.create(
+        patient_record=patient_record,
+        payload={'diagnosis_result': diagnosis_result, 'analysis_lines': list(ai_analysis_results)},
+    )
+
+
+def claim_job(worker):
+    """Atomically claim the oldest available job for ``worker``, or return None."""
+    now = timezone.now()
+    candidates = AnalysisJob.objects.filter(status='pending', available_at__lte=now).values_list('pk', flat=True)[:10]
+    for pk in candidates:
+        # The status check makes the update a compare-and-swap, so each job has exactly one owner
+        claimed = AnalysisJob.objects.filter(pk=pk, status='pending').update(
+            status='running', worker=worker, started_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job = AnalysisJob.objects.select_related('patient_record').get(pk=pk)
+            PatientRecord.objects.filter(pk=job.patient_record_id).update(analysis_status='running')
+            return job
+    return None
+
+
+def run_job(job, analyzer):
+    """Analyze the reports of a claimed job and store the merged diagnosis on its record."""
+    patient_record = job.patient_record
+    try:
+        diagnosis_result = dict(job.payload['diagnosis_result'])
+        ai_analysis_results = list(job.payload['analysis_lines'])
+        timings = analyze_uploaded_reports(patient_record, diagnosis_result, ai_analysis_results, analyzer)
+        apply_diagnosis(patient_record, finish_diagnosis(diagnosis_result, ai_analysis_results))
+
+        # Plain updates: the record may have been deleted (and this job with it) meanwhile
+        with transaction.atomic():
+            if not _owned(job).update(
+                status='complete', error='', finished_at=timezone.now(), payload=dict(job.payload, timings=timings),
+            ):
+                logger.warning(f"Analysis job {job.pk} was reclaimed from {job.worker}; discarding its result")
+                return False
+            PatientRecord.objects.filter(pk=patient_record.pk).update(
+                analysis_status='complete',
+                updated_at=timezone.now(),
+                **{field: getattr(patient_record, field) for field in DIAGNOSIS_FIELDS},
+            )
+    except Exception as e:
+        # Includes failures to store the result, e.g. SQLite's "database is locked"
+        logger.exception(f"Analysis job {job.pk} failed")
+        _retry_or_fail(job, str(e))
+        return False
+    return True
+
+
+def _owned(job):
+    """The job's row while it is still running under the claim ``job`` was taken with.
+
+    Updates through it are compare-and-swaps, so a worker whose job was
+    requeued and claimed again cannot overwrite the new attempt.
+    """
+    return AnalysisJob.objects.filter(pk=job.pk, status='running', worker=job.worker, attempts=job.attempts)
+
+
+def _retry_or_fail(job, error):
+    now = timezone.now()
+    if job.attempts < AIConfig.ANALYSIS_JOB_MAX_ATTEMPTS:
+        status, available_at, finished_at = 'pending', now + timedelta(seconds=AIConfig.ANALYSIS_JOB_RETRY_DELAY * job.attempts), None
+    else:
+        status, available_at, finished_at = 'failed', job.available_at, now
+    with transaction.atomic():
+        if not _owned(job).update(status=status, error=error, available_at=available_at, finished_at=finished_at):
+            return False
+        PatientRecord.objects.filter(pk=job.patient_record_id).update(analysis_status=status)
+    return True
+
+
+def requeue_stale_jobs():
+    """Requeue, or fail, running jobs older than ANALYSIS_JOB_TIMEOUT; returns how many it did."""
+    cutoff = timezone.now() - timedelta(seconds=AIConfig.ANALYSIS_JOB_TIMEOUT)
+    requeued = 0
+    for job in AnalysisJob.objects.filter(status='running', started_at__lt=cutoff):
+        # Skipped if the job finished, or was requeued elsewhere, since it was read
+        if _retry_or_fail(job, f'Worker {job.worker} did not finish within {AIConfig.ANALYSIS_JOB_TIMEOUT} seconds'):
+            logger.warning(f"Analysis job {job.pk} on {job.worker} timed out")
+            requeued += 1
+    return requeued
+
+
+def work(worker, stop_event, poll_interval=1.0, once=False):
+    """Process jobs until ``stop_event`` is set (or, with ``once``, the queue is empty); returns the job count."""
+    analyzer = MedicalImageAnalyzer()
+    processed = 0
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            try:
+                job = claim_job(worker)
+            except Exception as e:
+                logger.error(f"{worker} could not claim a job: {e}")
+                stop_event.wait(poll_interval)
+                continue
+            if job is None:
+                if once:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+            try:
+                run_job(job, analyzer)
+            except Exception:
+                # Even recording the failure failed; the job is requeued once it goes stale
+                logger.exception(f"{worker} could not finish analysis job {job.pk}")
+            processed += 1
+    finally:
+        # Each worker thread has its own connection
+        connection.close()
+    return processed
+
+
+def start_workers(count, stop_event, poll_interval=1.0, once=False, name='worker'):
+    """Start ``count`` worker threads and return them."""
+    threads = [
+        threading.Thread(
+            target=work, args=(f'{name}-{index}', stop_event, poll_interval, once),
+            name=f'analysis-{name}-{index}', daemon=True,
+        )
+        for index in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
@@ -0,0 +1,101 @@
+# Seeded synthetic patient corpus for benchmarks
+
+import random
+from decimal import Decimal
+
+from ..knowledge_base import get_knowledge_base
+from ..models import PatientRecord
+from ..vitals import VITAL_RANGES
+
+OPENERS = (
+    'Patient reports {symptoms}',
+    'Complains of {symptoms}',
+    '{symptoms}',
+    'Presenting with {symptoms} since {duration}',
+    'History of {symptoms}, worse {timing}',
+)
+DURATIONS = ('yesterday', 'two days', 'last week', 'this morning', 'a month')
+TIMINGS = ('at night', 'after meals', 'on exertion', 'in the morning')
+FILLER = (
+    'mild', 'intermittent', 'constant', 'on and off', 'getting worse', 'no allergies',
+    'feels tired', 'poor appetite', 'otherwise well', 'no travel history',
+)
+
+# Mix name: (share of complex records, share of records repeating an earlier one)
+RECORD_MIXES = {
+    'routine': (0.1, 0.3),
+    'mixed': (0.3, 0.2),
+    'complex': (0.8, 0.05),
+}
+
+
+class CorpusGenerator:
+    """Generate reproducible symptom texts, vital signs and unsaved patient records.
+
+    Symptom phrases come from the loaded knowledge base, mixed with filler
+    and casing noise. The same seed and knowledge base always give the same
+    corpus.
+    """
+
+    def __init__(self, seed=0, knowledge_base=None):
+        self.seed = seed
+        self.random = random.Random(seed)
+        knowledge_base = knowledge_base or get_knowledge_base()
+        self.symptom_phrases = knowledge_base.symptom_matcher.phrases
+        self.rule_keywords = knowledge_base.rule_engine.matcher.phrases
+
+    def symptoms(self, complex_case=False):
+        """Return one free-text symptom description."""
+        rng = self.random
+        count = rng.randint(3, 8) if complex_case else rng.randint(1, 3)
+        vocabulary = self.symptom_phrases if rng.random() < 0.8 else self.rule_keywords
+        parts = [rng.choice(vocabulary) for _ in range(count)]
+        parts += rng.sample(FILLER, rng.randint(0, 3 if complex_case else 1))
+        rng.shuffle(parts)
+        text = ', '.join(parts[:-1]) + ' and ' + parts[-1] if len(parts) > 1 else parts[0]
+        text = rng.choice(OPENERS).format(
+            symptoms=text, duration=rng.choice(DURATIONS), timing=rng.choice(TIMINGS)
+        )
+        casing = rng.random()
+        if casing < 0.1:
+            return text.upper()
+        if casing < 0.4:
+            return text[0].upper() + text[1:]
+        return text
+
+    def vitals(self, complex_case=False):
+        """Return PatientRecord vital sign fields; each one is missing about 10% of the time."""
+        rng = self.random
+        spread = 2.0 if complex_case else 1.0
+
+        def maybe(value):
+            return None if rng.random() < 0.1 else value
+
+        return {
+            'temperature': maybe(Decimal(str(round(rng.gauss(36.9 + 0.6 * (spread - 1), 0.5 * spread), 1)))),
+            'systolic_bp': maybe(int(rng.gauss(125, 15 * spread))),
+            'diastolic_bp': maybe(int(rng.gauss(80, 9 * spread))),
+            'pulse_rate': maybe(int(rng.gauss(78, 12 * spread))),
+            'oxygen_saturation': maybe(min(100, int(rng.gauss(97, 1.5 * spread)))),
+            'respiratory_rate': maybe(int(rng.gauss(16, 2.5 * spread))),
+        }
+
+    def records(self, count, mix='mixed'):
+        """Return ``count`` unsaved PatientRecord instances following a record mix."""
+        complex_share, repeat_share = RECORD_MIXES[mix]
+        rng = self.random
+        records = []
+        for index in range(count):
+            if records and rng.random() < repeat_share:
+                source = rng.choice(records)
+                fields = {field: getattr(source, field) for field in ('symptoms', 'age', 'gender', *VITAL_RANGES)}
+            else:
+                complex_case = rng.random() < complex_share
+                fields = dict(
+                    self.vitals(complex_case),
+                    symptoms=self.symptoms(complex_case),
+                    age=rng.randint(1, 95),
+                    gender=rng.choice(('M', 'F', 'O')),
+                )
+            records.append(PatientRecord(patient_name=f'Benchmark {index}', **fields))
+        return records
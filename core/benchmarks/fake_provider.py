@@ -0,0 +1,208 @@
+# Local stand-in for the Hugging Face and OpenAI APIs, with injected latency and failures
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HUGGINGFACE_PATH = re.compile(r'^/models/(?P<model_id>.+)$')
+OPENAI_PATH = '/v1/chat/completions'
+
+# Statuses an injected failure picks from
+ERROR_STATUSES = (429, 500, 503)
+
+# Seconds to wait before the first byte: distribution name and its parameters
+LATENCY_DISTRIBUTIONS = {
+    'fixed': 1,  # seconds
+    'uniform': 2,  # low, high
+    'exponential': 1,  # mean
+    'lognormal': 2,  # median, sigma
+}
+
+DRIP_CHUNK_SIZE = 16
+
+
+def parse_latency(spec):
+    """Parse a latency spec such as 'fixed:0.2', 'uniform:0.1,0.5' or 'lognormal:0.3,0.6'.
+
+    Returns a function of a random.Random that draws one latency in seconds.
+    """
+    name, _, arguments = spec.partition(':')
+    if name not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f'Unknown latency distribution {name!r}; choose from {", ".join(LATENCY_DISTRIBUTIONS)}')
+    try:
+        values = [float(value) for value in arguments.split(',')] if arguments else []
+    except ValueError:
+        raise ValueError(f'Latency parameters must be numbers: {spec!r}')
+    if len(values) != LATENCY_DISTRIBUTIONS[name] or any(value < 0 for value in values):
+        raise ValueError(f'{name} latency takes {LATENCY_DISTRIBUTIONS[name]} non-negative number(s): {spec!r}')
+
+    if name == 'fixed':
+        return lambda rng: values[0]
+    if name == 'uniform':
+        low, high = sorted(values)
+        return lambda rng: rng.uniform(low, high)
+    if name == 'exponential':
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] else 0.0
+    median, sigma = values
+    return lambda rng: rng.lognormvariate(0, sigma) * median
+
+
+def huggingface_response(model_id, payload):
+    """A text generation response in the shape the Hugging Face client reads."""
+    inputs = payload.get('inputs')
+    text = inputs.get('text', '') if isinstance(inputs, dict) else ''
+    return {'generated_text': f'[{model_id}] No acute abnormality identified. ({text[:60]})'}
+
+
+def openai_response(payload):
+    """A chat completion whose message is the JSON findings the OpenAI client parses."""
+    content = json.dumps({
+        'key_findings': ['Findings reviewed by the fake provider'],
+        'abnormal_values': [],
+        'recommendations': ['Follow-up recommended'],
+    })
+    return {
+        'id': 'chatcmpl-fake',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': payload.get('model', 'fake'),
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        provider = self.server.provider
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        latency, status = provider.draw()
+        time.sleep(latency)
+
+        match = HUGGINGFACE_PATH.match(self.path)
+        if self.path != OPENAI_PATH and match is None:
+            status = 404
+        if status == 200:
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                payload, status = None, 400
+        if status == 200:
+            response = openai_response(payload) if match is None else huggingface_response(match['model_id'], payload)
+        else:
+            response = {'error': f'Injected failure {status}' if status in ERROR_STATUSES else 'Bad request'}
+        provider.count(status)
+        self._send(status, json.dumps(response).encode('utf-8'), provider.drip_seconds)
+
+    def _send(self, status, data, drip_seconds):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        try:
+            if not drip_seconds:
+                self.wfile.write(data)
+                return
+            # Slow-drip the body: small chunks spread over drip_seconds
+            chunks = [data[start:start + DRIP_CHUNK_SIZE] for start in range(0, len(data), DRIP_CHUNK_SIZE)]
+            pause = drip_seconds / len(chunks)
+            for chunk in chunks:
+                self.wfile.write(chunk)
+                self.wfile.flush()
+                time.sleep(pause)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up, e.g. at its deadline
+            pass
+
+
+class FakeProvider:
+    """A threaded HTTP server answering Hugging Face inference and OpenAI chat requests.
+
+    Each request waits a latency drawn from ``latency`` (a parse_latency
+    spec), fails with a status from ERROR_STATUSES with probability
+    ``error_rate``, and has its body sent over ``drip_seconds``.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency='fixed:0', error_rate=0.0, drip_seconds=0.0, seed=None):
+        if not 0 <= error_rate <= 1:
+            raise ValueError('error_rate must be between 0 and 1')
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.drip_seconds = drip_seconds
+        self.random = random.Random(seed)
+        self.statuses = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.provider = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def huggingface_url(self):
+        return f'{self.base_url}/models/'
+
+    @property
+    def openai_url(self):
+        return f'{self.base_url}{OPENAI_PATH}'
+
+    def draw(self):
+        """Draw one request's (latency, status)."""
+        with self._lock:
+            latency = self.latency(self.random)
+            failed = self.random.random() < self.error_rate
+            return latency, self.random.choice(ERROR_STATUSES) if failed else 200
+
+    def count(self, status):
+        with self._lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {'requests': sum(self.statuses.values()), 'statuses': dict(sorted(self.statuses.items()))}
+
+    def start(self):
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-provider', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def add_fake_provider_arguments(parser):
+    """Add the fake provider's behaviour options to a management command."""
+    parser.add_argument(
+        '--latency', default='lognormal:0.2,0.5',
+        help=f'Latency distribution and parameters, e.g. fixed:0.2, uniform:0.1,0.5, exponential:0.3 or '
+             f'lognormal:0.2,0.5 (median, sigma); one of {", ".join(LATENCY_DISTRIBUTIONS)}',
+    )
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing with 429/500/503')
+    parser.add_argument('--drip-seconds', type=float, default=0.0, help='Seconds over which each response body is sent')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the latency and failure draws')
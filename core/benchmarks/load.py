@@ -0,0 +1,224 @@
+# Load harness for the AI provider paths, run against a provider stand-in
+
+import contextlib
+import itertools
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from .. import views
+from ..ai_analysis import MedicalImageAnalyzer
+from ..config import AIConfig
+from ..http_client import client_metrics, reset_clients
+
+LOAD_USERNAME = 'provider-load'
+
+# Settings swapped while a load test runs
+STAND_IN_SETTINGS = (
+    'HUGGINGFACE_API_URL', 'OPENAI_API_URL', 'HUGGINGFACE_API_KEY', 'OPENAI_API_KEY',
+    'PROVIDER_CACHE_ENABLED', 'ANALYSIS_QUEUE_ENABLED',
+)
+
+LAB_REPORT = (
+    'COMPLETE BLOOD COUNT\n'
+    'Hemoglobin 10.2 g/dL 12.0-17.5 L\n'
+    'WBC 12.4 10^3/uL 4.0-11.0 H\n'
+    'Platelets 250 10^3/uL 150-450\n'
+    'Glucose 132 mg/dL 70-100 H\n'
+    'Impression: mild anemia, elevated glucose. Follow up with physician.\n'
+)
+
+
+def write_sample_reports(directory, seed=0):
+    """Write a synthetic ECG strip, chest X-ray and lab report; returns their paths by modality."""
+    rng = np.random.default_rng(seed)
+
+    # A regular trace with a QRS spike every 120 pixels, on a light grid
+    ecg = np.full((300, 1200), 235, dtype=np.uint8)
+    ecg[::20, :] = 200
+    ecg[:, ::20] = 200
+    trace = np.full(1200, 200.0)
+    spike = np.array([30, 110, 150, 110, 30])
+    for beat in range(40, 1200 - len(spike), 120):
+        trace[beat:beat + len(spike)] -= spike
+    points = np.stack([np.arange(1200), trace], axis=1).astype(np.int32)
+    cv2.polylines(ecg, [points], False, 0, 2)
+
+    # Soft tissue gradient with two brighter lung-field ellipses and noise
+    xray = np.tile(np.linspace(40, 120, 768, dtype=np.float64), (768, 1))
+    cv2.ellipse(xray, (260, 380), (140, 250), 0, 0, 360, 170, -1)
+    cv2.ellipse(xray, (508, 380), (140, 250), 0, 0, 360, 170, -1)
+    xray = np.clip(xray + rng.normal(0, 12, xray.shape), 0, 255).astype(np.uint8)
+
+    paths = {
+        'ecg': os.path.join(directory, 'load-ecg.png'),
+        'xray': os.path.join(directory, 'load-xray.png'),
+        'lab': os.path.join(directory, 'load-lab.txt'),
+    }
+    cv2.imwrite(paths['ecg'], ecg)
+    cv2.imwrite(paths['xray'], xray)
+    with open(paths['lab'], 'w', encoding='utf-8') as f:
+        f.write(LAB_REPORT)
+    return paths
+
+
+@contextlib.contextmanager
+def provider_stand_in(huggingface_url, openai_url, response_cache=False):
+    """Point the provider clients and the dashboard's analyzer at a stand-in for the duration.
+
+    Keys are set if none are configured, the provider response cache is off
+    unless ``response_cache``, and reports are analyzed inside the dashboard
+    request rather than queued, so every request reaches the providers.
+    """
+    saved = {name: getattr(AIConfig, name) for name in STAND_IN_SETTINGS}
+    AIConfig.HUGGINGFACE_API_URL = huggingface_url
+    AIConfig.OPENAI_API_URL = openai_url
+    AIConfig.HUGGINGFACE_API_KEY = saved['HUGGINGFACE_API_KEY'] or 'load-test'
+    AIConfig.OPENAI_API_KEY = saved['OPENAI_API_KEY'] or 'load-test'
+    AIConfig.PROVIDER_CACHE_ENABLED = response_cache
+    AIConfig.ANALYSIS_QUEUE_ENABLED = False
+    previous_analyzer = views.ai_analyzer
+    views.ai_analyzer = MedicalImageAnalyzer()
+    reset_clients()
+    try:
+        yield views.ai_analyzer
+    finally:
+        reset_clients()
+        views.ai_analyzer = previous_analyzer
+        for name, value in saved.items():
+            setattr(AIConfig, name, value)
+
+
+@contextlib.contextmanager
+def scratch_environment():
+    """A throwaway test database and media directory, so load tests leave no records or uploads behind."""
+    with tempfile.TemporaryDirectory(prefix='provider-load-') as directory:
+        setup_test_environment()
+        # A file rather than an in-memory database, so concurrent threads share it with normal locking
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directory, 'load.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(MEDIA_ROOT=os.path.join(directory, 'media')):
+                yield directory
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+def _analyzer_request(analyzer, paths):
+    methods = (
+        (analyzer.analyze_ecg_image, paths['ecg']),
+        (analyzer.analyze_xray_image, paths['xray']),
+        (analyzer.analyze_medical_report, paths['lab']),
+    )
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def request():
+        # Each request is one analyzer call, cycling through the modalities
+        with lock:
+            method, path = methods[next(counter) % len(methods)]
+        method(path)
+        return True
+    return request
+
+
+def _dashboard_request(paths):
+    user = User.objects.create_user(LOAD_USERNAME, password=None)
+    uploads = {}
+    for name, field in (('ecg', 'ecg_report'), ('xray', 'xray_report'), ('lab', 'lab_report')):
+        with open(paths[name], 'rb') as f:
+            uploads[field] = (os.path.basename(paths[name]), f.read())
+    local = threading.local()
+    url = reverse('core:dashboard')
+
+    def request():
+        # Test clients are not thread-safe, so each thread logs in its own
+        if not hasattr(local, 'client'):
+            local.client = Client()
+            local.client.force_login(user)
+        data = {
+            'patient_name': 'Load Test', 'age': 54, 'gender': 'M', 'temperature': 38.2,
+            'systolic_bp': 142, 'diastolic_bp': 91, 'pulse_rate': 96,
+            'symptoms': 'fever, cough and shortness of breath for three days',
+        }
+        for field, (name, content) in uploads.items():
+            data[field] = SimpleUploadedFile(name, content)
+        response = local.client.post(url, data)
+        # A saved record redirects to its prescription page
+        return response.status_code == 302
+    return request
+
+
+def run_load(request, requests, concurrency=8, warmup=5):
+    """Send ``requests`` calls of ``request`` from ``concurrency`` threads and return their latency summary."""
+    def timed():
+        start = time.perf_counter_ns()
+        try:
+            succeeded = request()
+        except Exception:
+            succeeded = False
+        duration = time.perf_counter_ns() - start
+        # Pool threads outlive requests, so release their database connections here
+        connections.close_all()
+        return duration, succeeded
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: timed(), range(warmup)))
+        started = time.perf_counter()
+        results = list(executor.map(lambda _: timed(), range(requests)))
+        elapsed = time.perf_counter() - started
+
+    timings = np.array([duration for duration, succeeded in results], dtype=np.float64) / 1e6
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99]) if len(timings) else (0.0, 0.0, 0.0)
+    return {
+        'requests': len(results),
+        'errors': sum(1 for duration, succeeded in results if not succeeded),
+        'concurrency': concurrency,
+        'p50_ms': round(float(p50), 1),
+        'p95_ms': round(float(p95), 1),
+        'p99_ms': round(float(p99), 1),
+        'max_ms': round(float(timings.max()) if len(timings) else 0.0, 1),
+        'throughput_per_s': round(len(results) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+SCENARIOS = {
+    'analyzer': 'MedicalImageAnalyzer ECG, X-ray and lab report calls, one per request',
+    'dashboard': 'Dashboard POST with ECG, X-ray and lab uploads, analyzed in the request',
+}
+
+
+def run_provider_load(huggingface_url, openai_url, scenarios=None, requests=200, concurrency=8, warmup=5,
+                      response_cache=False, seed=0):
+    """Run the named scenarios (all by default) against a provider stand-in and return a report.
+
+    Each scenario starts with fresh provider clients; its report includes
+    their counters (retries, failures, short circuits, deadline hits).
+    """
+    report = {'scenarios': {}}
+    with scratch_environment() as directory:
+        paths = write_sample_reports(directory, seed=seed)
+        for name in scenarios or list(SCENARIOS):
+            with provider_stand_in(huggingface_url, openai_url, response_cache=response_cache) as analyzer:
+                request = _analyzer_request(analyzer, paths) if name == 'analyzer' else _dashboard_request(paths)
+                result = run_load(request, requests, concurrency=concurrency, warmup=warmup)
+                result['description'] = SCENARIOS[name]
+                result['providers'] = client_metrics()
+                for metrics in result['providers'].values():
+                    metrics.pop('pools', None)
+                report['scenarios'][name] = result
+    return report
@@ -0,0 +1,194 @@
+# Scenario runners, reports and baseline comparison for the diagnosis benchmarks
+
+import contextlib
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from .. import views
+from ..ai_analysis import free_vitals
+from ..diagnosis_cache import DiagnosisCache
+from ..knowledge_base import get_knowledge_base
+from ..vitals import record_vitals
+
+# Metrics checked against a baseline; throughput regresses when it drops, the others when they grow
+DEFAULT_GATED_METRICS = ('p50_ms', 'p95_ms', 'throughput_per_s', 'peak_memory_kib')
+BATCH_SIZE = 256
+
+
+class Scenario:
+    """A benchmarked pipeline stage.
+
+    ``prepare`` turns the corpus into call inputs outside the timed region,
+    ``run`` is timed once per input and ``context`` wraps both the timing
+    and the memory pass (e.g. to swap in a cold cache).
+    """
+
+    def __init__(self, name, description, prepare, run, context=contextlib.nullcontext):
+        self.name = name
+        self.description = description
+        self.prepare = prepare
+        self.run = run
+        self.context = context
+
+
+@contextlib.contextmanager
+def _diagnosis_cache(cache):
+    previous = views.diagnosis_cache
+    views.diagnosis_cache = cache
+    try:
+        yield
+    finally:
+        views.diagnosis_cache = previous
+
+
+def _conditions(records):
+    analyzer = views.ai_analyzer
+    return [analyzer._analyze_symptoms_free(record.symptoms.lower())['possible_conditions'] for record in records]
+
+
+def _batches(records):
+    return [
+        (
+            [record.symptoms.lower() for record in records[start:start + BATCH_SIZE]],
+            [free_vitals(record_vitals(record)) for record in records[start:start + BATCH_SIZE]],
+        )
+        for start in range(0, len(records), BATCH_SIZE)
+    ]
+
+
+SCENARIOS = {
+    scenario.name: scenario for scenario in (
+        Scenario(
+            'symptoms', 'MedicalImageAnalyzer._analyze_symptoms_free',
+            lambda records: [record.symptoms.lower() for record in records],
+            lambda symptoms: views.ai_analyzer._analyze_symptoms_free(symptoms),
+        ),
+        Scenario(
+            'medications', 'MedicalImageAnalyzer._get_medication_recommendations_free',
+            _conditions,
+            lambda conditions: views.ai_analyzer._get_medication_recommendations_free(conditions),
+        ),
+        Scenario(
+            'free_diagnosis', 'MedicalImageAnalyzer.get_free_diagnosis',
+            lambda records: [(record.symptoms.lower(), free_vitals(record_vitals(record))) for record in records],
+            lambda item: views.ai_analyzer.get_free_diagnosis(*item),
+        ),
+        Scenario(
+            'free_diagnosis_batch', f'MedicalImageAnalyzer.get_free_diagnosis_batch, {BATCH_SIZE} records per call',
+            _batches,
+            lambda batch: views.ai_analyzer.get_free_diagnosis_batch(*batch),
+        ),
+        Scenario(
+            'perform_ai_diagnosis', 'perform_ai_diagnosis with the diagnosis cache disabled',
+            list,
+            lambda record: views.perform_ai_diagnosis(record),
+            context=lambda: _diagnosis_cache(DiagnosisCache(max_entries=0)),
+        ),
+        Scenario(
+            'perform_ai_diagnosis_cached', 'perform_ai_diagnosis starting from an empty diagnosis cache',
+            list,
+            lambda record: views.perform_ai_diagnosis(record),
+            context=lambda: _diagnosis_cache(DiagnosisCache()),
+        ),
+    )
+}
+
+
+def run_scenario(scenario, records, warmup=50, repeat=1):
+    """Time one scenario over the corpus and measure its peak traced memory."""
+    inputs = scenario.prepare(records)
+    runs = [item for _ in range(repeat) for item in inputs]
+    # Every scenario covers the whole corpus once per repeat
+    record_count = len(records) * repeat
+
+    with scenario.context():
+        for item in inputs[:warmup]:
+            scenario.run(item)
+        timings = np.empty(len(runs), dtype=np.float64)
+        started = time.perf_counter()
+        for index, item in enumerate(runs):
+            start = time.perf_counter_ns()
+            scenario.run(item)
+            timings[index] = time.perf_counter_ns() - start
+        elapsed = time.perf_counter() - started
+
+    # Memory is measured in a separate pass since tracing slows every allocation down
+    with scenario.context():
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        for item in inputs:
+            scenario.run(item)
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+
+    timings /= 1e6
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99]) if len(timings) else (0.0, 0.0, 0.0)
+    return {
+        'description': scenario.description,
+        'calls': len(runs),
+        'records': record_count,
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(timings.mean()) if len(timings) else 0.0, 4),
+        'throughput_per_s': round(record_count / elapsed, 1) if elapsed else 0.0,
+        'peak_memory_kib': round((peak - baseline) / 1024, 1),
+    }
+
+
+def run_benchmarks(records, scenarios=None, warmup=50, repeat=1, meta=None):
+    """Run the named scenarios (all by default) and return a JSON-serializable report."""
+    names = scenarios or list(SCENARIOS)
+    knowledge_base = get_knowledge_base()
+    report = {
+        'meta': dict(
+            meta or {},
+            knowledge_base=knowledge_base.version,
+            python=platform.python_version(),
+            machine=platform.machine(),
+            numpy=np.__version__,
+        ),
+        'scenarios': {},
+    }
+    for name in names:
+        report['scenarios'][name] = run_scenario(SCENARIOS[name], records, warmup=warmup, repeat=repeat)
+    return report
+
+
+def compare_reports(report, baseline, threshold=0.2, metrics=DEFAULT_GATED_METRICS):
+    """Return a description of every gated metric that regressed by more than ``threshold`` (a fraction)."""
+    regressions = []
+    for name, result in report['scenarios'].items():
+        reference = baseline.get('scenarios', {}).get(name)
+        if reference is None:
+            continue
+        for metric in metrics:
+            current, previous = result.get(metric), reference.get(metric)
+            if not current or not previous:
+                continue
+            if metric == 'throughput_per_s':
+                change = previous / current - 1
+            else:
+                change = current / previous - 1
+            if change > threshold:
+                regressions.append(f'{name}.{metric}: {previous} -> {current} ({change:+.0%})')
+    return regressions
+
+
+def load_report(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
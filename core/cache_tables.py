@@ -0,0 +1,64 @@
+# Lookup, storage and eviction shared by the database-backed caches
+#
+# Each cache table has ``size_bytes``, ``hits`` and ``last_used_at`` columns
+# (AnalysisResult, ProviderResponse).
+
+import json
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Primary keys per DELETE, to stay under the SQLite bound variable limit
+DELETE_CHUNK_SIZE = 500
+
+
+def use_entry(entries, field):
+    """Return ``field`` of the first of ``entries`` and count the hit, or None when there is none."""
+    entry = entries.only('pk', field).first()
+    if entry is None:
+        return None
+    entries.model.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    return getattr(entry, field)
+
+
+def entry_size(value):
+    """Serialized size of a cached JSON value, for eviction; raises TypeError or ValueError if it does not serialize."""
+    return len(json.dumps(value, default=str))
+
+
+def insert_entry(model, key, fields):
+    """Insert an entry for ``key``; returns False when an entry already holds the key."""
+    try:
+        # A single INSERT statement, so SQLite writers wait on each other instead of deadlocking
+        with transaction.atomic():
+            model.objects.create(**key, **fields)
+    except IntegrityError:
+        return False
+    return True
+
+
+def evict_entries(entries, stale=(), max_bytes=0, dry_run=False):
+    """Evict cache entries and return how many were (or, with ``dry_run``, would be) deleted.
+
+    Every entry of the ``stale`` querysets is evicted, then the least
+    recently used of ``entries`` beyond a total of ``max_bytes`` (0 is
+    unbounded).
+    """
+    evicted = set()
+    for queryset in stale:
+        evicted.update(queryset.values_list('pk', flat=True))
+    if max_bytes:
+        total = 0
+        for pk, size in entries.order_by('-last_used_at', '-pk').values_list('pk', 'size_bytes'):
+            if pk in evicted:
+                continue
+            total += size
+            if total > max_bytes:
+                evicted.add(pk)
+
+    if evicted and not dry_run:
+        evicted = list(evicted)
+        for start in range(0, len(evicted), DELETE_CHUNK_SIZE):
+            entries.model.objects.filter(pk__in=evicted[start:start + DELETE_CHUNK_SIZE]).delete()
+    return len(evicted)
@@ -12,14 +12,79 @@ class AIConfig:
     # Model configurations
     ECG_MODEL_PATH = os.path.join(settings.BASE_DIR, 'core', 'ai_models', 'ecg_model.h5')
     XRAY_MODEL_PATH = os.path.join(settings.BASE_DIR, 'core', 'ai_models', 'xray_model.h5')
+    SYMPTOM_CLASSIFIER_PATH = os.path.join(settings.BASE_DIR, 'core', 'ai_models', 'symptom_classifier.pkl')
+    # Comma-separated models to load at startup instead of on first use ('all' for every model)
+    MODEL_WARM_UP = os.getenv('MODEL_WARM_UP', '')
+    
+    # Medical knowledge base (symptoms, medications, diagnosis rules)
+    KNOWLEDGE_BASE_PATH = os.getenv(
+        'KNOWLEDGE_BASE_PATH',
+        os.path.join(settings.BASE_DIR, 'core', 'knowledge', 'medical_knowledge_base.json'),
+    )
+    KNOWLEDGE_BASE_RELOAD_INTERVAL = float(os.getenv('KNOWLEDGE_BASE_RELOAD_INTERVAL', '5'))  # seconds
+    
+    # Diagnosis result cache (per process, plus an optional Django cache alias shared across workers)
+    DIAGNOSIS_CACHE_SIZE = int(os.getenv('DIAGNOSIS_CACHE_SIZE', '1024'))  # entries, 0 disables
+    DIAGNOSIS_CACHE_TTL = int(os.getenv('DIAGNOSIS_CACHE_TTL', '3600'))  # seconds
+    DIAGNOSIS_CACHE_ALIAS = os.getenv('DIAGNOSIS_CACHE_ALIAS', '')
+    
+    # Background analysis of uploaded reports (run `manage.py run_analysis_workers`)
+    ANALYSIS_QUEUE_ENABLED = os.getenv('ANALYSIS_QUEUE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv('ANALYSIS_JOB_MAX_ATTEMPTS', '3'))
+    ANALYSIS_JOB_RETRY_DELAY = int(os.getenv('ANALYSIS_JOB_RETRY_DELAY', '30'))  # seconds, times the attempt number
+    ANALYSIS_JOB_TIMEOUT = int(os.getenv('ANALYSIS_JOB_TIMEOUT', '600'))  # seconds before a running job is requeued
+    
+    # Concurrent ECG, X-ray and lab analysis of one record
+    ANALYSIS_MODALITY_WORKERS = int(os.getenv('ANALYSIS_MODALITY_WORKERS', '6'))  # threads per process
+    ANALYSIS_DEADLINE = float(os.getenv('ANALYSIS_DEADLINE', '90'))  # seconds for all modalities and their API calls together
+    
+    # Lab report text extraction
+    REPORT_MAX_CHARS = int(os.getenv('REPORT_MAX_CHARS', '1000000'))  # longer reports are truncated
+    REPORT_TEXT_CACHE_DIR = os.getenv('REPORT_TEXT_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'report_text'))  # '' disables
+    REPORT_TEXT_CACHE_MAX_AGE_DAYS = int(os.getenv('REPORT_TEXT_CACHE_MAX_AGE_DAYS', '30'))  # since last use, 0 keeps forever
+    REPORT_TEXT_CACHE_MAX_BYTES = int(os.getenv('REPORT_TEXT_CACHE_MAX_BYTES', str(100 * 1024 * 1024)))  # 0 is unbounded
+    
+    # Stored analyzer results for report files, keyed by content hash (`manage.py prune_analysis_results`)
+    ANALYSIS_RESULT_STORE_ENABLED = os.getenv('ANALYSIS_RESULT_STORE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    ANALYSIS_RESULT_MAX_AGE_DAYS = int(os.getenv('ANALYSIS_RESULT_MAX_AGE_DAYS', '30'))  # since last use, 0 keeps forever
+    ANALYSIS_RESULT_MAX_BYTES = int(os.getenv('ANALYSIS_RESULT_MAX_BYTES', str(50 * 1024 * 1024)))  # 0 is unbounded
+    
+    # Outgoing calls to the Hugging Face and OpenAI APIs (one pooled client per provider)
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))  # keep-alive connections per provider
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05'))  # seconds
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))  # seconds between bytes of the response
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))  # retries after the first attempt
+    HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.5'))  # seconds, doubled per retry, fully jittered
+    HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '8'))  # seconds, also caps Retry-After
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))  # failed calls in a row that open the circuit
+    CIRCUIT_RESET_SECONDS = float(os.getenv('CIRCUIT_RESET_SECONDS', '30'))  # seconds before a trial call is let through
+    PROVIDER_CALL_WORKERS = int(os.getenv('PROVIDER_CALL_WORKERS', '8'))  # threads per process sending concurrent API calls
+    PROVIDER_IMAGE_SIZE = int(os.getenv('PROVIDER_IMAGE_SIZE', '512'))  # pixels, long side of images sent to remote models
+    PROVIDER_IMAGE_CODEC = os.getenv('PROVIDER_IMAGE_CODEC', 'jpeg')  # jpeg, webp or png
+    PROVIDER_IMAGE_QUALITY = int(os.getenv('PROVIDER_IMAGE_QUALITY', '85'))  # 0-100, ignored by png
+    PROVIDER_CACHE_ENABLED = os.getenv('PROVIDER_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    PROVIDER_CACHE_TTL = int(os.getenv('PROVIDER_CACHE_TTL', str(7 * 24 * 3600)))  # seconds, 0 never expires
+    PROVIDER_CACHE_MAX_BYTES = int(os.getenv('PROVIDER_CACHE_MAX_BYTES', str(20 * 1024 * 1024)))  # 0 is unbounded
+    
+    # Browser cache lifetime of health advice GET responses
+    HEALTH_ADVICE_CACHE_SECONDS = int(os.getenv('HEALTH_ADVICE_CACHE_SECONDS', '300'))
     
     # Analysis settings
-    MAX_IMAGE_SIZE = 1024  # pixels
+    MAX_IMAGE_SIZE = 1024  # pixels, long side of the grayscale image the analyzers see
+    IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', '100000000'))  # larger uploads are rejected unread
+    PDF_RENDER_DPI = int(os.getenv('PDF_RENDER_DPI', '150'))  # PDF reports are rendered at this resolution, up to MAX_IMAGE_SIZE
+    PDF_PAGE = int(os.getenv('PDF_PAGE', '0'))  # zero-based page of a PDF report that is analyzed
+    ECG_STRIP_SECONDS = float(os.getenv('ECG_STRIP_SECONDS', '10'))  # time spanned by an ECG image's width
+    XRAY_TILE_PIXELS = int(os.getenv('XRAY_TILE_PIXELS', str(4 * 1024 * 1024)))  # larger X-rays are analyzed in row bands
+    XRAY_TILE_WORKERS = int(os.getenv('XRAY_TILE_WORKERS', '1'))  # threads per tiled X-ray
+    IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'images'))  # '' disables
+    IMAGE_CACHE_MAX_AGE_DAYS = int(os.getenv('IMAGE_CACHE_MAX_AGE_DAYS', '30'))  # since last use, 0 keeps forever
+    IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(500 * 1024 * 1024)))  # 0 is unbounded
     CONFIDENCE_THRESHOLD = 0.6
     
-    # API endpoints
-    HUGGINGFACE_API_URL = "https://api-inference.huggingface.co/models/"
-    OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
+    # API endpoints (point both at `manage.py run_fake_provider` for load tests)
+    HUGGINGFACE_API_URL = os.getenv('HUGGINGFACE_API_URL', "https://api-inference.huggingface.co/models/")  # model ID is appended
+    OPENAI_API_URL = os.getenv('OPENAI_API_URL', "https://api.openai.com/v1/chat/completions")
     
     @classmethod
     def is_configured(cls):
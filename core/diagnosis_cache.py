@@ -0,0 +1,159 @@
+# Memoized symptom/vitals diagnosis results
+
+import hashlib
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from .config import AIConfig
+from .vitals import VITAL_RANGES
+
+logger = logging.getLogger(__name__)
+
+# Values on the same side of every reference range bound always produce the
+# same diagnosis, so they share a cache bucket.
+VITAL_BUCKET_EDGES = {
+    vital: tuple(bound for bound in (low, high) if bound is not None)
+    for vital, (low, high, _) in VITAL_RANGES.items()
+}
+
+
+def vitals_bucket(patient_record):
+    """Return the bucket of each vital sign: None when unrecorded, else its position among the edges."""
+    bucket = []
+    for field, edges in VITAL_BUCKET_EDGES.items():
+        value = getattr(patient_record, field, None)
+        # Diagnosis treats 0/None as unrecorded
+        bucket.append((bisect_left(edges, value), bisect_right(edges, value)) if value else None)
+    return tuple(bucket)
+
+
+def diagnosis_cache_key(knowledge_base, symptoms, patient_record):
+    """Build the cache key for a symptom text and the vitals of a record.
+
+    Symptoms are canonicalized to the sorted set of knowledge base phrases
+    they contain. That is case-, order-, stopword- and filler-insensitive
+    like a sorted token list, but never merges texts the matcher tells apart
+    (e.g. "chest pain" and "pain in chest").
+    """
+    return (
+        knowledge_base.checksum,
+        tuple(sorted(knowledge_base.diagnosis_matcher.match_ids(symptoms))),
+        vitals_bucket(patient_record),
+    )
+
+
+def _copy_diagnosis(value):
+    """Copy a (diagnosis_result, analysis lines) pair; only its lists and dicts are mutable."""
+    diagnosis_result, analysis_lines = value
+    diagnosis_result = dict(diagnosis_result, medications=[dict(med) for med in diagnosis_result['medications']])
+    return diagnosis_result, list(analysis_lines)
+
+
+class DiagnosisCache:
+    """Bounded LRU cache with TTL, backed by an optional shared Django cache.
+
+    Keys start with the knowledge base checksum; the process tier is
+    emptied when a new checksum shows up. Values are (diagnosis_result,
+    analysis lines) pairs, copied on the way out so callers can keep
+    mutating what they receive.
+    """
+
+    def __init__(self, max_entries=None, ttl=None, shared_alias=None):
+        self.max_entries = AIConfig.DIAGNOSIS_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = AIConfig.DIAGNOSIS_CACHE_TTL if ttl is None else ttl
+        self.shared_alias = AIConfig.DIAGNOSIS_CACHE_ALIAS if shared_alias is None else shared_alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._counters = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for ``key``, computing and storing it on a miss."""
+        if self.max_entries <= 0:
+            return compute()
+
+        value = self._get_local(key)
+        if value is None:
+            value = self._get_shared(key)
+            if value is None:
+                self._count('misses')
+                value = compute()
+                self._set_shared(key, value)
+            else:
+                self._count('shared_hits')
+            self._set_local(key, value)
+        else:
+            self._count('hits')
+        return _copy_diagnosis(value)
+
+    def _get_local(self, key):
+        with self._lock:
+            # Entries from an older knowledge base can never be hit again
+            if key[0] != self._generation:
+                self._generation = key[0]
+                self._entries.clear()
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self._counters['expirations'] += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def _shared_cache(self):
+        if not self.shared_alias:
+            return None
+        from django.core.cache import caches
+        return caches[self.shared_alias]
+
+    def _shared_key(self, key):
+        return 'diagnosis:' + hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def _get_shared(self, key):
+        try:
+            cache = self._shared_cache()
+            return cache.get(self._shared_key(key)) if cache is not None else None
+        except Exception as e:
+            logger.error(f"Shared diagnosis cache unavailable: {e}")
+            return None
+
+    def _set_shared(self, key, value):
+        try:
+            cache = self._shared_cache()
+            if cache is not None:
+                cache.set(self._shared_key(key), value, timeout=self.ttl)
+        except Exception as e:
+            logger.error(f"Shared diagnosis cache unavailable: {e}")
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def clear(self):
+        """Drop every entry held by this process."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current size."""
+        with self._lock:
+            return dict(self._counters, size=len(self._entries), max_entries=self.max_entries)
+
+
+# Process-wide cache used by the dashboard diagnosis
+diagnosis_cache = DiagnosisCache()
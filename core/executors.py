@@ -0,0 +1,32 @@
+# Process-wide thread pools for blocking analysis work
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name, max_workers):
+    """Return the process-wide pool called ``name``, created with ``max_workers`` threads on first use."""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = _executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+    return executor
+
+
+def run_releasing_connections(function, *args, **kwargs):
+    """Call ``function`` on a pool thread, then release the thread's database connections.
+
+    Pool threads outlive requests, so Django never closes the connections
+    they open (for the result store and response cache) on its own.
+    """
+    try:
+        return function(*args, **kwargs)
+    finally:
+        close_old_connections()
@@ -0,0 +1,86 @@
+# Eviction for the on-disk caches kept under <cache dir>/<digest[:2]>/<digest>-*
+
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Temporary files of interrupted writes are removed once they are this old
+STALE_TEMP_SECONDS = 3600
+
+
+def mark_used(path):
+    """Set a cache entry's modification time to now, which eviction reads as its last use."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _entries(directory):
+    """Yield (path, size, last use) of every file in a cache directory."""
+    for shard in os.scandir(directory):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            yield entry.path, stat.st_size, stat.st_mtime
+
+
+def prune_cache_dir(directory, max_age_days=0, max_bytes=0, dry_run=False):
+    """Evict cache files and return how many were (or, with ``dry_run``, would be) deleted.
+
+    Files unused for ``max_age_days`` and the least recently used files
+    beyond a total of ``max_bytes`` are evicted; 0 disables either limit.
+    """
+    if not directory or not os.path.isdir(directory):
+        return 0
+    now = time.time()
+    evicted = []
+    kept = []
+    for path, size, last_used in _entries(directory):
+        if path.endswith('.tmp'):
+            if now - last_used > STALE_TEMP_SECONDS:
+                evicted.append(path)
+        elif max_age_days and now - last_used > max_age_days * 86400:
+            evicted.append(path)
+        else:
+            kept.append((last_used, path, size))
+    if max_bytes:
+        total = 0
+        for last_used, path, size in sorted(kept, reverse=True):
+            total += size
+            if total > max_bytes:
+                evicted.append(path)
+
+    if not dry_run:
+        for path in evicted:
+            _remove(path)
+    return len(evicted)
+
+
+def discard_digest(directory, digest):
+    """Delete every cache file of one source file digest; returns how many there were."""
+    if not directory or not digest:
+        return 0
+    shard = os.path.join(directory, digest[:2])
+    try:
+        names = [name for name in os.listdir(shard) if name.startswith(f'{digest}-')]
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        _remove(os.path.join(shard, name))
+    return len(names)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not evict cache file {path}: {e}")
@@ -0,0 +1,94 @@
+# Precomputed health advice by age band, gender and symptom flags
+
+import hashlib
+import json
+from itertools import product
+from types import MappingProxyType
+
+ADVICE_FIELDS = ('general_advice', 'lifestyle_recommendations', 'prevention_tips', 'when_to_seek_help')
+
+# Age bands in order: (exclusive upper age, general advice, prevention tip); None is open-ended
+AGE_BANDS = (
+    (18, 'Ensure adequate sleep and nutrition for growth', 'Stay up to date with vaccinations'),
+    (50, 'Maintain regular exercise routine', 'Schedule regular health checkups'),
+    (None, 'Focus on preventive care and screenings', 'Monitor chronic conditions regularly'),
+)
+
+GENDER_TIPS = {
+    'female': 'Schedule regular gynecological exams',
+    'male': 'Consider prostate health screenings',
+}
+
+# Symptom flags in bit order: (phrase, general advice, when to seek help)
+SYMPTOM_FLAGS = (
+    ('fever', 'Rest and stay hydrated', 'Seek medical attention if fever exceeds 103°F'),
+    ('cough', 'Stay hydrated and use honey for soothing', 'Seek help if cough persists for more than 2 weeks'),
+    ('headache', 'Rest in a quiet, dark room', 'Seek immediate help for severe, sudden headache'),
+    ('chest pain', None, 'Seek immediate medical attention for chest pain'),
+    ('shortness of breath', None, 'Seek immediate medical attention for breathing difficulties'),
+)
+
+LIFESTYLE_RECOMMENDATIONS = (
+    'Maintain a balanced diet rich in fruits and vegetables',
+    'Exercise regularly (150 minutes of moderate activity per week)',
+    'Get 7-9 hours of quality sleep per night',
+    'Manage stress through relaxation techniques',
+    'Avoid smoking and limit alcohol consumption',
+)
+
+
+def advice_key(symptoms=None, age=None, gender=None):
+    """Reduce health advice inputs to their (age band, gender, symptom flag bitmask) key."""
+    band = None
+    if age:
+        band = next(index for index, (limit, _, _) in enumerate(AGE_BANDS) if limit is None or age < limit)
+
+    gender = gender.lower() if gender else None
+    if gender not in GENDER_TIPS:
+        gender = None
+
+    flags = 0
+    if symptoms:
+        symptom_text = (' '.join(symptoms) if isinstance(symptoms, list) else str(symptoms)).lower()
+        for bit, (phrase, _, _) in enumerate(SYMPTOM_FLAGS):
+            if phrase in symptom_text:
+                flags |= 1 << bit
+    return band, gender, flags
+
+
+def _build_advice(band, gender, flags):
+    advice = {field: [] for field in ADVICE_FIELDS}
+    if band is not None:
+        _, general, prevention = AGE_BANDS[band]
+        advice['general_advice'].append(general)
+        advice['prevention_tips'].append(prevention)
+    if gender is not None:
+        advice['prevention_tips'].append(GENDER_TIPS[gender])
+    for bit, (_, general, seek_help) in enumerate(SYMPTOM_FLAGS):
+        if flags & (1 << bit):
+            if general:
+                advice['general_advice'].append(general)
+            advice['when_to_seek_help'].append(seek_help)
+    advice['lifestyle_recommendations'].extend(LIFESTYLE_RECOMMENDATIONS)
+    return MappingProxyType({field: tuple(items) for field, items in advice.items()})
+
+
+# Every possible response, built once at import: 4 age bands x 3 genders x 32 symptom combinations
+HEALTH_ADVICE = MappingProxyType({
+    key: _build_advice(*key)
+    for key in product(
+        (None,) + tuple(range(len(AGE_BANDS))),
+        (None,) + tuple(GENDER_TIPS),
+        range(1 << len(SYMPTOM_FLAGS)),
+    )
+})
+
+# Changes whenever any advice text changes, so validators from older deployments stop matching
+ADVICE_VERSION = hashlib.sha256(
+    json.dumps([[repr(key), dict(advice)] for key, advice in HEALTH_ADVICE.items()], ensure_ascii=False).encode('utf-8')
+).hexdigest()[:16]
+
+
+def get_health_advice(symptoms=None, age=None, gender=None):
+    """Return the frozen advice for the inputs."""
+    return HEALTH_ADVICE[advice_key(symptoms, age, gender)]
@@ -0,0 +1,300 @@
+# Pooled, retrying HTTP clients with a circuit breaker per external AI provider
+
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import AIConfig
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Exceptions caused by the request itself rather than the provider
+CALLER_ERRORS = (
+    requests.exceptions.InvalidURL,
+    requests.exceptions.InvalidSchema,
+    requests.exceptions.MissingSchema,
+    requests.exceptions.URLRequired,
+    requests.exceptions.InvalidHeader,
+    requests.exceptions.InvalidJSONError,
+)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Raised when a call's deadline passes before it could be (re)tried."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and calls
+    fail fast for ``reset_seconds``. Then one trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold, reset_seconds, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go ahead now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Give back a half-open trial that ended without a verdict."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+            self._trial_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+                'open_for_seconds': round(self.clock() - self.opened_at, 1) if self.opened_at is not None else None,
+            }
+
+
+class ProviderClient:
+    """HTTP client for one provider: a keep-alive pool, timeouts, jittered retries and a breaker.
+
+    Only failures that are safe to repeat are retried: connection errors,
+    retryable statuses, and read timeouts when the call is ``idempotent``.
+    Retry-After headers are honoured up to ``backoff_max`` seconds.
+    """
+
+    def __init__(self, name, pool_size=None, connect_timeout=None, read_timeout=None, max_retries=None,
+                 backoff_base=None, backoff_max=None, failure_threshold=None, reset_seconds=None, sleep=time.sleep):
+        self.name = name
+        self.timeout = (
+            AIConfig.HTTP_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout,
+            AIConfig.HTTP_READ_TIMEOUT if read_timeout is None else read_timeout,
+        )
+        self.max_retries = AIConfig.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = AIConfig.HTTP_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = AIConfig.HTTP_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.breaker = CircuitBreaker(
+            AIConfig.CIRCUIT_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold,
+            AIConfig.CIRCUIT_RESET_SECONDS if reset_seconds is None else reset_seconds,
+        )
+        self.sleep = sleep
+
+        pool_size = AIConfig.HTTP_POOL_SIZE if pool_size is None else pool_size
+        # Retries are handled here, so the adapter itself never retries
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0, pool_block=False)
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+        self._counters = dict.fromkeys(
+            ('requests', 'attempts', 'successes', 'failures', 'retries', 'short_circuited', 'deadline_exceeded'), 0
+        )
+        self._counter_lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._counter_lock:
+            self._counters[counter] += 1
+
+    def _backoff(self, attempt, response=None):
+        """Full-jitter exponential backoff, or the server's Retry-After when it gives one."""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _timeout(self, deadline):
+        """The (connect, read) timeout of an attempt, shortened to end by ``deadline``."""
+        if deadline is None:
+            return self.timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f'{self.name} call deadline reached')
+        return tuple(min(timeout, remaining) for timeout in self.timeout)
+
+    def request(self, method, url, idempotent=False, deadline=None, **kwargs):
+        """Send a request and return the final response.
+
+        ``deadline`` is a time.monotonic() value that every attempt's timeouts
+        and every retry delay must fit before. Raises CircuitOpenError without
+        calling the provider while its breaker is open, DeadlineExceeded when
+        the deadline is reached, and the last requests exception when every
+        attempt failed. Errors in the request itself (a bad URL, a body that
+        cannot be read) are raised without counting against the provider.
+        """
+        self._count('requests')
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise CircuitOpenError(f'{self.name} circuit is open; skipping call')
+
+        settled = False
+        try:
+            response = self._attempts(method, url, idempotent, deadline, kwargs)
+            settled = True
+            return response
+        except DeadlineExceeded:
+            # Running out of time says nothing about the provider's health
+            self._count('deadline_exceeded')
+            raise
+        except requests.RequestException as e:
+            if isinstance(e, CALLER_ERRORS):
+                raise
+            settled = True
+            self._count('failures')
+            self.breaker.record_failure()
+            raise
+        finally:
+            if not settled:
+                # No verdict on the provider, so give back a half-open trial
+                self.breaker.release()
+
+    def _attempts(self, method, url, idempotent, deadline, kwargs):
+        """Try a request until it succeeds, fails for good or runs out of retries or time."""
+        timeout = kwargs.pop('timeout', None)
+        attempt = 0
+        while True:
+            self._count('attempts')
+            response, error = None, None
+            try:
+                attempt_timeout = timeout or self._timeout(deadline)
+                response = self.session.request(method, url, timeout=attempt_timeout, **kwargs)
+            except DeadlineExceeded:
+                raise
+            except requests.Timeout as e:
+                if timeout is None and attempt_timeout != self.timeout:
+                    # Cut short by the deadline rather than by the configured timeouts
+                    raise DeadlineExceeded(f'{self.name} call deadline reached') from e
+                error = e
+            except requests.ConnectionError as e:
+                error = e
+            retryable = (
+                (response is not None and response.status_code in RETRY_STATUSES)
+                or isinstance(error, (requests.ConnectionError, requests.ConnectTimeout))
+                or (isinstance(error, requests.Timeout) and idempotent)
+            )
+            delay = self._backoff(attempt, response) if retryable else 0
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                retryable = False
+            if retryable and attempt < self.max_retries:
+                self._count('retries')
+                logger.warning(
+                    f"{self.name} call failed ({error or response.status_code}); retrying in {delay:.2f}s"
+                )
+                if response is not None:
+                    response.close()
+                self.sleep(delay)
+                attempt += 1
+                continue
+
+            if error is not None:
+                raise error
+            if response.status_code >= 500 or response.status_code == 429:
+                self._count('failures')
+                self.breaker.record_failure()
+            else:
+                # Client errors are the caller's problem, not a sign the provider is down
+                self._count('successes')
+                self.breaker.record_success()
+            return response
+
+    def post(self, url, idempotent=False, **kwargs):
+        return self.request('POST', url, idempotent=idempotent, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, idempotent=True, **kwargs)
+
+    def metrics(self):
+        """Return request counters, breaker state and connection pool state."""
+        with self._counter_lock:
+            counters = dict(self._counters)
+        pools = {}
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            # urllib3 fills free pool slots with None placeholders
+            idle = list(pool.pool.queue) if pool.pool is not None else []
+            pools[f'{pool.scheme}://{pool.host}:{pool.port}'] = {
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': sum(1 for connection in idle if connection is not None),
+                'max_size': pool.pool.maxsize if pool.pool is not None else 0,
+            }
+        return dict(counters, breaker=self.breaker.snapshot(), pools=pools)
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    """Return the process-wide client for a provider, creating it on first use."""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = ProviderClient(name)
+    return client
+
+
+def client_metrics():
+    """Return the metrics of every client created in this process."""
+    return {name: client.metrics() for name, client in list(_clients.items())}
+
+
+def reset_clients():
+    """Close and forget every client, so the next calls start with fresh pools, breakers and counters."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
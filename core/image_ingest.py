@@ -0,0 +1,224 @@
+# Bounded-memory image and PDF ingestion shared by the ECG and X-ray analyzers
+
+import hashlib
+import logging
+import os
+import tempfile
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .config import AIConfig
+from .file_cache import discard_digest, mark_used, prune_cache_dir
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # PDF uploads are rejected without it
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the normalization changes so stale cache entries are not reused
+INGEST_VERSION = 1
+
+# cv2.imread grayscale flags by decode-time reduction factor
+REDUCED_GRAYSCALE = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+    (1, cv2.IMREAD_GRAYSCALE),
+)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# PDF files may have up to 1024 bytes of junk before their header
+PDF_MAGIC = b'%PDF-'
+PDF_HEADER_SIZE = 1024
+
+
+class ImageRejected(ValueError):
+    """Raised for files that are not images or are too large to decode safely."""
+
+
+def sniff_image(path, max_pixels=None):
+    """Read only the image header and return (width, height).
+
+    Raises ImageRejected for unreadable files and for images over
+    ``max_pixels`` (IMAGE_MAX_PIXELS by default), before any pixel data is
+    decoded.
+    """
+    max_pixels = AIConfig.IMAGE_MAX_PIXELS if max_pixels is None else max_pixels
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+    except Image.DecompressionBombError as e:
+        raise ImageRejected(str(e))
+    except (OSError, SyntaxError, ValueError) as e:
+        raise ImageRejected(f'Not a readable image: {e}')
+    if width < 1 or height < 1:
+        raise ImageRejected(f'Image has no pixels ({width}x{height})')
+    if width * height > max_pixels:
+        raise ImageRejected(f'Image is {width}x{height}, over the {max_pixels} pixel limit')
+    return width, height
+
+
+def _reduction(width, height, max_size):
+    """Largest decode-time reduction that still leaves at least ``max_size`` pixels on the long side."""
+    for factor, flag in REDUCED_GRAYSCALE:
+        if max(width, height) // factor >= max_size:
+            return flag
+    return cv2.IMREAD_GRAYSCALE
+
+
+def is_pdf(path):
+    """Whether a file is a PDF document, judged by its header."""
+    with open(path, 'rb') as f:
+        return PDF_MAGIC in f.read(PDF_HEADER_SIZE)
+
+
+def rasterize_pdf(path, max_size=None, page=None, dpi=None):
+    """Render one page of a PDF as grayscale at ``dpi``, with its long side at most ``max_size`` pixels.
+
+    Only the requested page (PDF_PAGE, the first by default) is parsed and
+    rendered; the rest of the document is never loaded.
+    """
+    max_size = AIConfig.MAX_IMAGE_SIZE if max_size is None else max_size
+    page = AIConfig.PDF_PAGE if page is None else page
+    dpi = AIConfig.PDF_RENDER_DPI if dpi is None else dpi
+    if pdfium is None:
+        raise ImageRejected('PDF reports need the pypdfium2 package')
+
+    try:
+        document = pdfium.PdfDocument(path)
+    except pdfium.PdfiumError as e:
+        raise ImageRejected(f'Not a readable PDF: {e}')
+    try:
+        if page >= len(document):
+            raise ImageRejected(f'PDF has {len(document)} page(s), page {page + 1} was requested')
+        pdf_page = document[page]
+        try:
+            width, height = pdf_page.get_size()  # points, 1/72 inch
+            if width <= 0 or height <= 0:
+                raise ImageRejected(f'PDF page has no area ({width}x{height})')
+            scale = min(dpi / 72, max_size / max(width, height))
+            bitmap = pdf_page.render(scale=scale, grayscale=True)
+            try:
+                # Copy out of the bitmap buffer before it is freed
+                return np.array(bitmap.to_numpy()).reshape(bitmap.height, bitmap.width)
+            finally:
+                bitmap.close()
+        finally:
+            pdf_page.close()
+    except pdfium.PdfiumError as e:
+        raise ImageRejected(f'Could not render PDF page: {e}')
+    finally:
+        document.close()
+
+
+def decode_grayscale(path, max_size=None, max_pixels=None):
+    """Decode an image as grayscale with its long side at most ``max_size`` pixels.
+
+    JPEGs are scaled down while decoding, so the full-resolution colour
+    bitmap is never held in memory. PDFs are rasterized one page only.
+    """
+    max_size = AIConfig.MAX_IMAGE_SIZE if max_size is None else max_size
+    if is_pdf(path):
+        return rasterize_pdf(path, max_size=max_size)
+    width, height = sniff_image(path, max_pixels=max_pixels)
+    gray = cv2.imread(path, _reduction(width, height, max_size))
+    if gray is None:
+        raise ImageRejected(f'OpenCV could not decode {os.path.basename(path)}')
+    scale = max_size / max(gray.shape)
+    if scale < 1:
+        size = (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale)))
+        gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImageCache:
+    """Normalized grayscale arrays stored as ``.npy`` files keyed by the source file's hash.
+
+    Cached arrays are opened memory-mapped and read-only, so re-analyzing a
+    file skips the decode and its pixels are paged in from disk as needed.
+    """
+
+    def __init__(self, directory=None, max_size=None):
+        self.directory = AIConfig.IMAGE_CACHE_DIR if directory is None else directory
+        self.max_size = AIConfig.MAX_IMAGE_SIZE if max_size is None else max_size
+
+    def path_for(self, digest):
+        name = f'{digest}-{self.max_size}-{AIConfig.PDF_RENDER_DPI}p{AIConfig.PDF_PAGE}-v{INGEST_VERSION}.npy'
+        return os.path.join(self.directory, digest[:2], name)
+
+    def load(self, path, digest=None):
+        """Return the normalized grayscale array of the image at ``path`` (whose SHA-256 may be passed in)."""
+        if not self.directory:
+            return decode_grayscale(path, max_size=self.max_size)
+
+        cache_path = self.path_for(digest or file_digest(path))
+        try:
+            gray = np.load(cache_path, mmap_mode='r')
+            mark_used(cache_path)
+            return gray
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable image cache entry {cache_path}: {e}")
+
+        gray = decode_grayscale(path, max_size=self.max_size)
+        try:
+            self._store(cache_path, gray)
+        except OSError as e:
+            logger.warning(f"Could not cache preprocessed image {cache_path}: {e}")
+        return gray
+
+    def _store(self, cache_path, gray):
+        # Write to a temporary file and rename it, so readers never see a partial array
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, gray)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def prune(self, max_age_days=None, max_bytes=None, dry_run=False):
+        """Evict arrays unused for ``max_age_days`` or beyond ``max_bytes`` in total; returns how many."""
+        return prune_cache_dir(
+            self.directory,
+            max_age_days=AIConfig.IMAGE_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days,
+            max_bytes=AIConfig.IMAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes,
+            dry_run=dry_run,
+        )
+
+    def discard(self, digest):
+        """Delete the cached arrays of a source file, at every size and version."""
+        return discard_digest(self.directory, digest)
+
+
+_image_cache = None
+
+
+def get_image_cache():
+    """Return the process-wide image cache."""
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = ImageCache()
+    return _image_cache
+
+
+def load_grayscale(path, digest=None):
+    """Return the normalized grayscale array of an uploaded image, using the shared cache."""
+    return get_image_cache().load(path, digest=digest)
@@ -0,0 +1,403 @@
+# Medical knowledge base loader with integrity checks and hot reload
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+import numpy as np
+
+from .config import AIConfig
+from .rule_engine import RuleEngine
+from .text_matching import PhraseMatcher
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+SCORE_DECIMALS = 6  # condition scores are compared at this precision
+MEDICATION_FIELDS = ('name', 'dosage', 'frequency', 'duration')
+RULE_FIELDS = ('name', 'diagnosis', 'confidence', 'recommended_tests', 'treatment_plan', 'medications')
+
+
+class KnowledgeBaseError(ValueError):
+    """Raised when a knowledge base file is malformed or fails its integrity check."""
+
+
+class KnowledgeBase:
+    """Immutable, pre-indexed view of a knowledge base document.
+
+    All strings are interned and identical medication entries share a single
+    read-only mapping, so a worker holds one copy of the data no matter how
+    many requests read it. A reload builds a new instance instead of
+    mutating this one.
+    """
+
+    def __init__(self, document, checksum, path=None, mtime=None):
+        _validate(document)
+        self.path = path
+        self.mtime = mtime
+        self.checksum = checksum
+        self.format_version = document['format_version']
+        self.version = document['version']
+
+        freezer = _Freezer()
+        self.symptom_conditions = freezer.freeze(document['symptom_conditions'])
+        self.severe_symptoms = frozenset(freezer.freeze(document['severity']['severe']))
+        self.moderate_symptoms = frozenset(freezer.freeze(document['severity']['moderate']))
+        self.condition_medications = freezer.freeze(document['condition_medications'])
+        self.diagnosis_rules = freezer.freeze(document['diagnosis_rules'])
+        self.default_rule = freezer.freeze(document['default_rule'])
+        self.symptom_weights = freezer.freeze(document.get('symptom_weights', {}))
+        self.condition_aliases = freezer.freeze(
+            {alias.lower(): target for alias, target in document.get('condition_aliases', {}).items()}
+        )
+
+        # Every symptom and severity phrase, compiled once into a single matcher
+        self.symptom_matcher = PhraseMatcher(
+            list(self.symptom_conditions)
+            + document['severity']['severe']
+            + document['severity']['moderate']
+        )
+
+        # Diagnosis rules compiled into one decision table
+        self.rule_engine = RuleEngine(self.diagnosis_rules, self.default_rule)
+
+        # Symptom phrases plus rule keywords: everything a symptom-based diagnosis depends on
+        self.diagnosis_matcher = PhraseMatcher(self.symptom_matcher.phrases + self.rule_engine.matcher.phrases)
+
+        self._build_condition_matrix()
+        self._build_medication_index()
+
+    def __repr__(self):
+        return f'<KnowledgeBase version={self.version} checksum={self.checksum[:12]}>'
+
+    def _build_condition_matrix(self):
+        """Number conditions in first-appearance order and map matcher phrases onto them."""
+        condition_ids = {}
+        for conditions in self.symptom_conditions.values():
+            for condition in conditions:
+                condition_ids.setdefault(condition, len(condition_ids))
+        self.conditions = tuple(condition_ids)
+
+        phrases = self.symptom_matcher.phrases
+        self.phrase_condition_ids = tuple(
+            tuple(sorted({condition_ids[condition] for condition in self.symptom_conditions.get(phrase, ())}))
+            for phrase in phrases
+        )
+        self.phrase_weights = tuple(float(self.symptom_weights.get(phrase, 1.0)) for phrase in phrases)
+        self.phrase_severity = tuple(
+            (3 if phrase in self.severe_symptoms else 0) + (1 if phrase in self.moderate_symptoms else 0)
+            for phrase in phrases
+        )
+
+        # Dense weighted phrase x condition incidence for batch scoring; small enough to keep resident
+        matrix = np.zeros((len(phrases), len(self.conditions)), dtype=np.float64)
+        for phrase_id, ids in enumerate(self.phrase_condition_ids):
+            matrix[phrase_id, list(ids)] = self.phrase_weights[phrase_id]
+        matrix.setflags(write=False)
+        self.phrase_condition_matrix = matrix
+        severity = np.array(self.phrase_severity, dtype=np.float64)
+        severity.setflags(write=False)
+        self.phrase_severity_vector = severity
+
+    def rank_conditions(self, phrase_ids, limit=10):
+        """Return the ids of the ``limit`` conditions best supported by the matched phrases.
+
+        A condition scores the summed weight of the matched symptoms listing
+        it; ties keep knowledge base order, so equal inputs always give the
+        same ranking.
+        """
+        scores = {}
+        for phrase_id in phrase_ids:
+            weight = self.phrase_weights[phrase_id]
+            for condition_id in self.phrase_condition_ids[phrase_id]:
+                scores[condition_id] = scores.get(condition_id, 0.0) + weight
+        ranked = heapq.nsmallest(
+            limit,
+            ((-round(score, SCORE_DECIMALS), condition_id) for condition_id, score in scores.items() if score > 0),
+        )
+        return [condition_id for _, condition_id in ranked]
+
+    def rank_conditions_batch(self, condition_scores, limit=10):
+        """Row-wise rank_conditions for a record x condition score matrix."""
+        rows, count = condition_scores.shape
+        limit = min(limit, count)
+        if not rows or not limit:
+            return [[] for _ in range(rows)]
+        # Unique integer sort keys: higher score first, then knowledge base order
+        scaled = np.rint(np.round(condition_scores, SCORE_DECIMALS) * 10 ** SCORE_DECIMALS).astype(np.int64)
+        keys = scaled * count + (count - 1 - np.arange(count))
+        keys[scaled <= 0] = -1
+        if limit < count:
+            top = np.argpartition(-keys, limit - 1, axis=1)[:, :limit]
+        else:
+            top = np.broadcast_to(np.arange(count), (rows, count))
+        top_keys = np.take_along_axis(keys, top, axis=1)
+        order = np.argsort(-top_keys, axis=1)
+        top = np.take_along_axis(top, order, axis=1).tolist()
+        top_keys = np.take_along_axis(top_keys, order, axis=1).tolist()
+        return [
+            [condition_id for condition_id, key in zip(ids, row_keys) if key >= 0]
+            for ids, row_keys in zip(top, top_keys)
+        ]
+
+    def _build_medication_index(self):
+        """Precompute the medication ids recommended for every known condition."""
+        self.medications = []
+        self._medication_name_ids = []
+        medication_ids = {}
+        name_ids = {}
+        self._entries = []
+        for entry, medications in self.condition_medications.items():
+            ids = []
+            for medication in medications:
+                key = tuple(medication.items())
+                if key not in medication_ids:
+                    medication_ids[key] = len(self.medications)
+                    self.medications.append(medication)
+                    self._medication_name_ids.append(name_ids.setdefault(medication['name'], len(name_ids)))
+                ids.append(medication_ids[key])
+            self._entries.append((entry.lower(), tuple(ids)))
+        self.medications = tuple(self.medications)
+        self._medication_name_ids = tuple(self._medication_name_ids)
+
+        vocabulary = set(self.condition_medications) | set(self.condition_aliases)
+        for conditions in self.symptom_conditions.values():
+            vocabulary.update(conditions)
+        self._medication_index = {
+            condition.lower(): self._resolve_medication_ids(condition) for condition in vocabulary
+        }
+        self._unindexed = {}
+
+    def _resolve_medication_ids(self, condition):
+        """Match a condition against the medication table entries, deduplicated by medication name."""
+        condition = condition.lower()
+        target = self.condition_aliases.get(condition)
+        if target is not None:
+            condition = target.lower()
+        ids = []
+        seen_names = set()
+        for entry, entry_ids in self._entries:
+            # An entry applies when either name contains the other, e.g. "Fever" and "Dengue fever"
+            if entry in condition or condition in entry:
+                for medication_id in entry_ids:
+                    name_id = self._medication_name_ids[medication_id]
+                    if name_id not in seen_names:
+                        seen_names.add(name_id)
+                        ids.append(medication_id)
+        return tuple(ids)
+
+    def _medication_ids(self, condition):
+        key = condition.lower()
+        ids = self._medication_index.get(key)
+        if ids is None:
+            ids = self._unindexed.get(key)
+            if ids is None:
+                ids = self._resolve_medication_ids(key)
+                if len(self._unindexed) < 1024:
+                    self._unindexed[key] = ids
+        return ids
+
+    def medications_for(self, conditions, limit=8):
+        """Return up to ``limit`` medications for the conditions, in condition then table order.
+
+        Each medication name is recommended once, keeping its first occurrence.
+        """
+        selected = []
+        seen_names = set()
+        for condition in conditions:
+            for medication_id in self._medication_ids(condition):
+                name_id = self._medication_name_ids[medication_id]
+                if name_id not in seen_names:
+                    seen_names.add(name_id)
+                    selected.append(self.medications[medication_id])
+                    if len(selected) >= limit:
+                        return selected
+        return selected
+
+
+class _Freezer:
+    """Recursively convert JSON data into interned, read-only structures."""
+
+    def __init__(self):
+        self._shared = {}
+
+    def freeze(self, value):
+        if isinstance(value, str):
+            return sys.intern(value)
+        if isinstance(value, list):
+            return tuple(self.freeze(item) for item in value)
+        if isinstance(value, dict):
+            frozen = MappingProxyType({self.freeze(key): self.freeze(item) for key, item in value.items()})
+            # Share identical leaf mappings such as medications repeated across conditions
+            if all(isinstance(item, (str, int, float)) for item in frozen.values()):
+                return self._shared.setdefault(tuple(frozen.items()), frozen)
+            return frozen
+        return value
+
+
+def compute_checksum(document):
+    """Return the SHA-256 checksum of a document, excluding its own checksum field."""
+    content = {key: value for key, value in document.items() if key != 'checksum'}
+    canonical = json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return 'sha256:' + hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _validate(document):
+    """Check the structure of a knowledge base document."""
+    if not isinstance(document, dict):
+        raise KnowledgeBaseError('Knowledge base must be a JSON object')
+    if document.get('format_version') != FORMAT_VERSION:
+        raise KnowledgeBaseError(f"Unsupported knowledge base format: {document.get('format_version')!r}")
+    if not isinstance(document.get('version'), str):
+        raise KnowledgeBaseError('Knowledge base version must be a string')
+
+    symptom_conditions = document.get('symptom_conditions')
+    if not isinstance(symptom_conditions, dict):
+        raise KnowledgeBaseError('symptom_conditions must be an object')
+    for symptom, conditions in symptom_conditions.items():
+        if symptom != symptom.lower():
+            raise KnowledgeBaseError(f'Symptom {symptom!r} must be lowercase')
+        if not _is_string_list(conditions):
+            raise KnowledgeBaseError(f'Conditions for {symptom!r} must be a list of strings')
+
+    weights = document.get('symptom_weights', {})
+    if not isinstance(weights, dict):
+        raise KnowledgeBaseError('symptom_weights must be an object')
+    for symptom, weight in weights.items():
+        if symptom not in symptom_conditions:
+            raise KnowledgeBaseError(f'Weighted symptom {symptom!r} is not in symptom_conditions')
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+            raise KnowledgeBaseError(f'Weight for {symptom!r} must be a positive number')
+
+    severity = document.get('severity')
+    if not isinstance(severity, dict) or not all(_is_string_list(severity.get(level)) for level in ('severe', 'moderate')):
+        raise KnowledgeBaseError('severity must define severe and moderate phrase lists')
+
+    condition_medications = document.get('condition_medications')
+    if not isinstance(condition_medications, dict):
+        raise KnowledgeBaseError('condition_medications must be an object')
+    for condition, medications in condition_medications.items():
+        _validate_medications(medications, condition)
+
+    aliases = document.get('condition_aliases', {})
+    if not isinstance(aliases, dict) or not all(isinstance(target, str) for target in aliases.values()):
+        raise KnowledgeBaseError('condition_aliases must map alias names to condition names')
+
+    rules = document.get('diagnosis_rules')
+    if not isinstance(rules, list):
+        raise KnowledgeBaseError('diagnosis_rules must be a list')
+    for rule in rules:
+        _validate_rule(rule)
+        if not _is_string_list(rule.get('keywords')) or not rule['keywords']:
+            raise KnowledgeBaseError(f"Rule {rule['name']!r} must have keywords")
+        if any(not keyword or keyword != keyword.lower() for keyword in rule['keywords']):
+            raise KnowledgeBaseError(f"Keywords of rule {rule['name']!r} must be non-empty and lowercase")
+    _validate_rule(document.get('default_rule'))
+
+
+def _validate_rule(rule):
+    if not isinstance(rule, dict) or any(field not in rule for field in RULE_FIELDS):
+        raise KnowledgeBaseError(f'Diagnosis rules must define {", ".join(RULE_FIELDS)}')
+    if not isinstance(rule['confidence'], (int, float)) or not 0 <= rule['confidence'] <= 1:
+        raise KnowledgeBaseError(f"Rule {rule['name']!r} confidence must be between 0 and 1")
+    _validate_medications(rule['medications'], rule['name'])
+
+
+def _validate_medications(medications, owner):
+    if not isinstance(medications, list):
+        raise KnowledgeBaseError(f'Medications for {owner!r} must be a list')
+    for medication in medications:
+        if not isinstance(medication, dict) or any(not isinstance(medication.get(field), str) for field in MEDICATION_FIELDS):
+            raise KnowledgeBaseError(f'Medication for {owner!r} must define {", ".join(MEDICATION_FIELDS)}')
+
+
+def _is_string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def load_knowledge_base(path=None):
+    """Load, verify and index a knowledge base file."""
+    path = path or AIConfig.KNOWLEDGE_BASE_PATH
+    try:
+        stat = os.stat(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+    except (OSError, ValueError) as e:
+        raise KnowledgeBaseError(f'Could not read knowledge base {path}: {e}') from e
+
+    checksum = compute_checksum(document)
+    if document.get('checksum') != checksum:
+        raise KnowledgeBaseError(f'Knowledge base {path} failed its integrity check')
+
+    return KnowledgeBase(document, checksum, path=str(path), mtime=(stat.st_mtime_ns, stat.st_size))
+
+
+def write_knowledge_base(document, path=None):
+    """Stamp a document with its checksum and write it in the repository layout."""
+    path = path or AIConfig.KNOWLEDGE_BASE_PATH
+    _validate(document)
+    document = dict(document, checksum=compute_checksum(document))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(_dumps(document, 0))
+        f.write('\n')
+    return document['checksum']
+
+
+def _dumps(value, depth):
+    """Pretty-print nested objects while keeping lists and leaf objects on one line."""
+    if isinstance(value, dict) and any(isinstance(item, (dict, list)) for item in value.values()):
+        indent = '  ' * (depth + 1)
+        items = [f'{indent}{json.dumps(key)}: {_dumps(item, depth + 1)}' for key, item in value.items()]
+        return '{\n' + ',\n'.join(items) + '\n' + '  ' * depth + '}'
+    if isinstance(value, list) and any(isinstance(item, dict) for item in value):
+        indent = '  ' * (depth + 1)
+        items = [f'{indent}{_dumps(item, depth + 1)}' for item in value]
+        return '[\n' + ',\n'.join(items) + '\n' + '  ' * depth + ']'
+    return json.dumps(value, ensure_ascii=False)
+
+
+_lock = threading.Lock()
+_current = None
+_last_checked = 0.0
+
+
+def get_knowledge_base():
+    """Return the process-wide knowledge base, reloading it if the file has changed.
+
+    The file is stat'ed at most once per ``AIConfig.KNOWLEDGE_BASE_RELOAD_INTERVAL``
+    seconds. A reload that fails validation keeps the previous knowledge base.
+    """
+    global _current, _last_checked
+
+    now = time.monotonic()
+    current = _current
+    if current is not None and now - _last_checked < AIConfig.KNOWLEDGE_BASE_RELOAD_INTERVAL:
+        return current
+
+    with _lock:
+        if _current is not None and now - _last_checked < AIConfig.KNOWLEDGE_BASE_RELOAD_INTERVAL:
+            return _current
+        _last_checked = now
+        path = AIConfig.KNOWLEDGE_BASE_PATH
+        if _current is not None:
+            try:
+                stat = os.stat(path)
+                if (stat.st_mtime_ns, stat.st_size) == _current.mtime and str(path) == _current.path:
+                    return _current
+            except OSError as e:
+                logger.error(f"Knowledge base file unavailable, keeping version {_current.version}: {e}")
+                return _current
+        try:
+            _current = load_knowledge_base(path)
+            logger.info(f"Loaded medical knowledge base {_current.version} ({_current.checksum[:19]})")
+        except KnowledgeBaseError as e:
+            if _current is None:
+                raise
+            logger.error(f"Knowledge base reload failed, keeping version {_current.version}: {e}")
+        return _current
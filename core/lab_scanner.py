@@ -0,0 +1,216 @@
+# Single-pass lab report scanner: analytes, values, units, reference ranges and keywords
+
+import re
+
+from .text_matching import trie_regex
+
+# Analyte: (aliases, usual unit, low, high). A bound of None is open-ended.
+# Adult reference ranges; a range printed next to the value takes precedence.
+ANALYTES = {
+    'Hemoglobin': (('hemoglobin', 'haemoglobin', 'hgb', 'hb'), 'g/dL', 12.0, 17.5),
+    'Hematocrit': (('hematocrit', 'haematocrit', 'hct', 'pcv'), '%', 36.0, 50.0),
+    'WBC': (('wbc', 'white blood cells', 'white blood cell count', 'white cell count', 'leukocytes', 'tlc'), '10^3/µL', 4.0, 11.0),
+    'RBC': (('rbc', 'red blood cells', 'red blood cell count', 'red cell count', 'erythrocytes'), '10^6/µL', 4.2, 5.9),
+    'Platelets': (('platelets', 'platelet count', 'plt'), '10^3/µL', 150.0, 450.0),
+    'Glucose': (('glucose', 'blood glucose', 'blood sugar', 'fasting glucose', 'fbs', 'rbs'), 'mg/dL', 70.0, 100.0),
+    'HbA1c': (('hba1c', 'a1c', 'glycated hemoglobin', 'glycated haemoglobin'), '%', 4.0, 5.6),
+    'Sodium': (('sodium', 'na'), 'mmol/L', 135.0, 145.0),
+    'Potassium': (('potassium',), 'mmol/L', 3.5, 5.1),
+    'Chloride': (('chloride', 'cl'), 'mmol/L', 98.0, 107.0),
+    'Calcium': (('calcium',), 'mg/dL', 8.5, 10.5),
+    'Creatinine': (('creatinine', 'creat'), 'mg/dL', 0.6, 1.3),
+    'Urea': (('urea', 'bun', 'blood urea nitrogen'), 'mg/dL', 7.0, 20.0),
+    'Total cholesterol': (('total cholesterol', 'cholesterol'), 'mg/dL', None, 200.0),
+    'LDL': (('ldl', 'ldl cholesterol', 'ldl-c'), 'mg/dL', None, 100.0),
+    'HDL': (('hdl', 'hdl cholesterol', 'hdl-c'), 'mg/dL', 40.0, None),
+    'Triglycerides': (('triglycerides', 'triglyceride', 'tg'), 'mg/dL', None, 150.0),
+    'ALT': (('alt', 'sgpt', 'alanine aminotransferase'), 'U/L', 7.0, 56.0),
+    'AST': (('ast', 'sgot', 'aspartate aminotransferase'), 'U/L', 10.0, 40.0),
+    'Bilirubin': (('bilirubin', 'total bilirubin'), 'mg/dL', 0.1, 1.2),
+    'TSH': (('tsh', 'thyroid stimulating hormone'), 'mIU/L', 0.4, 4.0),
+    'CRP': (('crp', 'c-reactive protein', 'c reactive protein'), 'mg/L', None, 10.0),
+    'ESR': (('esr', 'sed rate', 'erythrocyte sedimentation rate'), 'mm/hr', None, 20.0),
+}
+
+UNITS = (
+    'g/dl', 'mg/dl', 'mg/l', 'mmol/l', 'meq/l', 'u/l', 'iu/l', 'miu/l', 'µiu/ml', 'uiu/ml', 'ng/ml', 'pg/ml',
+    'mm/hr', 'fl', 'pg', '%', '10^3/µl', '10^3/ul', '10^6/µl', '10^6/ul', 'x10^9/l', 'x10^12/l', 'k/µl', 'k/ul',
+    'cells/µl', 'cells/ul', '/µl', '/ul', 'g/l', 'umol/l', 'µmol/l', '10^9/l', '10^12/l',
+)
+
+# Other spellings of the same unit, for comparing a printed unit with the ANALYTES one
+SAME_UNITS = {
+    '10^3/ul': '10^3/µl', 'k/µl': '10^3/µl', 'k/ul': '10^3/µl', '10^9/l': '10^3/µl', 'x10^9/l': '10^3/µl',
+    '10^6/ul': '10^6/µl', '10^12/l': '10^6/µl', 'x10^12/l': '10^6/µl',
+    'meq/l': 'mmol/l', 'iu/l': 'u/l', 'µiu/ml': 'miu/l', 'uiu/ml': 'miu/l', 'umol/l': 'µmol/l',
+}
+
+# (analyte, printed unit): factor converting the ANALYTES range to the printed (SI) unit
+UNIT_FACTORS = {
+    ('Hemoglobin', 'g/l'): 10.0,
+    ('Glucose', 'mmol/l'): 1 / 18.016,
+    ('Calcium', 'mmol/l'): 1 / 4.008,
+    ('Creatinine', 'µmol/l'): 88.42,
+    ('Urea', 'mmol/l'): 1 / 2.801,
+    ('Total cholesterol', 'mmol/l'): 1 / 38.67,
+    ('LDL', 'mmol/l'): 1 / 38.67,
+    ('HDL', 'mmol/l'): 1 / 38.67,
+    ('Triglycerides', 'mmol/l'): 1 / 88.57,
+    ('Bilirubin', 'µmol/l'): 17.1,
+}
+
+# Keyword: (analysis section, message). Keywords match whole words, so
+# e.g. "follow" is not a "low" and "reference range" is not a referral.
+KEYWORDS = {
+    'high': ('abnormal_values', 'Elevated values detected'),
+    'elevated': ('abnormal_values', 'Elevated values detected'),
+    'low': ('abnormal_values', 'Decreased values detected'),
+    'decreased': ('abnormal_values', 'Decreased values detected'),
+    'diabetes': ('key_findings', 'Diabetes mentioned'),
+    'hypertension': ('key_findings', 'Hypertension mentioned'),
+    'anemia': ('key_findings', 'Anemia mentioned'),
+    'anaemia': ('key_findings', 'Anemia mentioned'),
+    'infection': ('key_findings', 'Infection mentioned'),
+    'inflammation': ('key_findings', 'Inflammation mentioned'),
+    'follow up': ('recommendations', 'Follow-up recommended'),
+    'follow-up': ('recommendations', 'Follow-up recommended'),
+    'monitor': ('recommendations', 'Follow-up recommended'),
+    'monitoring': ('recommendations', 'Follow-up recommended'),
+    'consult': ('recommendations', 'Specialist consultation recommended'),
+    'consultation': ('recommendations', 'Specialist consultation recommended'),
+    'refer': ('recommendations', 'Specialist consultation recommended'),
+    'referral': ('recommendations', 'Specialist consultation recommended'),
+    'referred': ('recommendations', 'Specialist consultation recommended'),
+}
+
+# Flags printed next to a value
+VALUE_FLAGS = {'h': 'high', 'hi': 'high', 'high': 'high', 'l': 'low', 'lo': 'low', 'low': 'low'}
+
+ALIASES = {alias: analyte for analyte, (aliases, _, _, _) in ANALYTES.items() for alias in aliases}
+
+
+def _alternation(words):
+    # A trie prefers the longest word (e.g. "total cholesterol" over "cholesterol")
+    # and only tries the words sharing the prefix seen so far
+    return trie_regex(words).replace(r'\ ', r'\s+')
+
+
+NUMBER = r'\d+(?:\.\d+)?'
+
+# One pattern for every token kind; a scan visits each character once
+TOKEN_PATTERN = re.compile(
+    rf'[^\S\n]*(?:(?P<newline>\n)'
+    rf'|(?P<unit>(?:{_alternation(UNITS)})(?![^\W\d_]))'
+    rf'|(?P<range>(?<![\d.]){NUMBER}\s*(?:-|–|to)\s*{NUMBER})'
+    rf'|(?P<bound>[<>≤≥]=?\s*{NUMBER})'
+    rf'|(?P<number>(?<![\d.]){NUMBER})'
+    rf'|(?P<analyte>\b(?:{_alternation(ALIASES)})\b)'
+    rf'|(?P<keyword>\b(?:{_alternation(KEYWORDS)})\b)'
+    rf'|(?P<word>[^\W\d_]+))',
+    re.IGNORECASE,
+)
+RANGE_SPLIT = re.compile(rf'({NUMBER})\s*(?:-|–|to)\s*({NUMBER})', re.IGNORECASE)
+BOUND_NUMBER = re.compile(NUMBER)
+
+
+def _unit_key(unit):
+    return SAME_UNITS.get(unit.lower(), unit.lower())
+
+
+def _usual_range(analyte, unit):
+    """ANALYTES range of ``analyte`` in the printed ``unit``, or None when it cannot be converted."""
+    usual_unit, low, high = ANALYTES[analyte][1:]
+    if _unit_key(unit) == _unit_key(usual_unit):
+        return low, high
+    factor = UNIT_FACTORS.get((analyte, _unit_key(unit)))
+    if factor is None:
+        return None
+    return tuple(None if bound is None else round(bound * factor, 2) for bound in (low, high))
+
+
+def _status(value, low, high):
+    if low is not None and value < low:
+        return 'low'
+    if high is not None and value > high:
+        return 'high'
+    return 'normal'
+
+
+def scan_lab_text(text):
+    """Scan report text once and return (lab values, keyword messages by section, word count).
+
+    A lab value is an analyte name followed on the same line by a number,
+    optionally with a unit, a printed reference range and an H/L flag right
+    after them. Its status is the printed flag if any, else the value checked
+    against the printed range or, failing that, the ANALYTES range converted
+    to the printed unit; it is None when the unit cannot be converted.
+    """
+    values = []
+    messages = {'key_findings': [], 'abnormal_values': [], 'recommendations': []}
+    words = 0
+    current = None
+    # Whether the last token belonged to the current value, so a flag may follow
+    flaggable = False
+
+    for match in TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        token = match.group(kind)
+        if kind == 'newline':
+            current = None
+            flaggable = False
+            continue
+
+        words += 1
+        if kind in ('word', 'keyword'):
+            flag = VALUE_FLAGS.get(token.lower())
+            if flag and flaggable:
+                current['flag'] = flag
+            flaggable = False
+            if kind == 'word':
+                continue
+        else:
+            flaggable = False
+        if kind == 'analyte':
+            analyte = ALIASES[' '.join(token.lower().split())]
+            current = {
+                'analyte': analyte, 'value': None, 'unit': ANALYTES[analyte][1],
+                'reference': None, 'flag': None,
+            }
+            values.append(current)
+        elif kind == 'keyword':
+            section, message = KEYWORDS[' '.join(token.lower().split())]
+            if message not in messages[section]:
+                messages[section].append(message)
+        elif current is None:
+            continue
+        elif kind == 'number' and current['value'] is None:
+            current['value'] = float(token)
+            flaggable = True
+        elif kind == 'range' and current['reference'] is None:
+            low, high = RANGE_SPLIT.match(token).groups()
+            current['reference'] = (float(low), float(high))
+            flaggable = current['value'] is not None
+        elif kind == 'bound':
+            bound = float(BOUND_NUMBER.search(token).group())
+            if current['value'] is None:
+                # A censored result such as "<0.5"
+                current['value'] = bound
+            elif current['reference'] is None:
+                current['reference'] = (None, bound) if token[0] in '<≤' else (bound, None)
+            flaggable = True
+        elif kind == 'unit' and current['value'] is not None:
+            current['unit'] = token
+            flaggable = True
+
+    results = []
+    for entry in values:
+        if entry['value'] is None:
+            continue
+        reference = entry['reference'] or _usual_range(entry['analyte'], entry['unit'])
+        low, high = reference or (None, None)
+        entry['low'], entry['high'] = low, high
+        # A flag printed by the lab overrides the range check
+        entry['status'] = entry['flag'] or (_status(entry['value'], low, high) if reference else None)
+        del entry['reference']
+        results.append(entry)
+    return results, messages, words
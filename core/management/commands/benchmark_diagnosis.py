@@ -0,0 +1,84 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks.corpus import RECORD_MIXES, CorpusGenerator
+from core.benchmarks.runner import (
+    DEFAULT_GATED_METRICS, SCENARIOS, compare_reports, load_report, run_benchmarks, save_report,
+)
+
+COMPARABLE_META = ('seed', 'records', 'mix', 'knowledge_base')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the diagnosis pipeline on a seeded synthetic corpus (no network needed).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Corpus seed')
+        parser.add_argument('--records', type=int, default=2000, help='Number of synthetic patient records')
+        parser.add_argument('--mix', choices=sorted(RECORD_MIXES), default='mixed', help='Record mix')
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='Scenario to run (repeatable, default all)')
+        parser.add_argument('--warmup', type=int, default=50, help='Untimed calls before each scenario')
+        parser.add_argument('--repeat', type=int, default=1, help='Timed passes over the corpus')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+        parser.add_argument('--save-baseline', metavar='PATH', help='Write the report to a baseline file')
+        parser.add_argument('--compare', metavar='PATH', help='Fail if a gated metric regressed against this baseline')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Allowed regression as a fraction (default 0.2 = 20%%)')
+        parser.add_argument('--metrics', default=','.join(DEFAULT_GATED_METRICS), help='Comma-separated metrics to gate on')
+
+    def handle(self, *args, **options):
+        if options['records'] < 1:
+            raise CommandError('--records must be at least 1')
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = load_report(options['compare'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['compare']}: {e}")
+
+        records = CorpusGenerator(options['seed']).records(options['records'], mix=options['mix'])
+        report = run_benchmarks(
+            records,
+            scenarios=options['scenario'],
+            warmup=options['warmup'],
+            repeat=options['repeat'],
+            meta={'seed': options['seed'], 'records': options['records'], 'mix': options['mix']},
+        )
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._write_table(report)
+
+        if options['save_baseline']:
+            save_report(report, options['save_baseline'])
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {options['save_baseline']}"))
+
+        if baseline is not None:
+            for key in COMPARABLE_META:
+                if baseline.get('meta', {}).get(key) != report['meta'][key]:
+                    self.stderr.write(self.style.WARNING(
+                        f"Baseline {key} is {baseline.get('meta', {}).get(key)!r}, this run used {report['meta'][key]!r}"
+                    ))
+            metrics = [metric.strip() for metric in options['metrics'].split(',') if metric.strip()]
+            regressions = compare_reports(report, baseline, threshold=options['threshold'], metrics=metrics)
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(self.style.ERROR(regression))
+                raise CommandError(f'{len(regressions)} metric(s) regressed by more than {options["threshold"]:.0%}')
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
+
+    def _write_table(self, report):
+        meta = report['meta']
+        self.stdout.write(
+            f"{meta['records']} records, mix {meta['mix']}, seed {meta['seed']}, "
+            f"knowledge base {meta['knowledge_base']}, Python {meta['python']}"
+        )
+        self.stdout.write(
+            f"{'scenario':<30}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'records/s':>12}{'peak KiB':>11}"
+        )
+        for name, result in report['scenarios'].items():
+            self.stdout.write(
+                f"{name:<30}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+                f"{result['throughput_per_s']:>12.0f}{result['peak_memory_kib']:>11.1f}"
+            )
@@ -0,0 +1,94 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks.fake_provider import FakeProvider, add_fake_provider_arguments
+from core.benchmarks.load import SCENARIOS, run_provider_load
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the AI provider paths against the bundled fake provider (or another stand-in) '
+        'and report throughput and tail latency. Runs in a throwaway database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='Scenario to run (repeatable, default all)')
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests before each scenario')
+        parser.add_argument('--response-cache', action='store_true', help='Keep the provider response cache on')
+        parser.add_argument('--huggingface-url', help='Use this stand-in instead of starting the fake provider')
+        parser.add_argument('--openai-url', help='Use this stand-in instead of starting the fake provider')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+        add_fake_provider_arguments(parser)
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1 or options['warmup'] < 0:
+            raise CommandError('--requests and --concurrency must be at least 1 and --warmup not negative')
+        if bool(options['huggingface_url']) != bool(options['openai_url']):
+            raise CommandError('Give both --huggingface-url and --openai-url, or neither')
+
+        provider = None
+        if options['huggingface_url']:
+            huggingface_url, openai_url = options['huggingface_url'], options['openai_url']
+        else:
+            try:
+                provider = FakeProvider(
+                    latency=options['latency'],
+                    error_rate=options['error_rate'],
+                    drip_seconds=options['drip_seconds'],
+                    seed=options['seed'],
+                ).start()
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not start the fake provider: {e}')
+            huggingface_url, openai_url = provider.huggingface_url, provider.openai_url
+
+        try:
+            report = run_provider_load(
+                huggingface_url,
+                openai_url,
+                scenarios=options['scenario'],
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                warmup=options['warmup'],
+                response_cache=options['response_cache'],
+                seed=options['seed'] or 0,
+            )
+        finally:
+            if provider is not None:
+                provider.stop()
+        if provider is not None:
+            report['fake_provider'] = dict(
+                provider.stats(),
+                latency=options['latency'],
+                error_rate=options['error_rate'],
+                drip_seconds=options['drip_seconds'],
+            )
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._write_table(report)
+
+    def _write_table(self, report):
+        self.stdout.write(
+            f"{'scenario':<12}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+            f"{'max ms':>10}{'req/s':>9}"
+        )
+        for name, result in report['scenarios'].items():
+            self.stdout.write(
+                f"{name:<12}{result['requests']:>10}{result['errors']:>8}{result['p50_ms']:>10.1f}"
+                f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['max_ms']:>10.1f}"
+                f"{result['throughput_per_s']:>9.1f}"
+            )
+            for provider, metrics in result['providers'].items():
+                self.stdout.write(
+                    f"  {provider}: {metrics['requests']} calls, {metrics['successes']} answered, "
+                    f"{metrics['failures']} failed, {metrics['retries']} retries, "
+                    f"{metrics['short_circuited']} short-circuited, {metrics['deadline_exceeded']} past deadline, "
+                    f"circuit {metrics['breaker']['state']}"
+                )
+        if 'fake_provider' in report:
+            stats = report['fake_provider']
+            self.stdout.write(f"Fake provider served {stats['requests']} request(s): {stats['statuses']}")
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ai_analysis import MedicalImageAnalyzer
+from core.config import AIConfig
+from core.image_ingest import get_image_cache
+from core.report_text import prune_report_text_cache
+from core.result_store import prune_results
+
+
+class Command(BaseCommand):
+    help = (
+        'Evict stored report analyses that are outdated, unused for too long, or over the size budget, '
+        'and likewise the cached preprocessed images and report text.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age-days', type=int, default=AIConfig.ANALYSIS_RESULT_MAX_AGE_DAYS,
+            help='Evict results unused for this many days (0 keeps them)',
+        )
+        parser.add_argument(
+            '--max-bytes', type=int, default=AIConfig.ANALYSIS_RESULT_MAX_BYTES,
+            help='Evict the least recently used results beyond this total size (0 is unbounded)',
+        )
+        parser.add_argument(
+            '--image-max-age-days', type=int, default=AIConfig.IMAGE_CACHE_MAX_AGE_DAYS,
+            help='Evict cached images unused for this many days (0 keeps them)',
+        )
+        parser.add_argument(
+            '--image-max-bytes', type=int, default=AIConfig.IMAGE_CACHE_MAX_BYTES,
+            help='Evict the least recently used cached images beyond this total size (0 is unbounded)',
+        )
+        parser.add_argument(
+            '--text-max-age-days', type=int, default=AIConfig.REPORT_TEXT_CACHE_MAX_AGE_DAYS,
+            help='Evict cached report text unused for this many days (0 keeps it)',
+        )
+        parser.add_argument(
+            '--text-max-bytes', type=int, default=AIConfig.REPORT_TEXT_CACHE_MAX_BYTES,
+            help='Evict the least recently used cached report text beyond this total size (0 is unbounded)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many entries would be evicted')
+
+    def handle(self, *args, **options):
+        limits = ('max_age_days', 'max_bytes', 'image_max_age_days', 'image_max_bytes', 'text_max_age_days', 'text_max_bytes')
+        if any(options[limit] < 0 for limit in limits):
+            raise CommandError('Age and size limits cannot be negative')
+
+        evicted = prune_results(
+            current_versions=MedicalImageAnalyzer().analyzer_versions(),
+            max_age_days=options['max_age_days'],
+            max_bytes=options['max_bytes'],
+            dry_run=options['dry_run'],
+        )
+        images = get_image_cache().prune(
+            max_age_days=options['image_max_age_days'],
+            max_bytes=options['image_max_bytes'],
+            dry_run=options['dry_run'],
+        )
+        texts = prune_report_text_cache(
+            max_age_days=options['text_max_age_days'],
+            max_bytes=options['text_max_bytes'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would evict' if options['dry_run'] else 'Evicted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {evicted} stored analysis result(s)'))
+        self.stdout.write(self.style.SUCCESS(f'{verb} {images} cached image(s)'))
+        self.stdout.write(self.style.SUCCESS(f'{verb} {texts} cached report text(s)'))
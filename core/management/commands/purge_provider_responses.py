@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.config import AIConfig
+from core.models import ProviderResponse
+from core.response_cache import purge_responses
+
+
+class Command(BaseCommand):
+    help = 'Evict cached AI provider responses that are expired or over the size budget, or all of them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--provider', choices=[choice for choice, label in ProviderResponse.PROVIDER_CHOICES],
+            help='Only evict responses of this provider',
+        )
+        parser.add_argument(
+            '--ttl', type=int, default=AIConfig.PROVIDER_CACHE_TTL,
+            help='Evict responses older than this many seconds (0 keeps them)',
+        )
+        parser.add_argument(
+            '--max-bytes', type=int, default=AIConfig.PROVIDER_CACHE_MAX_BYTES,
+            help='Evict the least recently used responses beyond this total size (0 is unbounded)',
+        )
+        parser.add_argument('--all', action='store_true', help='Evict every cached response')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many responses would be evicted')
+
+    def handle(self, *args, **options):
+        if options['ttl'] < 0 or options['max_bytes'] < 0:
+            raise CommandError('--ttl and --max-bytes cannot be negative')
+
+        evicted = purge_responses(
+            provider=options['provider'],
+            ttl=options['ttl'],
+            max_bytes=options['max_bytes'],
+            purge_all=options['all'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would evict' if options['dry_run'] else 'Evicted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {evicted} cached provider response(s)'))
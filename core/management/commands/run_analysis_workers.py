@@ -0,0 +1,55 @@
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.analysis_jobs import requeue_stale_jobs, start_workers
+from core.config import AIConfig
+from core.model_registry import warm_up_configured_models
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of workers that analyze uploaded ECG, X-ray and lab reports in the background.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker threads')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping after the current jobs...')
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        failed = warm_up_configured_models()
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Could not warm up model(s) {', '.join(failed)}"))
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} abandoned job(s)'))
+
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        threads = start_workers(
+            options['workers'], stop_event, poll_interval=options['poll_interval'], once=options['once'], name=name,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Started {options['workers']} analysis worker(s) as {name}"))
+
+        # Supervise: look for abandoned jobs while the workers run
+        check_interval = max(AIConfig.ANALYSIS_JOB_TIMEOUT / 2, options['poll_interval'])
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=check_interval / len(threads))
+            if not stop_event.is_set() and not options['once']:
+                requeue_stale_jobs()
+        self.stdout.write(self.style.SUCCESS('Analysis workers stopped'))
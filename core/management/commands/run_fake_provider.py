@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks.fake_provider import FakeProvider, add_fake_provider_arguments
+
+
+class Command(BaseCommand):
+    help = 'Serve a local stand-in for the Hugging Face and OpenAI APIs, with injected latency and failures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+        add_fake_provider_arguments(parser)
+
+    def handle(self, *args, **options):
+        try:
+            provider = FakeProvider(
+                host=options['host'],
+                port=options['port'],
+                latency=options['latency'],
+                error_rate=options['error_rate'],
+                drip_seconds=options['drip_seconds'],
+                seed=options['seed'],
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not start the fake provider: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Fake provider listening on {provider.base_url}'))
+        self.stdout.write('Point the application at it with:')
+        self.stdout.write(f'  HUGGINGFACE_API_URL={provider.huggingface_url}')
+        self.stdout.write(f'  OPENAI_API_URL={provider.openai_url}')
+        try:
+            provider.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            provider.server.server_close()
+            stats = provider.stats()
+            self.stdout.write(f"Served {stats['requests']} request(s): {stats['statuses']}")
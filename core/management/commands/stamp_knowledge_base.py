@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.config import AIConfig
+from core.knowledge_base import KnowledgeBaseError, load_knowledge_base, write_knowledge_base
+
+
+class Command(BaseCommand):
+    help = 'Validate the medical knowledge base file and update its integrity checksum.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=None, help='Knowledge base file (defaults to AIConfig.KNOWLEDGE_BASE_PATH)')
+        parser.add_argument('--check', action='store_true', help='Only verify the existing checksum')
+
+    def handle(self, *args, **options):
+        path = options['path'] or AIConfig.KNOWLEDGE_BASE_PATH
+        try:
+            if options['check']:
+                knowledge_base = load_knowledge_base(path)
+                self.stdout.write(self.style.SUCCESS(f'{path} is valid ({knowledge_base.version}, {knowledge_base.checksum})'))
+                return
+            with open(path, 'r', encoding='utf-8') as f:
+                document = json.load(f)
+            checksum = write_knowledge_base(document, path)
+        except KnowledgeBaseError as e:
+            raise CommandError(f'Invalid knowledge base {path}: {e}')
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Stamped {path} with {checksum}'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.model_registry import get_model_registry
+
+
+class Command(BaseCommand):
+    help = 'Load the local AI models and report their load time and memory use.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', help='Model to load (repeatable, default all)')
+
+    def handle(self, *args, **options):
+        registry = get_model_registry()
+        unknown = [name for name in options['model'] or [] if name not in registry]
+        if unknown:
+            raise CommandError(f"Unknown model(s) {', '.join(unknown)}; registered: {', '.join(registry.names())}")
+
+        failed = registry.warm_up(options['model'])
+
+        self.stdout.write(f"{'model':<22}{'loaded':>8}{'load s':>10}{'memory KiB':>12}{'file bytes':>12}")
+        for name, stats in registry.stats().items():
+            if options['model'] and name not in options['model']:
+                continue
+            self.stdout.write(
+                f"{name:<22}{'yes' if stats['loaded'] else 'no':>8}"
+                f"{'-' if stats['load_seconds'] is None else stats['load_seconds']:>10}"
+                f"{'-' if stats['memory_kib'] is None else stats['memory_kib']:>12}"
+                f"{'-' if stats['size_bytes'] is None else stats['size_bytes']:>12}"
+            )
+            if stats['error']:
+                self.stderr.write(self.style.ERROR(f"  {stats['error']}"))
+        if failed:
+            raise CommandError(f"{len(failed)} model(s) could not be loaded")
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_patientrecord_analysis_status_analysisjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64)),
+                ('modality', models.CharField(choices=[('ecg', 'ECG'), ('xray', 'X-ray'), ('report', 'Medical report')], max_length=10)),
+                ('analyzer_version', models.CharField(max_length=50)),
+                ('result', models.JSONField()),
+                ('size_bytes', models.PositiveIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Analysis Result',
+                'verbose_name_plural': 'Analysis Results',
+                'indexes': [models.Index(fields=['last_used_at'], name='core_analys_last_us_d99f6b_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='analysisresult',
+            constraint=models.UniqueConstraint(fields=('digest', 'modality', 'analyzer_version'), name='unique_analysis_result'),
+        ),
+    ]
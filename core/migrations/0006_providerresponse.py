@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:13
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_analysisresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('huggingface', 'Hugging Face'), ('openai', 'OpenAI')], max_length=20)),
+                ('model_id', models.CharField(max_length=200)),
+                ('prompt_version', models.CharField(max_length=20)),
+                ('payload_hash', models.CharField(max_length=64)),
+                ('response', models.JSONField()),
+                ('size_bytes', models.PositiveIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Provider Response',
+                'verbose_name_plural': 'Provider Responses',
+                'indexes': [models.Index(fields=['created_at'], name='core_provid_created_c4bd4d_idx'), models.Index(fields=['last_used_at'], name='core_provid_last_us_795b61_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='providerresponse',
+            constraint=models.UniqueConstraint(fields=('provider', 'model_id', 'prompt_version', 'payload_hash'), name='unique_provider_response'),
+        ),
+    ]
@@ -0,0 +1,185 @@
+# Lazily loaded local AI models, one copy per process
+
+import logging
+import os
+import resource
+import threading
+import time
+
+from .config import AIConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ModelUnavailable(RuntimeError):
+    """Raised when a registered model cannot be loaded."""
+
+
+def load_joblib_model(path):
+    """Load a joblib pickle with its NumPy arrays memory-mapped read-only.
+
+    Mapped pages are backed by the file, so workers forked after loading
+    (or loading the same file) share them instead of holding private copies.
+    """
+    import joblib
+    return joblib.load(path, mmap_mode='r')
+
+
+def load_keras_model(path):
+    """Load a Keras HDF5 model for inference only.
+
+    The weights are copied into TensorFlow's own heap, so every process holds
+    a private copy; TensorFlow is also not fork-safe once initialized, so
+    each worker process has to load the model itself.
+    """
+    from tensorflow.keras.models import load_model
+    return load_model(path, compile=False)
+
+
+def _resident_bytes():
+    """Current resident set size of the process, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelRegistry:
+    """Registered models, each loaded on first use and then shared by every thread.
+
+    Loader imports (joblib, TensorFlow) happen inside the loaders, so nothing
+    heavy is imported until a model is actually requested. A failed load is
+    remembered and raised again as ModelUnavailable until ``reload``.
+    """
+
+    def __init__(self):
+        self._specs = {}
+        self._models = {}
+        self._errors = {}
+        self._stats = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, path, loader):
+        with self._lock:
+            self._specs[name] = (path, loader)
+            self._locks[name] = threading.Lock()
+            self._models.pop(name, None)
+            self._errors.pop(name, None)
+            self._stats.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def names(self):
+        return list(self._specs)
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name):
+        """Return the loaded model, loading it first if needed."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._specs:
+            raise KeyError(f'No model registered as {name!r}')
+
+        with self._locks[name]:
+            # Another thread may have finished loading while this one waited
+            if name in self._models:
+                return self._models[name]
+            if name in self._errors:
+                raise ModelUnavailable(self._errors[name])
+            return self._load(name)
+
+    def _load(self, name):
+        path, loader = self._specs[name]
+        resident_before = _resident_bytes()
+        start = time.perf_counter()
+        try:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f'{path} does not exist')
+            model = loader(path)
+        except Exception as e:
+            self._errors[name] = f'Could not load model {name!r} from {path}: {e}'
+            logger.error(self._errors[name])
+            raise ModelUnavailable(self._errors[name])
+        load_seconds = time.perf_counter() - start
+        resident_after = _resident_bytes()
+
+        self._stats[name] = {
+            'load_seconds': round(load_seconds, 4),
+            'memory_kib': (
+                round((resident_after - resident_before) / 1024, 1)
+                if resident_before is not None and resident_after is not None else None
+            ),
+        }
+        self._models[name] = model
+        logger.info(f"Loaded model {name!r} from {path} in {load_seconds:.3f}s")
+        return model
+
+    def reload(self, name):
+        """Drop a model (or its load failure) so the next ``get`` loads it again."""
+        with self._locks[name]:
+            self._models.pop(name, None)
+            self._errors.pop(name, None)
+            self._stats.pop(name, None)
+
+    def warm_up(self, names=None):
+        """Load the named models (all by default) now; returns the names that failed."""
+        failed = []
+        for name in names or self.names():
+            try:
+                self.get(name)
+            except ModelUnavailable:
+                failed.append(name)
+        return failed
+
+    def stats(self):
+        """Return each model's path, file size, load state, load time and resident memory growth."""
+        report = {}
+        for name, (path, loader) in self._specs.items():
+            try:
+                size_bytes = os.path.getsize(path)
+            except OSError:
+                size_bytes = None
+            report[name] = dict(
+                {'path': path, 'size_bytes': size_bytes, 'loaded': name in self._models, 'error': self._errors.get(name)},
+                **self._stats.get(name, {'load_seconds': None, 'memory_kib': None}),
+            )
+        return report
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """Return the process-wide registry with the models configured in AIConfig."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = ModelRegistry()
+                registry.register('symptom_classifier', AIConfig.SYMPTOM_CLASSIFIER_PATH, load_joblib_model)
+                registry.register('ecg_model', AIConfig.ECG_MODEL_PATH, load_keras_model)
+                registry.register('xray_model', AIConfig.XRAY_MODEL_PATH, load_keras_model)
+                _registry = registry
+    return _registry
+
+
+def warm_up_configured_models():
+    """Load the models named in MODEL_WARM_UP ('all' for every model); returns the names that failed.
+
+    Called by the server and worker entry points (the WSGI application and
+    run_analysis_workers), never on import, so other management commands do
+    not load models.
+    """
+    if not AIConfig.MODEL_WARM_UP:
+        return []
+    names = None if AIConfig.MODEL_WARM_UP == 'all' else [
+        name.strip() for name in AIConfig.MODEL_WARM_UP.split(',') if name.strip()
+    ]
+    return get_model_registry().warm_up(names)
@@ -4,6 +4,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 import os
+from .vitals import classify_vitals, record_vitals
 
 class PatientRecord(models.Model):
     """Model for storing patient medical records and diagnosis."""
@@ -25,6 +26,14 @@ class PatientRecord(models.Model):
         ('O-', 'O-'),
     ]
     
+    ANALYSIS_STATUS_CHOICES = [
+        ('none', 'No reports to analyze'),
+        ('pending', 'Pending analysis'),
+        ('running', 'Analyzing reports'),
+        ('complete', 'Analysis complete'),
+        ('failed', 'Analysis failed'),
+    ]
+    
     # Patient Information
     patient_name = models.CharField(max_length=100)
     age = models.IntegerField()
@@ -60,6 +69,9 @@ class PatientRecord(models.Model):
     treatment_plan = models.TextField(blank=True)
     prescribed_medications = models.TextField(blank=True)
     
+    # Background analysis of uploaded reports
+    analysis_status = models.CharField(max_length=10, choices=ANALYSIS_STATUS_CHOICES, default='none')
+    
     # Metadata
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(default=timezone.now)
@@ -86,48 +98,131 @@ class PatientRecord(models.Model):
             return f"--/{self.diastolic_bp} mmHg"
         return "Not recorded"
     
+    # Badge shown for each abnormal vital sign outcome
+    VITAL_STATUS_LABELS = {
+        ('temperature', 'low'): "Low temperature",
+        ('temperature', 'high'): "Fever",
+        ('blood_pressure', 'low'): "Low blood pressure",
+        ('blood_pressure', 'high'): "High blood pressure",
+        ('pulse_rate', 'low'): "Bradycardia",
+        ('pulse_rate', 'high'): "Tachycardia",
+        ('oxygen_saturation', 'low'): "Low oxygen saturation",
+    }
+    
     def get_vital_status(self):
         """Get overall vital signs status."""
-        status = []
-        
-        # Temperature check
-        if self.temperature:
-            if self.temperature < 36.0:
-                status.append("Low temperature")
-            elif self.temperature > 37.5:
-                status.append("Fever")
-        
-        # Blood pressure check
-        if self.systolic_bp and self.diastolic_bp:
-            if self.systolic_bp < 90 or self.diastolic_bp < 60:
-                status.append("Low blood pressure")
-            elif self.systolic_bp > 140 or self.diastolic_bp > 90:
-                status.append("High blood pressure")
-        
-        # Pulse rate check
-        if self.pulse_rate:
-            if self.pulse_rate < 60:
-                status.append("Bradycardia")
-            elif self.pulse_rate > 100:
-                status.append("Tachycardia")
-        
-        # Oxygen saturation check
-        if self.oxygen_saturation:
-            if self.oxygen_saturation < 95:
-                status.append("Low oxygen saturation")
-        
+        status = [
+            self.VITAL_STATUS_LABELS[(vital, outcome)]
+            for vital, outcome in classify_vitals(record_vitals(self)).items()
+            if (vital, outcome) in self.VITAL_STATUS_LABELS
+        ]
         return status if status else ["Normal"]
     
     def delete(self, *args, **kwargs):
-        """Override delete to clean up uploaded files."""
+        """Override delete to clean up uploaded files and the cached data derived from them."""
+        from .image_ingest import file_digest, get_image_cache
+        from .report_text import discard_report_text
+        
         # Delete uploaded files when record is deleted
-        if self.ecg_report:
-            if os.path.exists(self.ecg_report.path):
-                os.remove(self.ecg_report.path)
-        if self.lab_report:
-            if os.path.exists(self.lab_report.path):
-                os.remove(self.lab_report.path)
-        if self.xray_report:
-            if os.path.exists(self.xray_report.path):
-                os.remove(self.xray_report.path)
+        for report in (self.ecg_report, self.lab_report, self.xray_report):
+            if report and os.path.exists(report.path):
+                # Cached preprocessed images and extracted text hold the same patient data
+                digest = file_digest(report.path)
+                get_image_cache().discard(digest)
+                discard_report_text(digest)
+                os.remove(report.path)
         super().delete(*args, **kwargs)
+
+class AnalysisJob(models.Model):
+    """Queued analysis of the reports uploaded with a patient record."""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+    
+    patient_record = models.ForeignKey(PatientRecord, on_delete=models.CASCADE, related_name='analysis_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    
+    # Symptom and vital signs diagnosis the report findings are merged into
+    payload = models.JSONField(default=dict)
+    
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['available_at', 'id']
+        indexes = [models.Index(fields=['status', 'available_at'])]
+        verbose_name = 'Analysis Job'
+        verbose_name_plural = 'Analysis Jobs'
+    
+    def __str__(self):
+        return f"Analysis of {self.patient_record} ({self.status})"
+
+class AnalysisResult(models.Model):
+    """Stored analyzer output for a report file, keyed by the file's content hash."""
+    
+    MODALITY_CHOICES = [
+        ('ecg', 'ECG'),
+        ('xray', 'X-ray'),
+        ('report', 'Medical report'),
+    ]
+    
+    digest = models.CharField(max_length=64)  # SHA-256 of the file bytes
+    modality = models.CharField(max_length=10, choices=MODALITY_CHOICES)
+    analyzer_version = models.CharField(max_length=50)
+    result = models.JSONField()
+    size_bytes = models.PositiveIntegerField(default=0)  # serialized result size, for eviction
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['digest', 'modality', 'analyzer_version'], name='unique_analysis_result'),
+        ]
+        indexes = [models.Index(fields=['last_used_at'])]
+        verbose_name = 'Analysis Result'
+        verbose_name_plural = 'Analysis Results'
+    
+    def __str__(self):
+        return f"{self.get_modality_display()} {self.digest[:12]} (v{self.analyzer_version})"
+
+
+class ProviderResponse(models.Model):
+    """Cached response of an external AI provider, keyed by the request that produced it."""
+    
+    PROVIDER_CHOICES = [
+        ('huggingface', 'Hugging Face'),
+        ('openai', 'OpenAI'),
+    ]
+    
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
+    model_id = models.CharField(max_length=200)
+    prompt_version = models.CharField(max_length=20)
+    payload_hash = models.CharField(max_length=64)  # SHA-256 of the request payload
+    response = models.JSONField()
+    size_bytes = models.PositiveIntegerField(default=0)  # serialized response size, for eviction
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['provider', 'model_id', 'prompt_version', 'payload_hash'], name='unique_provider_response',
+            ),
+        ]
+        indexes = [models.Index(fields=['created_at']), models.Index(fields=['last_used_at'])]
+        verbose_name = 'Provider Response'
+        verbose_name_plural = 'Provider Responses'
+    
+    def __str__(self):
+        return f"{self.get_provider_display()} {self.model_id} {self.payload_hash[:12]} (v{self.prompt_version})"
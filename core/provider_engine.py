@@ -0,0 +1,60 @@
+# Concurrent outbound AI provider calls under one deadline, for async and sync callers
+
+import asyncio
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+
+from .config import AIConfig
+from .executors import get_executor, run_releasing_connections
+
+logger = logging.getLogger(__name__)
+
+
+async def run_provider_calls(calls, deadline):
+    """Run provider calls concurrently and return the results of those that finish by ``deadline``.
+
+    ``calls`` maps a name to a function taking the deadline (a
+    time.monotonic() value) and returning an analysis dict or None. The
+    calls are blocking ``requests`` calls run on a shared thread pool, so
+    only the wait is asynchronous. Calls still outstanding at the deadline
+    are left out of the result, so the caller keeps its local analysis, but
+    cancellation is best-effort: a call already sending its request cannot
+    be interrupted and keeps its thread until it returns. Its connect and
+    read timeouts are cut to end at the deadline, which bounds the overrun
+    unless the provider keeps trickling bytes. Calls that fail or return
+    anything but a dict are left out too.
+    """
+    if not calls:
+        return {}
+    loop = asyncio.get_running_loop()
+    executor = get_executor('provider', AIConfig.PROVIDER_CALL_WORKERS)
+    started = time.monotonic()
+    tasks = {name: loop.run_in_executor(executor, run_releasing_connections, call, deadline) for name, call in calls.items()}
+    done, pending = await asyncio.wait(tasks.values(), timeout=max(0.0, deadline - started))
+    for task in pending:
+        task.cancel()
+
+    results = {}
+    for name, task in tasks.items():
+        if task in pending:
+            logger.warning(f"{name} provider call missed the deadline; its result will be discarded")
+        elif task.exception() is not None:
+            logger.error(f"{name} provider call failed: {task.exception()}")
+        elif isinstance(task.result(), dict):
+            results[name] = task.result()
+        elif task.result() is not None:
+            logger.error(f"{name} provider call returned {type(task.result()).__name__}, not an analysis dict")
+    logger.info(
+        f"Provider calls finished in {time.monotonic() - started:.3f}s: "
+        f"{len(results)} answered, {len(pending)} cancelled of {len(tasks)}"
+    )
+    return results
+
+
+def run_provider_calls_sync(calls, deadline):
+    """Blocking bridge to ``run_provider_calls`` for synchronous views and workers."""
+    if not calls:
+        return {}
+    return async_to_sync(run_provider_calls)(calls, deadline)
@@ -0,0 +1,233 @@
+# Text extraction from uploaded lab reports, by detected file format
+
+import codecs
+import logging
+import os
+import re
+import tempfile
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+from .config import AIConfig
+from .file_cache import discard_digest, mark_used, prune_cache_dir
+from .image_ingest import PDF_HEADER_SIZE, PDF_MAGIC, file_digest, pdfium
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction changes so stale cached text is not reused
+EXTRACTOR_VERSION = 1
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of image formats, which carry no extractable text
+IMAGE_MAGICS = (
+    b'\xff\xd8\xff',  # JPEG
+    b'\x89PNG\r\n\x1a\n',
+    b'GIF87a', b'GIF89a',
+    b'BM',
+    b'II*\x00', b'MM\x00*',  # TIFF
+)
+ZIP_MAGIC = b'PK\x03\x04'
+OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # legacy .doc
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DOCX_DOCUMENT = 'word/document.xml'
+
+# Legacy Word documents keep their text as 8-bit or UTF-16LE runs between binary structures
+DOC_TEXT_RUN = re.compile(rb'(?:[\x20-\x7e\t\r\n]\x00){4,}|[\x20-\x7e\t\r\n]{4,}')
+# Longest byte string that can start a run without matching yet: three UTF-16 characters and a byte
+RUN_PREFIX_BYTES = 7
+
+
+class ReportUnreadable(ValueError):
+    """Raised for report files whose text cannot be extracted."""
+
+
+def detect_format(path):
+    """Return 'pdf', 'docx', 'doc', 'image' or 'text' from a file's leading bytes."""
+    with open(path, 'rb') as f:
+        header = f.read(PDF_HEADER_SIZE)
+    if header.startswith(ZIP_MAGIC):
+        return 'docx'
+    if header.startswith(OLE2_MAGIC):
+        return 'doc'
+    if header.startswith(IMAGE_MAGICS) or (header.startswith(b'RIFF') and header[8:12] == b'WEBP'):
+        return 'image'
+    if PDF_MAGIC in header:
+        return 'pdf'
+    return 'text'
+
+
+def _limited(pieces, max_chars):
+    """Join text pieces, stopping once ``max_chars`` characters are collected."""
+    collected, size = [], 0
+    for piece in pieces:
+        collected.append(piece[:max_chars - size])
+        size += len(collected[-1])
+        if size >= max_chars:
+            break
+    return ''.join(collected)
+
+
+def _text_pieces(path):
+    decoder = None
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            if decoder is None:
+                # UTF-16 files start with a byte order mark; other text never contains NUL
+                if chunk.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+                    decoder = codecs.getincrementaldecoder('utf-16')(errors='replace')
+                elif b'\x00' in chunk:
+                    raise ReportUnreadable('Unrecognized binary file')
+                else:
+                    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+            yield decoder.decode(chunk)
+    if decoder is not None:
+        yield decoder.decode(b'', final=True)
+
+
+def _pdf_pieces(path):
+    if pdfium is None:
+        raise ReportUnreadable('PDF reports need the pypdfium2 package')
+    try:
+        document = pdfium.PdfDocument(path)
+    except pdfium.PdfiumError as e:
+        raise ReportUnreadable(f'Not a readable PDF: {e}')
+    try:
+        # Pages are loaded one at a time and released before the next
+        for index in range(len(document)):
+            page = document[index]
+            try:
+                text_page = page.get_textpage()
+                try:
+                    yield text_page.get_text_bounded() + '\n'
+                finally:
+                    text_page.close()
+            finally:
+                page.close()
+    except pdfium.PdfiumError as e:
+        raise ReportUnreadable(f'Could not read PDF text: {e}')
+    finally:
+        document.close()
+
+
+def _docx_pieces(path):
+    try:
+        with zipfile.ZipFile(path) as archive, archive.open(DOCX_DOCUMENT) as document:
+            # Parse the document XML as a stream, dropping each paragraph once read
+            for event, element in iterparse(document, events=('end',)):
+                if element.tag == f'{WORD_NAMESPACE}t':
+                    yield element.text or ''
+                elif element.tag == f'{WORD_NAMESPACE}tab':
+                    yield '\t'
+                elif element.tag == f'{WORD_NAMESPACE}p':
+                    yield '\n'
+                    element.clear()
+    except KeyError:
+        raise ReportUnreadable('ZIP archive is not a Word document')
+    except (zipfile.BadZipFile, SyntaxError) as e:
+        raise ReportUnreadable(f'Not a readable Word document: {e}')
+
+
+def _decode_run(run):
+    return (run.decode('utf-16-le') if run[1:2] == b'\x00' else run.decode('ascii')) + '\n'
+
+
+def _doc_pieces(path):
+    with open(path, 'rb') as f:
+        # Carry over to the next chunk a run that may continue there, and the
+        # last bytes in case a run too short to match yet starts in them
+        tail = b''
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            data = tail + chunk
+            end = 0
+            for match in DOC_TEXT_RUN.finditer(data):
+                # Ending one byte short may be mid UTF-16 character
+                if match.end() >= len(data) - 1:
+                    end = match.start()
+                    if len(data) - end >= READ_CHUNK_SIZE:
+                        # A run of a chunk or more is emitted in pieces; the
+                        # carried piece keeps enough characters to match again
+                        end = match.end() - RUN_PREFIX_BYTES - 1
+                        yield _decode_run(data[match.start():end])
+                    break
+                yield _decode_run(match.group())
+                end = match.end()
+            else:
+                end = max(end, len(data) - RUN_PREFIX_BYTES)
+            tail = data[end:]
+        for match in DOC_TEXT_RUN.finditer(tail):
+            yield _decode_run(match.group())
+
+
+EXTRACTORS = {
+    'text': _text_pieces,
+    'pdf': _pdf_pieces,
+    'docx': _docx_pieces,
+    'doc': _doc_pieces,
+}
+
+
+def extract_text(path, max_chars=None):
+    """Extract up to ``max_chars`` characters (REPORT_MAX_CHARS) of text from a report file.
+
+    Raises ReportUnreadable for images and for files that do not parse as
+    their detected format.
+    """
+    max_chars = AIConfig.REPORT_MAX_CHARS if max_chars is None else max_chars
+    file_format = detect_format(path)
+    if file_format == 'image':
+        raise ReportUnreadable('Image reports have no extractable text')
+    return _limited(EXTRACTORS[file_format](path), max_chars)
+
+
+def load_report_text(path, digest=None):
+    """Return the text of a report file, cached in REPORT_TEXT_CACHE_DIR by the file's SHA-256."""
+    directory = AIConfig.REPORT_TEXT_CACHE_DIR
+    if not directory:
+        return extract_text(path)
+
+    digest = digest or file_digest(path)
+    cache_path = os.path.join(
+        directory, digest[:2], f'{digest}-{AIConfig.REPORT_MAX_CHARS}-v{EXTRACTOR_VERSION}.txt'
+    )
+    try:
+        with open(cache_path, 'r', encoding='utf-8', newline='') as f:
+            text = f.read()
+        mark_used(cache_path)
+        return text
+    except FileNotFoundError:
+        pass
+    except (OSError, UnicodeDecodeError) as e:
+        logger.warning(f"Discarding unreadable report text cache entry {cache_path}: {e}")
+
+    text = extract_text(path)
+    try:
+        # Write to a temporary file and rename it, so readers never see partial text
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError as e:
+        logger.warning(f"Could not cache report text {cache_path}: {e}")
+    return text
+
+
+def prune_report_text_cache(max_age_days=None, max_bytes=None, dry_run=False):
+    """Evict cached report text unused for ``max_age_days`` or beyond ``max_bytes`` in total; returns how many."""
+    return prune_cache_dir(
+        AIConfig.REPORT_TEXT_CACHE_DIR,
+        max_age_days=AIConfig.REPORT_TEXT_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days,
+        max_bytes=AIConfig.REPORT_TEXT_CACHE_MAX_BYTES if max_bytes is None else max_bytes,
+        dry_run=dry_run,
+    )
+
+
+def discard_report_text(digest):
+    """Delete the cached text of a report file, at every length and extractor version."""
+    return discard_digest(AIConfig.REPORT_TEXT_CACHE_DIR, digest)
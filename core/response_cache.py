@@ -0,0 +1,88 @@
+# Persistent cache of external AI provider responses, keyed by request
+
+import hashlib
+import itertools
+import json
+import logging
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .cache_tables import entry_size, evict_entries, insert_entry, use_entry
+from .config import AIConfig
+from .models import ProviderResponse
+
+logger = logging.getLogger(__name__)
+
+# Expired and over-budget responses are evicted after every this many new entries
+PURGE_EVERY_INSERTS = 100
+
+_inserts = itertools.count(1)
+
+
+def payload_hash(payload):
+    """SHA-256 of a JSON-serializable request payload, independent of key order."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_response(provider, model_id, prompt_version, digest):
+    """Return the cached response to a request, or None; expired entries and lookup errors are misses."""
+    if not AIConfig.PROVIDER_CACHE_ENABLED:
+        return None
+    try:
+        entries = ProviderResponse.objects.filter(
+            provider=provider, model_id=model_id, prompt_version=prompt_version, payload_hash=digest,
+        )
+        if AIConfig.PROVIDER_CACHE_TTL:
+            entries = entries.filter(created_at__gte=timezone.now() - timedelta(seconds=AIConfig.PROVIDER_CACHE_TTL))
+        return use_entry(entries, 'response')
+    except DatabaseError as e:
+        logger.warning(f"Provider response lookup failed: {e}")
+        return None
+
+
+def store_response(provider, model_id, prompt_version, digest, response):
+    """Cache a provider response, replacing an expired entry for the same request.
+
+    Every PURGE_EVERY_INSERTS new entries (per process), the cache is purged
+    back under PROVIDER_CACHE_TTL and PROVIDER_CACHE_MAX_BYTES.
+    """
+    if not AIConfig.PROVIDER_CACHE_ENABLED:
+        return
+    key = {'provider': provider, 'model_id': model_id, 'prompt_version': prompt_version, 'payload_hash': digest}
+    now = timezone.now()
+    try:
+        fields = {'response': response, 'size_bytes': entry_size(response), 'created_at': now, 'last_used_at': now}
+        if not insert_entry(ProviderResponse, key, fields):
+            # An expired entry, or a concurrent store of the same request, holds the key
+            ProviderResponse.objects.filter(**key).update(**fields)
+            return
+    except (DatabaseError, TypeError, ValueError) as e:
+        logger.warning(f"Could not cache provider response: {e}")
+        return
+
+    if next(_inserts) % PURGE_EVERY_INSERTS == 0:
+        try:
+            purge_responses()
+        except DatabaseError as e:
+            logger.warning(f"Could not purge cached provider responses: {e}")
+
+
+def purge_responses(provider=None, ttl=None, max_bytes=None, purge_all=False, dry_run=False):
+    """Evict cached responses and return how many were (or, with ``dry_run``, would be) deleted.
+
+    With ``purge_all`` every response (of ``provider``, if given) is evicted.
+    Otherwise responses older than ``ttl`` seconds and the least recently
+    used responses beyond a total of ``max_bytes`` are.
+    """
+    ttl = AIConfig.PROVIDER_CACHE_TTL if ttl is None else ttl
+    max_bytes = AIConfig.PROVIDER_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = ProviderResponse.objects.all()
+    if provider:
+        entries = entries.filter(provider=provider)
+
+    if purge_all:
+        return evict_entries(entries, stale=[entries], dry_run=dry_run)
+    stale = [entries.filter(created_at__lt=timezone.now() - timedelta(seconds=ttl))] if ttl else []
+    return evict_entries(entries, stale=stale, max_bytes=max_bytes, dry_run=dry_run)
@@ -0,0 +1,60 @@
+# Persistent analyzer results keyed by report file content
+
+import logging
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .cache_tables import entry_size, evict_entries, insert_entry, use_entry
+from .config import AIConfig
+from .models import AnalysisResult
+
+logger = logging.getLogger(__name__)
+
+
+def get_result(digest, modality, analyzer_version):
+    """Return the stored analysis of a file, or None; lookup errors count as misses."""
+    if not AIConfig.ANALYSIS_RESULT_STORE_ENABLED:
+        return None
+    try:
+        return use_entry(
+            AnalysisResult.objects.filter(digest=digest, modality=modality, analyzer_version=analyzer_version),
+            'result',
+        )
+    except DatabaseError as e:
+        logger.warning(f"Analysis result lookup failed: {e}")
+        return None
+
+
+def store_result(digest, modality, analyzer_version, result):
+    """Store the analysis of a file; a concurrent store of the same key wins."""
+    if not AIConfig.ANALYSIS_RESULT_STORE_ENABLED:
+        return
+    try:
+        insert_entry(
+            AnalysisResult,
+            {'digest': digest, 'modality': modality, 'analyzer_version': analyzer_version},
+            {'result': result, 'size_bytes': entry_size(result)},
+        )
+    except (DatabaseError, TypeError, ValueError) as e:
+        logger.warning(f"Could not store analysis result: {e}")
+
+
+def prune_results(current_versions=None, max_age_days=None, max_bytes=None, dry_run=False):
+    """Evict stored results and return how many were (or, with ``dry_run``, would be) deleted.
+
+    Results from other analyzer versions (when ``current_versions`` maps
+    modality to version), results unused for ``max_age_days``, and the least
+    recently used results beyond a total of ``max_bytes`` are evicted.
+    """
+    max_age_days = AIConfig.ANALYSIS_RESULT_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    max_bytes = AIConfig.ANALYSIS_RESULT_MAX_BYTES if max_bytes is None else max_bytes
+
+    stale = [
+        AnalysisResult.objects.filter(modality=modality).exclude(analyzer_version=version)
+        for modality, version in (current_versions or {}).items()
+    ]
+    if max_age_days:
+        stale.append(AnalysisResult.objects.filter(last_used_at__lt=timezone.now() - timedelta(days=max_age_days)))
+    return evict_entries(AnalysisResult.objects.all(), stale=stale, max_bytes=max_bytes, dry_run=dry_run)
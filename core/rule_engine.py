@@ -0,0 +1,40 @@
+# Decision-table evaluation of keyword diagnosis rules
+
+from .text_matching import PhraseMatcher
+
+
+class RuleEngine:
+    """Evaluate an ordered keyword rule table in a single pass over the text.
+
+    Rules are listed in priority order and the first rule with a keyword
+    occurring in the text wins, exactly like a chain of
+    ``any(word in text for word in keywords)`` checks. All keywords are
+    compiled into one matcher and each keyword maps to the best-priority
+    rule using it, so evaluation costs one scan however many rules there are.
+    """
+
+    def __init__(self, rules, default_rule):
+        self.rules = tuple(rules)
+        self.default_rule = default_rule
+        self.matcher = PhraseMatcher(keyword for rule in self.rules for keyword in rule['keywords'])
+
+        priorities = {}
+        for priority, rule in enumerate(self.rules):
+            for keyword in rule['keywords']:
+                priorities.setdefault(keyword.lower(), priority)
+        self._keyword_priority = tuple(priorities[phrase] for phrase in self.matcher.phrases)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match_index(self, text):
+        """Return the priority of the winning rule, or None when no rule matches."""
+        keyword_ids = self.matcher.match_ids(text)
+        if not keyword_ids:
+            return None
+        return min(self._keyword_priority[keyword_id] for keyword_id in keyword_ids)
+
+    def evaluate(self, text):
+        """Return the first rule matching ``text``, else the default rule."""
+        index = self.match_index(text)
+        return self.default_rule if index is None else self.rules[index]
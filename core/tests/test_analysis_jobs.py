@@ -0,0 +1,131 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.test import TestCase
+from django.utils import timezone
+
+from core import analysis_jobs
+from core.analysis_jobs import claim_job, enqueue_analysis, requeue_stale_jobs, run_job, work
+from core.config import AIConfig
+from core.models import AnalysisJob, PatientRecord
+
+
+class AnalysisJobQueueTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('doctor', password='secret')
+        self.record = PatientRecord.objects.create(
+            patient_name='Test Patient', age=40, gender='F', symptoms='fever', created_by=user, analysis_status='pending',
+        )
+        diagnosis = {
+            'diagnosis': 'Fever', 'confidence': 0.5, 'recommended_tests': 'CBC', 'treatment_plan': 'Rest',
+            'medications': [{'name': 'Paracetamol', 'dosage': '500mg', 'frequency': 'Twice daily', 'duration': '3 days'}],
+        }
+        self.job = enqueue_analysis(self.record, diagnosis, ['Symptom analysis'])
+
+    def make_stale(self):
+        AnalysisJob.objects.filter(pk=self.job.pk).update(
+            started_at=timezone.now() - timedelta(seconds=AIConfig.ANALYSIS_JOB_TIMEOUT + 1),
+        )
+
+    def test_claim_is_exclusive(self):
+        job = claim_job('worker-a')
+        self.assertEqual((job.pk, job.status, job.worker, job.attempts), (self.job.pk, 'running', 'worker-a', 1))
+        self.assertEqual(PatientRecord.objects.get(pk=self.record.pk).analysis_status, 'running')
+        self.assertIsNone(claim_job('worker-b'))
+
+    def test_claim_waits_for_available_at(self):
+        AnalysisJob.objects.filter(pk=self.job.pk).update(available_at=timezone.now() + timedelta(minutes=1))
+        self.assertIsNone(claim_job('worker-a'))
+
+    def test_run_job_stores_the_diagnosis(self):
+        self.assertTrue(run_job(claim_job('worker-a'), analyzer=None))
+        job = AnalysisJob.objects.get(pk=self.job.pk)
+        record = PatientRecord.objects.get(pk=self.record.pk)
+        self.assertEqual(job.status, 'complete')
+        self.assertEqual(record.analysis_status, 'complete')
+        self.assertEqual(record.ai_diagnosis, 'Fever\n\nAI Analysis:\nSymptom analysis')
+        self.assertIn('Paracetamol - 500mg', record.prescribed_medications)
+
+    def test_failed_job_is_retried_then_failed(self):
+        with mock.patch.object(analysis_jobs, 'analyze_uploaded_reports', side_effect=RuntimeError('boom')), \
+                self.assertLogs('core.analysis_jobs', 'ERROR'):
+            for attempt in range(1, AIConfig.ANALYSIS_JOB_MAX_ATTEMPTS + 1):
+                AnalysisJob.objects.filter(pk=self.job.pk).update(available_at=timezone.now())
+                job = claim_job('worker-a')
+                self.assertEqual(job.attempts, attempt)
+                self.assertFalse(run_job(job, analyzer=None))
+                job.refresh_from_db()
+                expected = 'pending' if attempt < AIConfig.ANALYSIS_JOB_MAX_ATTEMPTS else 'failed'
+                self.assertEqual((job.status, job.error), (expected, 'boom'))
+                self.assertEqual(PatientRecord.objects.get(pk=self.record.pk).analysis_status, expected)
+        self.assertGreater(AnalysisJob.objects.get(pk=self.job.pk).finished_at, job.started_at)
+
+    def test_requeue_stale_jobs_only_requeues_old_running_jobs(self):
+        claim_job('worker-a')
+        self.assertEqual(requeue_stale_jobs(), 0)
+        self.make_stale()
+        with self.assertLogs('core.analysis_jobs', 'WARNING'):
+            self.assertEqual(requeue_stale_jobs(), 1)
+        job = AnalysisJob.objects.get(pk=self.job.pk)
+        self.assertEqual(job.status, 'pending')
+        self.assertIn('worker-a', job.error)
+
+    def test_reclaimed_job_ignores_the_first_workers_result(self):
+        first = claim_job('worker-a')
+        self.make_stale()
+        with self.assertLogs('core.analysis_jobs', 'WARNING'):
+            requeue_stale_jobs()
+        AnalysisJob.objects.filter(pk=self.job.pk).update(available_at=timezone.now())
+        second = claim_job('worker-b')
+
+        # The slow first worker finishes, or fails, after the job was claimed again
+        with self.assertLogs('core.analysis_jobs', 'WARNING'):
+            self.assertFalse(run_job(first, analyzer=None))
+        with mock.patch.object(analysis_jobs, 'analyze_uploaded_reports', side_effect=RuntimeError('late')), \
+                self.assertLogs('core.analysis_jobs', 'ERROR'):
+            self.assertFalse(run_job(first, analyzer=None))
+        job = AnalysisJob.objects.get(pk=self.job.pk)
+        self.assertEqual((job.status, job.worker, job.attempts), ('running', 'worker-b', 2))
+        self.assertEqual(PatientRecord.objects.get(pk=self.record.pk).analysis_status, 'running')
+
+        self.assertTrue(run_job(second, analyzer=None))
+        self.assertEqual(AnalysisJob.objects.get(pk=self.job.pk).status, 'complete')
+
+    def test_same_worker_reclaiming_is_told_apart_by_attempt(self):
+        first = claim_job('worker-a')
+        self.make_stale()
+        with self.assertLogs('core.analysis_jobs', 'WARNING'):
+            requeue_stale_jobs()
+        AnalysisJob.objects.filter(pk=self.job.pk).update(available_at=timezone.now())
+        second = claim_job('worker-a')
+        with self.assertLogs('core.analysis_jobs', 'WARNING'):
+            self.assertFalse(run_job(first, analyzer=None))
+        self.assertTrue(run_job(second, analyzer=None))
+
+    def test_failure_to_store_the_result_is_retried(self):
+        owned = analysis_jobs._owned
+        calls = []
+
+        def locked_once(job):
+            calls.append(job)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return owned(job)
+
+        with mock.patch.object(analysis_jobs, '_owned', side_effect=locked_once), \
+                self.assertLogs('core.analysis_jobs', 'ERROR'):
+            self.assertFalse(run_job(claim_job('worker-a'), analyzer=None))
+        job = AnalysisJob.objects.get(pk=self.job.pk)
+        self.assertEqual((job.status, job.error), ('pending', 'database is locked'))
+
+    def test_worker_survives_an_unexpected_error(self):
+        # The worker's own connection handling would end the test transaction
+        with mock.patch.object(analysis_jobs, 'run_job', side_effect=OperationalError('database is locked')), \
+                mock.patch.object(analysis_jobs, 'MedicalImageAnalyzer'), \
+                mock.patch.object(analysis_jobs, 'close_old_connections'), \
+                mock.patch.object(analysis_jobs, 'connection'), \
+                self.assertLogs('core.analysis_jobs', 'ERROR'):
+            self.assertEqual(work('worker-a', threading.Event(), once=True), 1)
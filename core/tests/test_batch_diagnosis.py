@@ -0,0 +1,55 @@
+from django.test import SimpleTestCase
+
+from core.ai_analysis import MedicalImageAnalyzer, free_vitals
+from core.benchmarks.corpus import CorpusGenerator
+
+
+class BatchDiagnosisTests(SimpleTestCase):
+    def setUp(self):
+        self.analyzer = MedicalImageAnalyzer()
+
+    def assertSameAsSingle(self, symptoms_list, vitals_list, **kwargs):
+        batch = self.analyzer.get_free_diagnosis_batch(symptoms_list, vitals_list, **kwargs)
+        self.assertEqual(len(batch), len(symptoms_list))
+        for symptoms, vitals, diagnosis in zip(symptoms_list, vitals_list, batch):
+            with self.subTest(symptoms=symptoms, vitals=vitals):
+                self.assertEqual(diagnosis, self.analyzer.get_free_diagnosis(symptoms, vitals))
+
+    def test_matches_single_diagnosis_on_synthetic_corpus(self):
+        generator = CorpusGenerator(seed=7)
+        symptoms_list, vitals_list = [], []
+        for index in range(300):
+            complex_case = index % 3 == 0
+            symptoms_list.append(generator.symptoms(complex_case))
+            vitals = dict(generator.vitals(complex_case))
+            vitals_list.append(free_vitals(vitals) if index % 5 else None)
+        # A small chunk size exercises the chunk boundaries too
+        self.assertSameAsSingle(symptoms_list, vitals_list, chunk_size=64)
+
+    def test_matches_single_diagnosis_on_edge_cases(self):
+        symptoms_list = [
+            '', 'no matching words', ['fever', 'cough'], 'FEVER AND COUGH', 'chest pain', 'headache',
+            'fever', 'fever', 'headache',
+        ]
+        vitals_list = [
+            None,
+            {},
+            {'temperature': '101.2', 'blood_pressure': '150/95', 'pulse': '110'},
+            {'temperature': 36.4, 'temperature_unit': 'C', 'systolic_bp': 85, 'diastolic_bp': 55},
+            {'blood_pressure': 'not a reading'},
+            {'pulse': 'fast'},
+            {'temperature': 'warm', 'pulse': 50},
+            {'temperature': 98.6, 'temperature_unit': 'K'},
+            {'pulse': '72', 'blood_pressure': '120/80'},
+        ]
+        self.assertSameAsSingle(symptoms_list, vitals_list)
+
+    def test_rejects_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            self.analyzer.get_free_diagnosis_batch(['fever'], [None, None])
+
+    def test_defaults_to_no_vitals(self):
+        self.assertEqual(
+            self.analyzer.get_free_diagnosis_batch(['fever', 'cough']),
+            [self.analyzer.get_free_diagnosis('fever'), self.analyzer.get_free_diagnosis('cough')],
+        )
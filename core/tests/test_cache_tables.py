@@ -0,0 +1,97 @@
+import itertools
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core import cache_tables
+from core.models import AnalysisResult, ProviderResponse
+from core.response_cache import get_response, purge_responses, store_response
+from core.result_store import get_result, prune_results, store_result
+
+
+class ResultStoreTests(TestCase):
+    def test_store_and_get(self):
+        store_result('a' * 64, 'ecg', '1', {'heart_rate': 'Normal'})
+        self.assertEqual(get_result('a' * 64, 'ecg', '1'), {'heart_rate': 'Normal'})
+        self.assertIsNone(get_result('a' * 64, 'ecg', '2'))
+        entry = AnalysisResult.objects.get()
+        self.assertEqual((entry.hits, entry.size_bytes), (1, len('{"heart_rate": "Normal"}')))
+
+    def test_first_store_wins(self):
+        store_result('a' * 64, 'ecg', '1', {'heart_rate': 'Normal'})
+        store_result('a' * 64, 'ecg', '1', {'heart_rate': 'High'})
+        self.assertEqual(get_result('a' * 64, 'ecg', '1'), {'heart_rate': 'Normal'})
+
+    def test_unserializable_result_is_not_stored(self):
+        with self.assertLogs('core.result_store', 'WARNING'):
+            store_result('a' * 64, 'ecg', '1', {1j: 'complex key'})
+        self.assertFalse(AnalysisResult.objects.exists())
+
+    def test_prune_evicts_outdated_old_and_least_recently_used_results(self):
+        now = timezone.now()
+        for index, (modality, version, days_unused) in enumerate(
+            [('ecg', '1', 0), ('ecg', '0', 0), ('xray', '1', 40), ('report', '1', 1), ('report', '1', 2)]
+        ):
+            AnalysisResult.objects.create(
+                digest=str(index) * 64, modality=modality, analyzer_version=version, result={},
+                size_bytes=100, last_used_at=now - timedelta(days=days_unused),
+            )
+        kwargs = {'current_versions': {'ecg': '1'}, 'max_age_days': 30, 'max_bytes': 250}
+        self.assertEqual(prune_results(dry_run=True, **kwargs), 3)
+        self.assertEqual(AnalysisResult.objects.count(), 5)
+        self.assertEqual(prune_results(**kwargs), 3)
+        self.assertEqual(sorted(AnalysisResult.objects.values_list('digest', flat=True)), ['0' * 64, '3' * 64])
+
+
+class ResponseCacheTests(TestCase):
+    def test_store_and_get(self):
+        store_response('openai', 'gpt', '1', 'a' * 64, {'choices': []})
+        self.assertEqual(get_response('openai', 'gpt', '1', 'a' * 64), {'choices': []})
+        self.assertIsNone(get_response('openai', 'gpt', '2', 'a' * 64))
+
+    def test_expired_response_is_a_miss_and_is_replaced(self):
+        store_response('openai', 'gpt', '1', 'a' * 64, {'old': True})
+        ProviderResponse.objects.update(created_at=timezone.now() - timedelta(days=30))
+        with mock.patch('core.response_cache.AIConfig.PROVIDER_CACHE_TTL', 3600):
+            self.assertIsNone(get_response('openai', 'gpt', '1', 'a' * 64))
+            store_response('openai', 'gpt', '1', 'a' * 64, {'new': True})
+            self.assertEqual(get_response('openai', 'gpt', '1', 'a' * 64), {'new': True})
+        self.assertEqual(ProviderResponse.objects.get().size_bytes, len('{"new": true}'))
+
+    def test_purge(self):
+        now = timezone.now()
+        for index, (provider, age_hours) in enumerate([('openai', 0), ('openai', 48), ('huggingface', 0)]):
+            ProviderResponse.objects.create(
+                provider=provider, model_id='m', prompt_version='1', payload_hash=str(index) * 64, response={},
+                size_bytes=10, created_at=now - timedelta(hours=age_hours), last_used_at=now - timedelta(hours=age_hours),
+            )
+        self.assertEqual(purge_responses(ttl=24 * 3600, max_bytes=0), 1)
+        self.assertEqual(purge_responses(provider='openai', purge_all=True, dry_run=True), 1)
+        self.assertEqual(purge_responses(provider='openai', purge_all=True), 1)
+        self.assertEqual(list(ProviderResponse.objects.values_list('provider', flat=True)), ['huggingface'])
+
+    def test_store_purges_over_budget_responses_periodically(self):
+        with mock.patch.multiple(
+            'core.response_cache', PURGE_EVERY_INSERTS=3, _inserts=itertools.count(1),
+        ), mock.patch('core.response_cache.AIConfig.PROVIDER_CACHE_MAX_BYTES', 20):
+            for index in range(3):
+                store_response('openai', 'gpt', '1', str(index) * 64, {'n': index})
+            self.assertEqual(
+                sorted(ProviderResponse.objects.values_list('payload_hash', flat=True)), ['1' * 64, '2' * 64]
+            )
+            for index in range(3, 5):
+                store_response('openai', 'gpt', '1', str(index) * 64, {'n': index})
+            self.assertEqual(ProviderResponse.objects.count(), 4)
+
+
+class EvictEntriesTests(TestCase):
+    def test_deletes_in_chunks(self):
+        AnalysisResult.objects.bulk_create(
+            AnalysisResult(digest=f'{index:064d}', modality='ecg', analyzer_version='1', result={}, size_bytes=1)
+            for index in range(7)
+        )
+        with mock.patch.object(cache_tables, 'DELETE_CHUNK_SIZE', 3):
+            self.assertEqual(cache_tables.evict_entries(AnalysisResult.objects.all(), max_bytes=2), 5)
+        self.assertEqual(AnalysisResult.objects.count(), 2)
@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from core import image_ingest
+from core.config import AIConfig
+from core.file_cache import STALE_TEMP_SECONDS, discard_digest, prune_cache_dir
+from core.image_ingest import ImageCache, file_digest
+from core.report_text import load_report_text
+from core.models import PatientRecord
+
+
+def write_entry(directory, name, size, age_seconds=0):
+    path = os.path.join(directory, name[:2], name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    used = time.time() - age_seconds
+    os.utime(path, (used, used))
+    return path
+
+
+def png_bytes():
+    with tempfile.SpooledTemporaryFile() as f:
+        Image.fromarray(np.arange(64 * 48, dtype=np.uint8).reshape(48, 64)).save(f, format='PNG')
+        f.seek(0)
+        return f.read()
+
+
+class PruneCacheDirTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_evicts_entries_unused_for_max_age(self):
+        old = write_entry(self.directory, 'aa11-old.npy', 10, age_seconds=3 * 86400)
+        fresh = write_entry(self.directory, 'bb22-fresh.npy', 10)
+        self.assertEqual(prune_cache_dir(self.directory, max_age_days=2), 1)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(fresh))
+
+    def test_evicts_least_recently_used_beyond_max_bytes(self):
+        oldest = write_entry(self.directory, 'aa11-a.npy', 100, age_seconds=30)
+        middle = write_entry(self.directory, 'bb22-b.npy', 100, age_seconds=20)
+        newest = write_entry(self.directory, 'cc33-c.npy', 100, age_seconds=10)
+        self.assertEqual(prune_cache_dir(self.directory, max_bytes=250), 1)
+        self.assertEqual([os.path.exists(path) for path in (oldest, middle, newest)], [False, True, True])
+
+    def test_dry_run_and_no_limits_keep_everything(self):
+        path = write_entry(self.directory, 'aa11-a.npy', 100, age_seconds=3 * 86400)
+        self.assertEqual(prune_cache_dir(self.directory, max_age_days=1, dry_run=True), 1)
+        self.assertEqual(prune_cache_dir(self.directory), 0)
+        self.assertTrue(os.path.exists(path))
+
+    def test_removes_stale_temporary_files(self):
+        stale = write_entry(self.directory, 'aa11.tmp', 10, age_seconds=STALE_TEMP_SECONDS + 60)
+        writing = write_entry(self.directory, 'aa22.tmp', 10)
+        self.assertEqual(prune_cache_dir(self.directory), 1)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(writing))
+
+    def test_missing_or_disabled_directory(self):
+        self.assertEqual(prune_cache_dir(os.path.join(self.directory, 'missing'), max_age_days=1), 0)
+        self.assertEqual(prune_cache_dir('', max_age_days=1), 0)
+
+    def test_discard_digest_removes_every_entry_of_the_digest(self):
+        first = write_entry(self.directory, 'abcd-1024-v1.npy', 10)
+        second = write_entry(self.directory, 'abcd-512-v2.npy', 10)
+        other = write_entry(self.directory, 'abce-1024-v1.npy', 10)
+        self.assertEqual(discard_digest(self.directory, 'abcd'), 2)
+        self.assertEqual([os.path.exists(path) for path in (first, second, other)], [False, False, True])
+        self.assertEqual(discard_digest(self.directory, 'ffff'), 0)
+
+
+class CacheEvictionTests(TestCase):
+    def setUp(self):
+        self.image_directory, self.text_directory, self.media_root = (tempfile.mkdtemp() for _ in range(3))
+        for directory in (self.image_directory, self.text_directory, self.media_root):
+            self.addCleanup(shutil.rmtree, directory)
+        for patcher in (
+            mock.patch.object(AIConfig, 'IMAGE_CACHE_DIR', self.image_directory),
+            mock.patch.object(AIConfig, 'REPORT_TEXT_CACHE_DIR', self.text_directory),
+            mock.patch.object(image_ingest, '_image_cache', None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def create_record(self, field, name, content):
+        user = User.objects.create_user('doctor', password='secret')
+        record = PatientRecord(patient_name='Test Patient', age=40, gender='F', symptoms='fever', created_by=user)
+        getattr(record, field).save(name, ContentFile(content), save=False)
+        record.save()
+        return record
+
+    def test_cache_hit_marks_the_entry_used(self):
+        source = os.path.join(self.media_root, 'ecg.png')
+        with open(source, 'wb') as f:
+            f.write(png_bytes())
+        cache = ImageCache()
+        cache.load(source)
+        cache_path = cache.path_for(file_digest(source))
+        os.utime(cache_path, (0, 0))
+        cache.load(source)
+        self.assertGreater(os.path.getmtime(cache_path), time.time() - 60)
+
+    def test_deleting_a_record_discards_its_cached_images(self):
+        record = self.create_record('ecg_report', 'ecg.png', png_bytes())
+        image_ingest.load_grayscale(record.ecg_report.path)
+        cache_path = image_ingest.get_image_cache().path_for(file_digest(record.ecg_report.path))
+        self.assertTrue(os.path.exists(cache_path))
+
+        record.delete()
+        self.assertFalse(os.path.exists(cache_path))
+        self.assertFalse(os.path.exists(record.ecg_report.path))
+
+    def test_deleting_a_record_discards_its_cached_report_text(self):
+        text = b'Hemoglobin 10.2 g/dL (13.5-17.5)'
+        record = self.create_record('lab_report', 'lab.txt', text)
+        digest = file_digest(record.lab_report.path)
+        self.assertEqual(load_report_text(record.lab_report.path), text.decode())
+        shard = os.path.join(self.text_directory, digest[:2])
+        self.assertEqual(len(os.listdir(shard)), 1)
+
+        record.delete()
+        self.assertEqual(os.listdir(shard), [])
+
+    def test_prune_command_evicts_cached_images_and_report_text(self):
+        image = write_entry(self.image_directory, 'aa11-old.npy', 10, age_seconds=3 * 86400)
+        text = write_entry(self.text_directory, 'bb22-old.txt', 10, age_seconds=3 * 86400)
+        out = StringIO()
+        call_command('prune_analysis_results', image_max_age_days=2, text_max_age_days=2, stdout=out)
+        self.assertIn('Evicted 1 cached image(s)', out.getvalue())
+        self.assertIn('Evicted 1 cached report text(s)', out.getvalue())
+        self.assertFalse(os.path.exists(image))
+        self.assertFalse(os.path.exists(text))
@@ -0,0 +1,171 @@
+from io import BytesIO
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from core.http_client import CircuitBreaker, CircuitOpenError, DeadlineExceeded, ProviderClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def response(status_code, headers=None):
+    result = requests.Response()
+    result.status_code = status_code
+    result.headers.update(headers or {})
+    result.raw = BytesIO(b'')
+    return result
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10, clock=self.clock)
+
+    def open_circuit(self):
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.snapshot()['times_opened'], 1)
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_lets_one_trial_through_after_the_reset_time(self):
+        self.open_circuit()
+        self.clock.now = 9.9
+        self.assertFalse(self.breaker.allow())
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_successful_trial_closes_the_circuit(self):
+        self.open_circuit()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens_the_circuit(self):
+        self.open_circuit()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.snapshot()['times_opened'], 2)
+        self.clock.now = 19.9
+        self.assertFalse(self.breaker.allow())
+        self.clock.now = 20
+        self.assertTrue(self.breaker.allow())
+
+    def test_released_trial_can_be_retried(self):
+        self.open_circuit()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+
+
+class ProviderClientTests(SimpleTestCase):
+    def setUp(self):
+        self.client = ProviderClient(
+            'test', max_retries=2, backoff_base=0, backoff_max=0, failure_threshold=2, reset_seconds=10,
+            sleep=lambda seconds: None,
+        )
+        self.clock = FakeClock()
+        self.client.breaker.clock = self.clock
+        self.addCleanup(self.client.close)
+
+    def send(self, *outcomes, **kwargs):
+        """Post with the session returning or raising ``outcomes`` in turn."""
+        with mock.patch.object(self.client.session, 'request', side_effect=list(outcomes)) as request:
+            try:
+                return self.client.post('http://provider.test/', **kwargs)
+            finally:
+                self.attempts = request.call_count
+
+    def half_open(self):
+        self.client.breaker.record_failure()
+        self.client.breaker.record_failure()
+        self.clock.now += 10
+
+    def test_retries_retryable_statuses(self):
+        self.assertEqual(self.send(response(503), response(429), response(200)).status_code, 200)
+        self.assertEqual(self.attempts, 3)
+        self.assertEqual(self.client.metrics()['retries'], 2)
+
+    def test_gives_up_after_max_retries(self):
+        self.assertEqual(self.send(response(503), response(503), response(503)).status_code, 503)
+        self.assertEqual(self.client.breaker.consecutive_failures, 1)
+
+    def test_read_timeouts_are_only_retried_when_idempotent(self):
+        with self.assertRaises(requests.ReadTimeout):
+            self.send(requests.ReadTimeout())
+        self.assertEqual(self.attempts, 1)
+        self.assertEqual(self.send(requests.ReadTimeout(), response(200), idempotent=True).status_code, 200)
+
+    def test_client_errors_count_as_success(self):
+        self.client.breaker.record_failure()
+        self.assertEqual(self.send(response(400)).status_code, 400)
+        self.assertEqual(self.client.breaker.consecutive_failures, 0)
+
+    def test_open_circuit_short_circuits(self):
+        self.client.breaker.record_failure()
+        self.client.breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            self.send(response(200))
+        self.assertEqual(self.attempts, 0)
+
+    def test_other_request_exceptions_count_as_failures(self):
+        for error in (requests.exceptions.ChunkedEncodingError(), requests.exceptions.ContentDecodingError(),
+                      requests.TooManyRedirects()):
+            self.client.breaker.record_success()
+            with self.subTest(error=type(error).__name__), self.assertRaises(type(error)):
+                self.send(error)
+            self.assertEqual(self.client.breaker.consecutive_failures, 1)
+
+    def test_failed_trial_with_other_request_exception_reopens_the_circuit(self):
+        self.half_open()
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            self.send(requests.exceptions.ChunkedEncodingError())
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+
+    def test_trial_without_a_verdict_is_released(self):
+        for error in (requests.exceptions.InvalidURL(), OSError('body could not be read'), ValueError('bad body')):
+            self.half_open()
+            with self.subTest(error=type(error).__name__):
+                with self.assertRaises(type(error)):
+                    self.send(error)
+                self.assertEqual(self.client.breaker.state, CircuitBreaker.HALF_OPEN)
+                # The next call is let through as the trial and closes the circuit
+                self.assertEqual(self.send(response(200)).status_code, 200)
+                self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_deadline_does_not_count_against_the_provider(self):
+        self.half_open()
+        with self.assertRaises(DeadlineExceeded):
+            self.send(response(200), deadline=0)
+        self.assertEqual(self.attempts, 0)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(self.client.metrics()['deadline_exceeded'], 1)
+        self.assertEqual(self.send(response(200)).status_code, 200)
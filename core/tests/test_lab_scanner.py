@@ -0,0 +1,41 @@
+from django.test import SimpleTestCase
+
+from core.lab_scanner import scan_lab_text
+
+
+class ScanLabTextTests(SimpleTestCase):
+    def scan_one(self, text):
+        values, _, _ = scan_lab_text(text)
+        self.assertEqual(len(values), 1)
+        return values[0]
+
+    def test_flag_right_after_the_value_overrides_the_range(self):
+        for text in ('Hemoglobin 9.1 g/dL L', 'Glucose 95 (L)', 'Glucose 95 mg/dL 70-100 low'):
+            self.assertEqual(self.scan_one(text)['status'], 'low', text)
+        self.assertEqual(self.scan_one('Potassium 4.0 mmol/L (3.5-5.1) HIGH')['status'], 'high')
+
+    def test_later_words_are_not_flags(self):
+        for text in (
+            'WBC 7.5 10^9/L (4.0-11.0)',
+            'Hemoglobin 135 g/L 120-170',
+            'Creatinine 80 umol/L 60-110',
+            'Glucose 95 mg/dL, patient reports low appetite',
+        ):
+            self.assertEqual(self.scan_one(text)['status'], 'normal', text)
+
+    def test_printed_range_takes_precedence(self):
+        entry = self.scan_one('Glucose 110 mg/dL 70-120')
+        self.assertEqual((entry['low'], entry['high'], entry['status']), (70.0, 120.0, 'normal'))
+
+    def test_usual_range_is_converted_to_the_printed_unit(self):
+        self.assertEqual(self.scan_one('Glucose 5.4 mmol/L')['status'], 'normal')
+        self.assertEqual(self.scan_one('Glucose 7.8 mmol/L')['status'], 'high')
+        entry = self.scan_one('Hemoglobin 140 g/L')
+        self.assertEqual((entry['low'], entry['high'], entry['status']), (120.0, 175.0, 'normal'))
+        self.assertEqual(self.scan_one('Hemoglobin 95 g/L')['status'], 'low')
+        self.assertEqual(self.scan_one('WBC 7.5 x10^9/L')['status'], 'normal')
+
+    def test_status_is_unset_for_an_unconvertible_unit(self):
+        entry = self.scan_one('Sodium 140 mg/dL')
+        self.assertEqual((entry['low'], entry['high'], entry['status']), (None, None, None))
+        self.assertEqual(self.scan_one('Sodium 140 mg/dL H')['status'], 'high')
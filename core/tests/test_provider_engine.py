@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import Future
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import ai_analysis
+from core.ai_analysis import MedicalImageAnalyzer
+from core.analysis_jobs import _merge_modalities
+from core.provider_engine import run_provider_calls_sync
+
+
+def openai_response(content):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {'choices': [{'message': {'content': content}}]}
+    return response
+
+
+class RunProviderCallsTests(SimpleTestCase):
+    def test_keeps_only_dict_results(self):
+        def fail(deadline):
+            raise RuntimeError('provider down')
+
+        calls = {
+            'ecg': lambda deadline: {'ai_analysis': 'ok'},
+            'xray': lambda deadline: ['not', 'a', 'dict'],
+            'lab': lambda deadline: 'text',
+            'none': lambda deadline: None,
+            'error': fail,
+        }
+        with self.assertLogs('core.provider_engine', 'ERROR') as logs:
+            results = run_provider_calls_sync(calls, time.monotonic() + 5)
+        self.assertEqual(results, {'ecg': {'ai_analysis': 'ok'}})
+        self.assertEqual(len(logs.records), 3)
+
+    def test_discards_calls_that_miss_the_deadline(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        calls = {
+            'fast': lambda deadline: {'ai_analysis': 'fast'},
+            'slow': lambda deadline: release.wait(5) and {'ai_analysis': 'slow'},
+        }
+        started = time.monotonic()
+        with self.assertLogs('core.provider_engine', 'WARNING'):
+            results = run_provider_calls_sync(calls, started + 0.2)
+        self.assertEqual(results, {'fast': {'ai_analysis': 'fast'}})
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_no_calls(self):
+        self.assertEqual(run_provider_calls_sync({}, time.monotonic() + 1), {})
+
+
+class OpenAIResultTests(SimpleTestCase):
+    def analyze(self, content):
+        client = mock.Mock()
+        client.post.return_value = openai_response(content)
+        analyzer = MedicalImageAnalyzer()
+        analyzer.api_keys['openai'] = 'test-key'
+        with mock.patch.object(ai_analysis, 'get_client', return_value=client), \
+                mock.patch.object(ai_analysis, 'get_response', return_value=None), \
+                mock.patch.object(ai_analysis, 'store_response'):
+            return analyzer._analyze_with_openai('Hemoglobin 10.2 g/dL')
+
+    def test_json_object_is_returned_as_is(self):
+        self.assertEqual(self.analyze('{"key_findings": ["Low hemoglobin"]}'), {'key_findings': ['Low hemoglobin']})
+
+    def test_other_json_is_kept_as_text(self):
+        for content in ('["Low hemoglobin"]', '"Low hemoglobin"', '42', 'null'):
+            with self.subTest(content=content):
+                self.assertEqual(self.analyze(content), {'ai_analysis': content})
+
+    def test_plain_text_is_kept_as_text(self):
+        self.assertEqual(self.analyze('Low hemoglobin'), {'ai_analysis': 'Low hemoglobin'})
+
+
+class MergeModalitiesTests(SimpleTestCase):
+    def merge(self, provider_results):
+        future = Future()
+        future.set_result(({'heart_rate': 'Normal', 'rhythm': 'Regular', 'abnormalities': []}, None, 0.1))
+        diagnosis = {'confidence': 0.5}
+        lines = []
+        record = mock.Mock(pk=1)
+        _merge_modalities(record, {'ecg': future}, provider_results, diagnosis, lines, time.perf_counter())
+        return diagnosis, lines
+
+    def test_merges_provider_result(self):
+        diagnosis, lines = self.merge({'ecg': {'rhythm': 'Irregular'}})
+        self.assertEqual(lines, ['ECG Analysis: Heart Rate - Normal, Rhythm - Irregular'])
+        self.assertAlmostEqual(diagnosis['confidence'], 0.6)
+
+    def test_unmergeable_provider_result_fails_only_its_modality(self):
+        with self.assertLogs('core.analysis_jobs', 'ERROR'):
+            diagnosis, lines = self.merge({'ecg': ['not', 'a', 'dict']})
+        self.assertEqual(lines, ['ECG analysis failed'])
+        self.assertEqual(diagnosis['confidence'], 0.5)
@@ -0,0 +1,31 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import report_text
+
+
+class DocPiecesTests(SimpleTestCase):
+    def doc_text(self, data, chunk_size):
+        with tempfile.NamedTemporaryFile(suffix='.doc', delete=False) as f:
+            f.write(data)
+        self.addCleanup(os.remove, f.name)
+        with mock.patch.object(report_text, 'READ_CHUNK_SIZE', chunk_size):
+            return ''.join(report_text._doc_pieces(f.name))
+
+    def test_runs_across_chunk_boundaries_are_kept_whole(self):
+        ascii_run = b'Hemoglobin 13.5 g/dL'
+        utf16_run = 'Glucose 95 mg/dL'.encode('utf-16-le')
+        data = b'\x01\x02' + ascii_run + b'\x03' + utf16_run + b'\xff\xff'
+        expected = 'Hemoglobin 13.5 g/dL\nGlucose 95 mg/dL\n'
+        for chunk_size in (33, 40, 41, 64):
+            self.assertEqual(self.doc_text(data, chunk_size), expected)
+
+    def test_runs_longer_than_a_chunk_lose_no_text(self):
+        text = 'Impression: sinus rhythm, no acute ST changes. ' * 4
+        for run in (text.encode(), text.encode('utf-16-le')):
+            for chunk_size in (32, 33, 64):
+                extracted = self.doc_text(b'\x01' + run + b'\x02', chunk_size)
+                self.assertEqual(extracted.replace('\n', ''), text)
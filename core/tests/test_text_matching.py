@@ -0,0 +1,69 @@
+import random
+import re
+
+from django.test import SimpleTestCase
+
+from core.knowledge_base import get_knowledge_base
+from core.text_matching import PhraseMatcher, trie_regex
+
+
+def brute_force(phrases, text):
+    """The matcher's reference behaviour: test every phrase with ``in``."""
+    text = text.lower()
+    return tuple(phrase for phrase in dict.fromkeys(phrase.lower() for phrase in phrases if phrase) if phrase in text)
+
+
+class PhraseMatcherTests(SimpleTestCase):
+    def test_finds_phrases_in_registration_order(self):
+        matcher = PhraseMatcher(['headache', 'fever', 'cough'])
+        self.assertEqual(matcher.match('Cough and FEVER, no headache'), ('headache', 'fever', 'cough'))
+
+    def test_reports_phrases_contained_in_a_longer_match(self):
+        matcher = PhraseMatcher(['swelling in legs', 'swelling', 'legs'])
+        self.assertEqual(matcher.match('swelling in legs'), ('swelling in legs', 'swelling', 'legs'))
+
+    def test_finds_phrase_starting_inside_a_longer_match(self):
+        # 'chest pain' is the longest match at 0; 'pain radiating' starts inside it
+        matcher = PhraseMatcher(['chest pain', 'pain radiating'])
+        self.assertEqual(matcher.match('chest pain radiating'), ('chest pain', 'pain radiating'))
+
+    def test_overlapping_repeated_phrases(self):
+        matcher = PhraseMatcher(['aa', 'aaa', 'aab'])
+        self.assertEqual(matcher.match('aaab'), ('aa', 'aaa', 'aab'))
+
+    def test_deduplicates_and_ignores_empty_phrases(self):
+        matcher = PhraseMatcher(['Fever', 'fever', ''])
+        self.assertEqual(len(matcher), 1)
+        self.assertEqual(matcher.match('fever'), ('fever',))
+
+    def test_empty_matcher_and_text(self):
+        self.assertEqual(PhraseMatcher([]).match('fever'), ())
+        self.assertEqual(PhraseMatcher(['fever']).match(''), ())
+
+    def test_escapes_regex_metacharacters(self):
+        matcher = PhraseMatcher(['a.b', '(x)', 'c+'])
+        self.assertEqual(matcher.match('axb (x) c+'), ('(x)', 'c+'))
+
+    def test_trie_regex_prefers_the_longest_phrase(self):
+        self.assertEqual(re.search(trie_regex(['ab', 'abc']), 'abcd').group(), 'abc')
+
+    def test_matches_brute_force_on_random_text(self):
+        rng = random.Random(1234)
+        alphabet = 'ab c'
+        for _ in range(300):
+            phrases = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 8))]
+            text = ''.join(rng.choice(alphabet + 'A') for _ in range(rng.randint(0, 30)))
+            with self.subTest(phrases=phrases, text=text):
+                self.assertEqual(PhraseMatcher(phrases).match(text), brute_force(phrases, text))
+
+    def test_matches_brute_force_on_knowledge_base_phrases(self):
+        phrases = get_knowledge_base().diagnosis_matcher.phrases
+        matcher = PhraseMatcher(phrases)
+        rng = random.Random(99)
+        for _ in range(200):
+            text = ' '.join(rng.sample(phrases, rng.randint(1, 5)))
+            # Cut random slices so phrases are split and run into each other
+            start = rng.randint(0, len(text) // 3)
+            text = text[start:start + rng.randint(1, len(text))]
+            with self.subTest(text=text):
+                self.assertEqual(matcher.match(text), brute_force(phrases, text))
@@ -0,0 +1,50 @@
+import base64
+import json
+import os
+import tempfile
+from unittest import mock
+
+import cv2
+import numpy as np
+from django.test import SimpleTestCase
+
+from core import upload_payload
+from core.upload_payload import BASE64_FIELD, Base64JsonBody, encode_image, image_payload
+
+
+class UploadPayloadTests(SimpleTestCase):
+    def setUp(self):
+        self.image = (np.arange(300 * 200) % 256).reshape(200, 300).astype(np.uint8)
+        patcher = mock.patch.object(upload_payload, 'load_grayscale', return_value=self.image)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_streamed_body_decodes_to_the_document_and_data(self):
+        data = bytes(range(256)) * 3 + b'\x01'
+        # A chunk size that is a multiple of 3 but not of the data length
+        with mock.patch.object(upload_payload, 'BASE64_CHUNK_SIZE', 30):
+            body = Base64JsonBody({'inputs': {'image': BASE64_FIELD, 'text': 'Describe "this"'}}, data)
+            sent = b''.join(body)
+            self.assertEqual(b''.join(body), sent)
+        self.assertEqual(len(sent), len(body))
+        document = json.loads(sent)
+        self.assertEqual(document['inputs']['text'], 'Describe "this"')
+        self.assertEqual(base64.b64decode(document['inputs']['image']), data)
+
+    def test_encoded_image_round_trips_through_the_body(self):
+        buffer, _ = encode_image('report.png', max_size=150, codec='png')
+        body = Base64JsonBody({'inputs': {'image': BASE64_FIELD}}, buffer)
+        encoded = base64.b64decode(json.loads(b''.join(body))['inputs']['image'])
+        self.assertEqual(encoded, buffer.tobytes())
+        decoded = cv2.imdecode(np.frombuffer(encoded, np.uint8), cv2.IMREAD_GRAYSCALE)
+        expected = cv2.resize(self.image, (150, 100), interpolation=cv2.INTER_AREA)
+        np.testing.assert_array_equal(decoded, expected)
+
+    def test_image_payload_stats(self):
+        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as f:
+            f.write(b'x' * 1000)
+        self.addCleanup(os.remove, f.name)
+        body, stats = image_payload(f.name, 'Analyze this ecg image')
+        self.assertEqual(stats['source_bytes'], 1000)
+        self.assertEqual(stats['upload_bytes'], len(b''.join(body)))
+        self.assertGreaterEqual(stats['estimated_peak_bytes'], stats['encoded_bytes'])
@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase
+
+from core.ai_analysis import MedicalImageAnalyzer
+
+
+class FreeVitalsTests(SimpleTestCase):
+    def setUp(self):
+        self.analyzer = MedicalImageAnalyzer()
+
+    def test_unparsable_vital_keeps_the_others(self):
+        with self.assertLogs('core.ai_analysis', 'WARNING'):
+            analysis = self.analyzer._analyze_vitals_free(
+                {'temperature': '102', 'blood_pressure': '150/95', 'pulse': 'fast'}
+            )
+        self.assertEqual(analysis['vital_status'], {
+            'temperature': 'High (Fever)', 'blood_pressure': 'High (Hypertension)',
+        })
+        self.assertEqual(analysis['abnormal_vitals'], ['High temperature', 'High blood pressure'])
+
+    def test_unparsable_temperature_keeps_pulse(self):
+        with self.assertLogs('core.ai_analysis', 'WARNING'):
+            analysis = self.analyzer._analyze_vitals_free({'temperature': 'warm', 'pulse': '50'})
+        self.assertEqual(analysis['vital_status'], {'pulse': 'Low (Bradycardia)'})
+
+    def test_unknown_temperature_unit_skips_only_temperature(self):
+        with self.assertLogs('core.ai_analysis', 'WARNING'):
+            analysis = self.analyzer._analyze_vitals_free(
+                {'temperature': 300, 'temperature_unit': 'K', 'systolic_bp': 120, 'diastolic_bp': 80}
+            )
+        self.assertEqual(analysis['vital_status'], {'blood_pressure': 'Normal'})
+
+    def test_unparsable_blood_pressure_string_is_reported(self):
+        analysis = self.analyzer._analyze_vitals_free({'blood_pressure': 'n/a', 'pulse': 72})
+        self.assertEqual(analysis['vital_status'], {'blood_pressure': 'Unable to parse', 'pulse': 'Normal'})
+
+    def test_batch_matches_single_with_unparsable_vitals(self):
+        vitals_list = [{'temperature': '102', 'pulse': 'fast'}, {'temperature': 'warm', 'pulse': '50'}, None]
+        with self.assertLogs('core.ai_analysis', 'WARNING'):
+            batch = self.analyzer._analyze_vitals_batch(vitals_list)
+        with self.assertLogs('core.ai_analysis', 'WARNING'):
+            single = [self.analyzer._analyze_vitals_free(vitals or {}) for vitals in vitals_list]
+        self.assertEqual(batch, single)
@@ -0,0 +1,85 @@
+# Compiled multi-phrase matching for symptom and report text
+
+import re
+
+
+class PhraseMatcher:
+    """Find every occurrence of a fixed phrase set in one pass over the text.
+
+    Phrases are compiled into a single trie-shaped regular expression that
+    reports the longest phrase at each leftmost match. Shorter phrases
+    contained in a longer match (e.g. ``swelling`` in ``swelling in legs``)
+    are added from a precomputed closure, and the scan only steps back inside
+    a match when a phrase could start there and run past its end. The result
+    is identical to testing ``phrase in text`` for every phrase.
+    """
+
+    def __init__(self, phrases):
+        # Registration order is preserved so callers get deterministic output
+        self.phrases = tuple(dict.fromkeys(phrase.lower() for phrase in phrases if phrase))
+        self._ids = {phrase: index for index, phrase in enumerate(self.phrases)}
+        self._implied = {
+            phrase: frozenset(self._ids[other] for other in self.phrases if other in phrase)
+            for phrase in self.phrases
+        }
+        # Resume offset after a match: the earliest point where a longer phrase
+        # could start inside it and run past its end, else the end of the match
+        self._resume = {phrase: _resume_offset(phrase, self.phrases) for phrase in self.phrases}
+        self._pattern = re.compile(trie_regex(self.phrases)) if self.phrases else None
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def match_ids(self, text):
+        """Return the ids of all phrases occurring in ``text``."""
+        found = set()
+        if self._pattern is None or not text:
+            return found
+        text = text.lower()
+        implied = self._implied
+        resume = self._resume
+        search = self._pattern.search
+        position = 0
+        while True:
+            found_match = search(text, position)
+            if found_match is None:
+                return found
+            longest = found_match.group()
+            found |= implied[longest]
+            position = found_match.start() + resume[longest]
+
+    def match(self, text):
+        """Return the phrases occurring in ``text`` in registration order."""
+        phrases = self.phrases
+        return tuple(phrases[index] for index in sorted(self.match_ids(text)))
+
+
+def _resume_offset(phrase, phrases):
+    for cut in range(1, len(phrase)):
+        tail = phrase[cut:]
+        if any(len(other) > len(tail) and other.startswith(tail) for other in phrases):
+            return cut
+    return len(phrase)
+
+
+def trie_regex(phrases):
+    """Build a regex alternation that shares common prefixes and prefers the longest phrase."""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = True
+    return _node_regex(trie)
+
+
+def _node_regex(node):
+    terminal = '' in node
+    branches = [re.escape(char) + _node_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    if terminal:
+        # Greedy optional group: try the longer continuation first
+        return f'(?:{body})?'
+    return body
@@ -0,0 +1,106 @@
+# Compact, streamed JSON request bodies for sending report images to remote models
+
+import base64
+import hashlib
+import json
+import os
+import time
+
+import cv2
+
+from .config import AIConfig
+from .image_ingest import load_grayscale
+
+# Codec: (file extension, OpenCV quality flag or None when lossless)
+CODECS = {
+    'jpeg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+    'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY),
+    'png': ('.png', None),
+}
+
+# Bytes encoded per body chunk; a multiple of 3, so chunks need no base64 padding
+BASE64_CHUNK_SIZE = 48 * 1024
+
+# Stands in for the base64 field while the rest of the document is serialized
+BASE64_FIELD = '\x00base64\x00'
+
+
+def encode_image(path, max_size=None, codec=None, quality=None, digest=None):
+    """Return a report image as a ``codec`` encoded buffer, at most ``max_size`` pixels on its long side.
+
+    The image is the cached grayscale that the local analyzers use (so PDF
+    reports are sent as their rendered page), shrunk further to the remote
+    model's input size. Defaults come from the PROVIDER_IMAGE_* settings.
+    Returns (encoded buffer, bytes of image data held while encoding).
+    """
+    max_size = AIConfig.PROVIDER_IMAGE_SIZE if max_size is None else max_size
+    codec = AIConfig.PROVIDER_IMAGE_CODEC if codec is None else codec
+    quality = AIConfig.PROVIDER_IMAGE_QUALITY if quality is None else quality
+    if codec not in CODECS:
+        raise ValueError(f'Unsupported image codec {codec!r}; choose from {", ".join(CODECS)}')
+
+    image = load_grayscale(path, digest=digest)
+    height, width = image.shape
+    if max(height, width) > max_size:
+        scale = max_size / max(height, width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    extension, quality_flag = CODECS[codec]
+    params = [quality_flag, int(quality)] if quality_flag is not None else []
+    encoded, buffer = cv2.imencode(extension, image, params)
+    if not encoded:
+        raise ValueError(f'Could not encode {path} as {codec}')
+    return buffer, image.nbytes + buffer.nbytes
+
+
+class Base64JsonBody:
+    """A JSON document with one binary field, base64-encoded chunk by chunk as it is sent.
+
+    ``document`` holds BASE64_FIELD where the encoded ``data`` goes. The body
+    has a known length, so it is sent with a Content-Length rather than
+    chunked, and can be iterated again when a request is retried.
+    """
+
+    def __init__(self, document, data):
+        prefix, suffix = json.dumps(document).split(json.dumps(BASE64_FIELD))
+        self.prefix = (prefix + '"').encode('utf-8')
+        self.suffix = ('"' + suffix).encode('utf-8')
+        self.data = memoryview(data).cast('B')
+
+    def __len__(self):
+        return len(self.prefix) + 4 * ((len(self.data) + 2) // 3) + len(self.suffix)
+
+    def digest(self):
+        """SHA-256 of the document with the raw data in place of its base64."""
+        sha256 = hashlib.sha256(self.prefix)
+        sha256.update(self.data)
+        sha256.update(self.suffix)
+        return sha256.hexdigest()
+
+    def __iter__(self):
+        yield self.prefix
+        for start in range(0, len(self.data), BASE64_CHUNK_SIZE):
+            yield base64.b64encode(self.data[start:start + BASE64_CHUNK_SIZE])
+        yield self.suffix
+
+
+def image_payload(path, text, digest=None):
+    """Build the streamed inference body for an image and its prompt.
+
+    Returns (body, stats), where stats has the original file size, the
+    encoded image and upload sizes, the build time and an estimate (from
+    the buffer sizes, not measured) of the payload bytes held at once.
+    """
+    start = time.perf_counter()
+    buffer, encoding_bytes = encode_image(path, digest=digest)
+    body = Base64JsonBody({'inputs': {'image': BASE64_FIELD, 'text': text}}, buffer)
+    stats = {
+        'source_bytes': os.path.getsize(path),
+        'encoded_bytes': buffer.nbytes,
+        'upload_bytes': len(body),
+        'build_seconds': round(time.perf_counter() - start, 4),
+        # Encoding holds the image and its encoding; sending holds the encoding and one base64 chunk
+        'estimated_peak_bytes': max(encoding_bytes, buffer.nbytes + 4 * BASE64_CHUNK_SIZE // 3),
+    }
+    return body, stats
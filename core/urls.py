@@ -9,8 +9,10 @@ urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('prescription/<int:record_id>/', views.prescription, name='prescription'),
+    path('prescription/<int:record_id>/analysis-status/', views.analysis_status, name='analysis_status'),
     path('history/', views.history, name='history'),
     path('download-pdf/<int:record_id>/', views.download_pdf, name='download_pdf'),
     path('delete/<int:record_id>/', views.delete_record, name='delete_record'),
     path('health-advice/', views.health_advice, name='health_advice'),
+    path('metrics/providers/', views.provider_metrics, name='provider_metrics'),
 ]
@@ -2,39 +2,36 @@
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.utils import timezone
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Q
-import joblib
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition
+import hashlib
 import os
 import numpy as np
 from .models import PatientRecord
 from .forms import PatientForm
 from .utils import generate_pdf_report
-from .ai_analysis import MedicalImageAnalyzer
+from .ai_analysis import MedicalImageAnalyzer, free_vitals
+from .analysis_jobs import (
+    analyze_uploaded_reports, apply_diagnosis, enqueue_analysis, finish_diagnosis, has_uploaded_reports,
+)
+from .config import AIConfig
+from .http_client import client_metrics
+from .health_advice import ADVICE_VERSION, advice_key, get_health_advice
+from .knowledge_base import get_knowledge_base
+from .diagnosis_cache import diagnosis_cache, diagnosis_cache_key
+from .vitals import classify_vitals, record_vitals
 
 # Initialize AI analyzer
 ai_analyzer = MedicalImageAnalyzer()
 
-# Load AI models (simulated for demo)
-def load_ai_models():
-    """Load AI models for diagnosis."""
-    try:
-        # In a real application, you would load actual trained models
-        # For demo purposes, we'll simulate the models
-        return {
-            'symptom_classifier': None,  # joblib.load('core/ai_models/symptom_classifier.pkl')
-            'ecg_model': None,  # load_model('core/ai_models/ecg_model.h5')
-        }
-    except Exception as e:
-        print(f"Error loading AI models: {e}")
-        return {}
-
-# Initialize AI models
-AI_MODELS = load_ai_models()
-
 @login_required
 def dashboard(request):
     """Main dashboard view for patient data entry."""
@@ -44,24 +41,24 @@ def dashboard(request):
             patient_record = form.save(commit=False)
             patient_record.created_by = request.user
             
-            # Perform AI diagnosis with enhanced analysis
-            diagnosis_result = perform_ai_diagnosis(patient_record)
-            patient_record.ai_diagnosis = diagnosis_result['diagnosis']
-            patient_record.confidence_score = diagnosis_result['confidence']
-            patient_record.recommended_tests = diagnosis_result['recommended_tests']
-            patient_record.treatment_plan = diagnosis_result['treatment_plan']
+            if AIConfig.ANALYSIS_QUEUE_ENABLED and has_uploaded_reports(patient_record):
+                # Save the symptom diagnosis now; a worker merges in the report findings
+                diagnosis_result, ai_analysis_results = _symptom_diagnosis(patient_record)
+                apply_diagnosis(patient_record, finish_diagnosis(dict(diagnosis_result), list(ai_analysis_results)))
+                patient_record.analysis_status = 'pending'
+                with transaction.atomic():
+                    patient_record.save()
+                    enqueue_analysis(patient_record, diagnosis_result, ai_analysis_results)
+                messages.success(request, 'Patient record created successfully! Uploaded reports are being analyzed.')
+                return redirect('core:prescription', record_id=patient_record.id)
             
-            # Format and save medications
-            medications_text = ""
-            for med in diagnosis_result['medications']:
-                medications_text += f"• {med['name']} - {med['dosage']}\n"
-                medications_text += f"  Frequency: {med['frequency']}\n"
-                medications_text += f"  Duration: {med['duration']}\n\n"
-            patient_record.prescribed_medications = medications_text.strip()
+            if has_uploaded_reports(patient_record):
+                # Uploads reach storage on save, and the analyzers read them from there
+                patient_record.save()
             
-            # Add AI analysis results if files are uploaded
-            if diagnosis_result.get('ai_analysis'):
-                patient_record.ai_diagnosis += f"\n\nAI Analysis:\n{diagnosis_result['ai_analysis']}"
+            # Perform AI diagnosis with enhanced analysis
+            diagnosis_result = perform_ai_diagnosis(patient_record)
+            apply_diagnosis(patient_record, diagnosis_result)
             
             patient_record.save()
             messages.success(request, 'Patient record created successfully!')
@@ -90,6 +87,22 @@ def prescription(request, record_id):
     }
     return render(request, 'core/prescription.html', context)
 
+@login_required
+@never_cache
+def analysis_status(request, record_id):
+    """Report the background analysis state of a record, polled by the prescription page."""
+    record = PatientRecord.objects.filter(id=record_id, created_by=request.user).values('analysis_status').first()
+    if record is None:
+        raise Http404('Patient record not found')
+    status = record['analysis_status']
+    return JsonResponse({'status': status, 'finished': status not in ('pending', 'running')})
+
+@staff_member_required
+@never_cache
+def provider_metrics(request):
+    """Report this process's AI provider clients: call counters, circuit breakers and connection pools."""
+    return JsonResponse({'pid': os.getpid(), 'providers': client_metrics()})
+
 @login_required
 def history(request):
     """Display patient history with search and filtering."""
@@ -159,10 +172,22 @@ def delete_record(request, record_id):
     }
     return render(request, 'core/delete_confirm.html', context)
 
-def perform_ai_diagnosis(patient_record):
-    """Perform AI-based diagnosis using symptoms, vital signs, and uploaded files with free APIs."""
+# Diagnosis finding and confidence boost for each abnormal vital sign outcome
+VITAL_FINDINGS = {
+    ('temperature', 'high'): ("Fever detected - may indicate infection", 0.05),
+    ('temperature', 'low'): ("Low temperature - may indicate hypothermia or shock", 0.05),
+    ('blood_pressure', 'high'): ("Hypertension detected - cardiovascular risk factor", 0.05),
+    ('blood_pressure', 'low'): ("Hypotension detected - may indicate shock or dehydration", 0.05),
+    ('pulse_rate', 'high'): ("Tachycardia detected - may indicate stress, fever, or cardiac issue", 0.05),
+    ('pulse_rate', 'low'): ("Bradycardia detected - may indicate cardiac conduction issue", 0.05),
+    ('oxygen_saturation', 'low'): ("Low oxygen saturation - may indicate respiratory or cardiac issue", 0.10),
+    ('respiratory_rate', 'high'): ("Tachypnea detected - may indicate respiratory distress", 0.05),
+    ('respiratory_rate', 'low'): ("Bradypnea detected - may indicate respiratory depression", 0.05),
+}
+
+def _diagnose_symptoms_and_vitals(patient_record, symptoms):
+    """Diagnose from symptoms and vital signs; returns the diagnosis and its analysis lines."""
     
-    symptoms = patient_record.symptoms.lower()
     diagnosis_result = {
         'diagnosis': '',
         'confidence': 0.0,
@@ -173,13 +198,8 @@ def perform_ai_diagnosis(patient_record):
     }
     
     # Get vital signs for free API analysis
-    vitals = {}
-    if patient_record.temperature:
-        vitals['temperature'] = patient_record.temperature
-    if patient_record.systolic_bp and patient_record.diastolic_bp:
-        vitals['blood_pressure'] = f"{patient_record.systolic_bp}/{patient_record.diastolic_bp}"
-    if patient_record.pulse_rate:
-        vitals['pulse'] = patient_record.pulse_rate
+    record = record_vitals(patient_record)
+    vitals = free_vitals(record)
     
     # Use free diagnosis API
     try:
@@ -214,143 +234,25 @@ def perform_ai_diagnosis(patient_record):
         # Fall back to original diagnosis logic
     
     # Enhanced symptom-based diagnosis with medication recommendations
-    if any(word in symptoms for word in ['chest pain', 'shortness of breath', 'heart', 'angina']):
-        diagnosis_result['diagnosis'] = 'Possible cardiovascular issue (Angina/Coronary Artery Disease)'
-        diagnosis_result['confidence'] = 0.75
-        diagnosis_result['recommended_tests'] = 'ECG, Blood pressure monitoring, Cardiac enzymes, Stress test'
-        diagnosis_result['treatment_plan'] = 'Consult cardiologist, Monitor vital signs, Avoid strenuous activity, Low-sodium diet'
-        diagnosis_result['medications'] = [
-            {'name': 'Nitroglycerin', 'dosage': '0.4mg sublingual', 'frequency': 'As needed for chest pain', 'duration': 'Until symptoms resolve'},
-            {'name': 'Aspirin', 'dosage': '81mg', 'frequency': 'Once daily', 'duration': 'Long-term'},
-            {'name': 'Metoprolol', 'dosage': '25-50mg', 'frequency': 'Twice daily', 'duration': 'As prescribed by cardiologist'},
-            {'name': 'Atorvastatin', 'dosage': '10-20mg', 'frequency': 'Once daily', 'duration': 'Long-term'}
-        ]
-    
-    elif any(word in symptoms for word in ['fever', 'cough', 'cold', 'sore throat', 'runny nose']):
-        diagnosis_result['diagnosis'] = 'Upper respiratory infection (Common Cold/Flu)'
-        diagnosis_result['confidence'] = 0.85
-        diagnosis_result['recommended_tests'] = 'Chest X-ray, Blood count, Sputum culture, COVID-19 test'
-        diagnosis_result['treatment_plan'] = 'Rest, Hydration, Over-the-counter medications, Steam inhalation'
-        diagnosis_result['medications'] = [
-            {'name': 'Acetaminophen', 'dosage': '500-1000mg', 'frequency': 'Every 4-6 hours', 'duration': '3-5 days'},
-            {'name': 'Ibuprofen', 'dosage': '400-600mg', 'frequency': 'Every 6-8 hours', 'duration': '3-5 days'},
-            {'name': 'Guaifenesin', 'dosage': '200-400mg', 'frequency': 'Every 4 hours', 'duration': 'Until cough improves'},
-            {'name': 'Pseudoephedrine', 'dosage': '30-60mg', 'frequency': 'Every 4-6 hours', 'duration': '3-5 days'},
-            {'name': 'Zinc supplements', 'dosage': '15-30mg', 'frequency': 'Once daily', 'duration': '5-7 days'}
-        ]
-    
-    elif any(word in symptoms for word in ['headache', 'migraine', 'dizziness', 'tension']):
-        diagnosis_result['diagnosis'] = 'Tension headache or migraine'
-        diagnosis_result['confidence'] = 0.70
-        diagnosis_result['recommended_tests'] = 'Neurological examination, Blood pressure, Eye examination, CT scan if severe'
-        diagnosis_result['treatment_plan'] = 'Pain management, Stress reduction, Regular sleep pattern, Avoid triggers'
-        diagnosis_result['medications'] = [
-            {'name': 'Ibuprofen', 'dosage': '400-800mg', 'frequency': 'Every 6-8 hours', 'duration': 'As needed'},
-            {'name': 'Acetaminophen', 'dosage': '500-1000mg', 'frequency': 'Every 4-6 hours', 'duration': 'As needed'},
-            {'name': 'Sumatriptan', 'dosage': '25-100mg', 'frequency': 'At onset of migraine', 'duration': 'As needed'},
-            {'name': 'Propranolol', 'dosage': '20-40mg', 'frequency': 'Twice daily', 'duration': 'As prescribed for prevention'}
-        ]
-    
-    elif any(word in symptoms for word in ['stomach', 'abdominal', 'nausea', 'vomiting', 'diarrhea', 'acid reflux']):
-        diagnosis_result['diagnosis'] = 'Gastrointestinal issue (Gastritis/GERD)'
-        diagnosis_result['confidence'] = 0.80
-        diagnosis_result['recommended_tests'] = 'Blood tests, Ultrasound, Endoscopy if needed, H. pylori test'
-        diagnosis_result['treatment_plan'] = 'Diet modification, Hydration, Consult gastroenterologist, Avoid spicy foods'
-        diagnosis_result['medications'] = [
-            {'name': 'Omeprazole', 'dosage': '20mg', 'frequency': 'Once daily', 'duration': '4-8 weeks'},
-            {'name': 'Ranitidine', 'dosage': '150mg', 'frequency': 'Twice daily', 'duration': '4-8 weeks'},
-            {'name': 'Metoclopramide', 'dosage': '10mg', 'frequency': 'Three times daily', 'duration': 'As needed for nausea'},
-            {'name': 'Loperamide', 'dosage': '2mg', 'frequency': 'After each loose stool', 'duration': 'Until diarrhea resolves'}
-        ]
-    
-    elif any(word in symptoms for word in ['joint pain', 'arthritis', 'swelling', 'stiffness']):
-        diagnosis_result['diagnosis'] = 'Osteoarthritis or inflammatory arthritis'
-        diagnosis_result['confidence'] = 0.75
-        diagnosis_result['recommended_tests'] = 'X-rays, Blood tests (ESR, CRP), Joint fluid analysis'
-        diagnosis_result['treatment_plan'] = 'Physical therapy, Weight management, Joint protection, Regular exercise'
-        diagnosis_result['medications'] = [
-            {'name': 'Ibuprofen', 'dosage': '400-800mg', 'frequency': 'Three times daily', 'duration': 'As needed'},
-            {'name': 'Naproxen', 'dosage': '250-500mg', 'frequency': 'Twice daily', 'duration': 'As needed'},
-            {'name': 'Acetaminophen', 'dosage': '500-1000mg', 'frequency': 'Every 4-6 hours', 'duration': 'As needed'},
-            {'name': 'Glucosamine', 'dosage': '1500mg', 'frequency': 'Once daily', 'duration': 'Long-term'}
-        ]
-    
-    elif any(word in symptoms for word in ['anxiety', 'depression', 'stress', 'insomnia', 'mood']):
-        diagnosis_result['diagnosis'] = 'Anxiety or depressive disorder'
-        diagnosis_result['confidence'] = 0.70
-        diagnosis_result['recommended_tests'] = 'Psychological evaluation, Blood tests (thyroid, B12), Depression screening'
-        diagnosis_result['treatment_plan'] = 'Counseling, Stress management, Regular exercise, Sleep hygiene'
-        diagnosis_result['medications'] = [
-            {'name': 'Sertraline', 'dosage': '25-50mg', 'frequency': 'Once daily', 'duration': 'As prescribed by psychiatrist'},
-            {'name': 'Alprazolam', 'dosage': '0.25-0.5mg', 'frequency': 'As needed for anxiety', 'duration': 'Short-term only'},
-            {'name': 'Melatonin', 'dosage': '3-5mg', 'frequency': 'Once daily at bedtime', 'duration': 'As needed for sleep'},
-            {'name': 'Lavender supplements', 'dosage': '80mg', 'frequency': 'Once daily', 'duration': '4-6 weeks'}
-        ]
+    knowledge_base = get_knowledge_base()
+    matched_rule = knowledge_base.rule_engine.evaluate(symptoms)
     
-    elif any(word in symptoms for word in ['diabetes', 'high blood sugar', 'frequent urination', 'thirst']):
-        diagnosis_result['diagnosis'] = 'Diabetes mellitus (Type 2)'
-        diagnosis_result['confidence'] = 0.80
-        diagnosis_result['recommended_tests'] = 'Fasting blood glucose, HbA1c, Lipid profile, Kidney function tests'
-        diagnosis_result['treatment_plan'] = 'Diet modification, Regular exercise, Blood sugar monitoring, Weight management'
-        diagnosis_result['medications'] = [
-            {'name': 'Metformin', 'dosage': '500-1000mg', 'frequency': 'Twice daily', 'duration': 'Long-term'},
-            {'name': 'Glimepiride', 'dosage': '1-4mg', 'frequency': 'Once daily', 'duration': 'As prescribed'},
-            {'name': 'Sitagliptin', 'dosage': '100mg', 'frequency': 'Once daily', 'duration': 'As prescribed'},
-            {'name': 'Insulin (if needed)', 'dosage': 'As prescribed', 'frequency': 'As prescribed', 'duration': 'As prescribed'}
-        ]
-    
-    else:
-        diagnosis_result['diagnosis'] = 'General consultation required'
-        diagnosis_result['confidence'] = 0.50
-        diagnosis_result['recommended_tests'] = 'Complete blood count, Basic metabolic panel, Physical examination'
-        diagnosis_result['treatment_plan'] = 'Follow up with primary care physician, Maintain healthy lifestyle'
-        diagnosis_result['medications'] = [
-            {'name': 'Multivitamin', 'dosage': 'As directed', 'frequency': 'Once daily', 'duration': 'Long-term'},
-            {'name': 'Vitamin D', 'dosage': '1000-2000 IU', 'frequency': 'Once daily', 'duration': 'Long-term'}
-        ]
+    diagnosis_result['diagnosis'] = matched_rule['diagnosis']
+    diagnosis_result['confidence'] = matched_rule['confidence']
+    diagnosis_result['recommended_tests'] = matched_rule['recommended_tests']
+    diagnosis_result['treatment_plan'] = matched_rule['treatment_plan']
+    diagnosis_result['medications'] = [dict(med) for med in matched_rule['medications']]
     
     # Enhanced AI analysis considering vital signs
     vital_signs_analysis = []
     
     # Analyze vital signs and adjust diagnosis
-    if patient_record.temperature:
-        if patient_record.temperature > 37.5:
-            vital_signs_analysis.append("Fever detected - may indicate infection")
-            diagnosis_result['confidence'] += 0.05
-        elif patient_record.temperature < 36.0:
-            vital_signs_analysis.append("Low temperature - may indicate hypothermia or shock")
-            diagnosis_result['confidence'] += 0.05
-    
-    if patient_record.systolic_bp and patient_record.diastolic_bp:
-        if patient_record.systolic_bp > 140 or patient_record.diastolic_bp > 90:
-            vital_signs_analysis.append("Hypertension detected - cardiovascular risk factor")
-            diagnosis_result['confidence'] += 0.05
-        elif patient_record.systolic_bp < 90 or patient_record.diastolic_bp < 60:
-            vital_signs_analysis.append("Hypotension detected - may indicate shock or dehydration")
-            diagnosis_result['confidence'] += 0.05
-    
-    if patient_record.pulse_rate:
-        if patient_record.pulse_rate > 100:
-            vital_signs_analysis.append("Tachycardia detected - may indicate stress, fever, or cardiac issue")
-            diagnosis_result['confidence'] += 0.05
-        elif patient_record.pulse_rate < 60:
-            vital_signs_analysis.append("Bradycardia detected - may indicate cardiac conduction issue")
-            diagnosis_result['confidence'] += 0.05
-    
-    if patient_record.oxygen_saturation:
-        if patient_record.oxygen_saturation < 95:
-            vital_signs_analysis.append("Low oxygen saturation - may indicate respiratory or cardiac issue")
-            diagnosis_result['confidence'] += 0.10
-    
-    if patient_record.respiratory_rate:
-        if patient_record.respiratory_rate > 20:
-            vital_signs_analysis.append("Tachypnea detected - may indicate respiratory distress")
-            diagnosis_result['confidence'] += 0.05
-        elif patient_record.respiratory_rate < 12:
-            vital_signs_analysis.append("Bradypnea detected - may indicate respiratory depression")
-            diagnosis_result['confidence'] += 0.05
+    for vital, outcome in classify_vitals(record).items():
+        finding = VITAL_FINDINGS.get((vital, outcome))
+        if finding:
+            vital_signs_analysis.append(finding[0])
+            diagnosis_result['confidence'] += finding[1]
     
-    # Enhanced AI analysis of uploaded files
     ai_analysis_results = []
     
     # Add vital signs analysis to AI results
@@ -358,70 +260,61 @@ def perform_ai_diagnosis(patient_record):
         ai_analysis_results.append("Vital Signs Analysis:")
         ai_analysis_results.extend([f"• {finding}" for finding in vital_signs_analysis])
     
-    # Analyze ECG report if uploaded
-    if patient_record.ecg_report:
-        try:
-            ecg_analysis = ai_analyzer.analyze_ecg_image(patient_record.ecg_report.path)
-            if ecg_analysis:
-                ai_analysis_results.append(f"ECG Analysis: Heart Rate - {ecg_analysis.get('heart_rate', 'Unknown')}, "
-                                        f"Rhythm - {ecg_analysis.get('rhythm', 'Unknown')}")
-                if ecg_analysis.get('abnormalities'):
-                    ai_analysis_results.append(f"ECG Abnormalities: {', '.join(ecg_analysis['abnormalities'])}")
-                diagnosis_result['confidence'] += 0.10
-        except Exception as e:
-            ai_analysis_results.append("ECG analysis failed")
-    
-    # Analyze X-ray report if uploaded
-    if patient_record.xray_report:
-        try:
-            xray_analysis = ai_analyzer.analyze_xray_image(patient_record.xray_report.path)
-            if xray_analysis:
-                ai_analysis_results.append(f"X-ray Analysis: {', '.join(xray_analysis.get('findings', []))}")
-                if xray_analysis.get('abnormalities'):
-                    ai_analysis_results.append(f"X-ray Abnormalities: {', '.join(xray_analysis['abnormalities'])}")
-                diagnosis_result['confidence'] += 0.05
-        except Exception as e:
-            ai_analysis_results.append("X-ray analysis failed")
-    
-    # Analyze lab report if uploaded
-    if patient_record.lab_report:
-        try:
-            report_analysis = ai_analyzer.analyze_medical_report(patient_record.lab_report.path)
-            if report_analysis:
-                if report_analysis.get('key_findings'):
-                    ai_analysis_results.append(f"Lab Report Findings: {', '.join(report_analysis['key_findings'])}")
-                if report_analysis.get('abnormal_values'):
-                    ai_analysis_results.append(f"Lab Abnormalities: {', '.join(report_analysis['abnormal_values'])}")
-                diagnosis_result['confidence'] += 0.05
-        except Exception as e:
-            ai_analysis_results.append("Lab report analysis failed")
-    
-    # Combine AI analysis results
-    if ai_analysis_results:
-        diagnosis_result['ai_analysis'] = '\n'.join(ai_analysis_results)
+    return diagnosis_result, ai_analysis_results
+
+def _symptom_diagnosis(patient_record):
+    """Memoized symptom and vital signs diagnosis: a fresh (diagnosis_result, analysis lines) pair."""
+    symptoms = patient_record.symptoms.lower()
+    cache_key = diagnosis_cache_key(get_knowledge_base(), symptoms, patient_record)
+    return diagnosis_cache.get_or_compute(
+        cache_key, lambda: _diagnose_symptoms_and_vitals(patient_record, symptoms)
+    )
+
+def perform_ai_diagnosis(patient_record):
+    """Perform AI-based diagnosis using symptoms, vital signs, and uploaded files with free APIs."""
     
-    # Ensure confidence doesn't exceed 1.0
-    diagnosis_result['confidence'] = min(diagnosis_result['confidence'], 1.0)
+    # Symptom and vital signs diagnosis is memoized; uploaded files are analyzed every time
+    diagnosis_result, ai_analysis_results = _symptom_diagnosis(patient_record)
+    analyze_uploaded_reports(patient_record, diagnosis_result, ai_analysis_results, ai_analyzer)
+    return finish_diagnosis(diagnosis_result, ai_analysis_results)
+
+def _health_advice_inputs(params):
+    """Read symptoms, age and gender from the health advice form."""
+    symptoms = params.get('symptoms', '')
+    age = params.get('age')
+    gender = params.get('gender', '')
     
-    return diagnosis_result
+    try:
+        age = int(age) if age else None
+    except:
+        age = None
+    return symptoms, age, gender
+
+def _health_advice_etag(request):
+    """ETag of a health advice GET: the advice key plus everything else the page shows."""
+    # Pending messages are rendered (and consumed) by the page, so it can't be revalidated
+    if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+        return None
+    symptoms, age, gender = _health_advice_inputs(request.GET)
+    page = (
+        ADVICE_VERSION, advice_key(symptoms, age, gender), bool(request.GET), symptoms, age, gender,
+        request.user.pk, request.user.get_username(), request.user.first_name,
+    )
+    return hashlib.sha256(repr(page).encode('utf-8')).hexdigest()
 
 @login_required
+@condition(etag_func=_health_advice_etag)
 def health_advice(request):
     """Get free health advice based on symptoms and demographics."""
     advice = {}
     
-    if request.method == 'POST':
-        symptoms = request.POST.get('symptoms', '')
-        age = request.POST.get('age')
-        gender = request.POST.get('gender', '')
-        
-        try:
-            age = int(age) if age else None
-        except:
-            age = None
+    # GET with query parameters is the cacheable form; POST is still accepted
+    params = request.POST if request.method == 'POST' else request.GET
+    if request.method == 'POST' or request.GET:
+        symptoms, age, gender = _health_advice_inputs(params)
         
         # Get free health advice
-        advice = ai_analyzer.get_free_health_advice(symptoms, age, gender)
+        advice = get_health_advice(symptoms, age, gender)
         
         context = {
             'advice': advice,
@@ -429,6 +322,12 @@ def health_advice(request):
             'age': age,
             'gender': gender,
         }
-        return render(request, 'core/health_advice.html', context)
+        response = render(request, 'core/health_advice.html', context)
+    else:
+        response = render(request, 'core/health_advice.html', {'advice': advice})
     
-    return render(request, 'core/health_advice.html', {'advice': advice})
+    if request.method == 'GET':
+        # Per-user page: private to the browser, revalidated with the ETag once stale
+        patch_cache_control(response, private=True, max_age=AIConfig.HEALTH_ADVICE_CACHE_SECONDS)
+        patch_vary_headers(response, ('Cookie',))
+    return response
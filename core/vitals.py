@@ -0,0 +1,131 @@
+# Vital sign reference ranges and classification, for single records or whole columns
+
+import numpy as np
+
+# Reference range per vital sign in the unit PatientRecord stores it in.
+# Values below the lower bound are low, values above the upper bound are high.
+VITAL_RANGES = {
+    'temperature': (36.0, 37.5, '°C'),
+    'systolic_bp': (90, 140, 'mmHg'),
+    'diastolic_bp': (60, 90, 'mmHg'),
+    'pulse_rate': (60, 100, 'bpm'),
+    'oxygen_saturation': (95, None, '%'),
+    'respiratory_rate': (12, 20, 'breaths/min'),
+}
+
+# Vital signs reported by classify_vitals, in report order. Blood pressure
+# combines systolic and diastolic and is only classified when both are known.
+REPORTED_VITALS = ('temperature', 'blood_pressure', 'pulse_rate', 'oxygen_saturation', 'respiratory_rate')
+
+# Outcome codes of the array API; OUTCOMES[code] is the scalar API's outcome
+UNRECORDED, LOW, NORMAL, HIGH = 0, 1, 2, 3
+OUTCOMES = (None, 'low', 'normal', 'high')
+
+TEMPERATURE_UNITS = ('C', 'F')
+
+
+def to_celsius(temperature, unit='C'):
+    """Convert a temperature, or an array of them, to °C."""
+    if unit == 'C':
+        return temperature
+    if unit == 'F':
+        # Rounded so that e.g. 99.5°F lands exactly on 37.5°C
+        return np.round((temperature - 32) * 5 / 9, 2)
+    raise ValueError(f"Unknown temperature unit {unit!r}, expected one of {', '.join(TEMPERATURE_UNITS)}")
+
+
+def classify_vital(vital, value):
+    """Return 'low', 'normal' or 'high' for a vital sign value, or None when it is missing."""
+    if value is None:
+        return None
+    value = float(value)
+    if value != value:
+        return None
+    low, high, _ = VITAL_RANGES[vital]
+    if low is not None and value < low:
+        return 'low'
+    if high is not None and value > high:
+        return 'high'
+    return 'normal'
+
+
+def classify_blood_pressure(systolic, diastolic):
+    """Classify a blood pressure reading; high takes precedence when one side is high and the other low."""
+    systolic = classify_vital('systolic_bp', systolic)
+    diastolic = classify_vital('diastolic_bp', diastolic)
+    if systolic is None or diastolic is None:
+        return None
+    if 'high' in (systolic, diastolic):
+        return 'high'
+    if 'low' in (systolic, diastolic):
+        return 'low'
+    return 'normal'
+
+
+def classify_vitals(values, temperature_unit='C'):
+    """Classify a mapping of vital sign values, returning the outcome of each recorded vital in report order."""
+    outcomes = {}
+    for vital in REPORTED_VITALS:
+        if vital == 'blood_pressure':
+            outcome = classify_blood_pressure(values.get('systolic_bp'), values.get('diastolic_bp'))
+        elif vital == 'temperature' and values.get('temperature') is not None:
+            outcome = classify_vital(vital, to_celsius(float(values['temperature']), temperature_unit))
+        else:
+            outcome = classify_vital(vital, values.get(vital))
+        if outcome is not None:
+            outcomes[vital] = outcome
+    return outcomes
+
+
+def record_vitals(patient_record):
+    """Return the vital signs of a record; unset and zero values count as unrecorded."""
+    return {vital: getattr(patient_record, vital, None) or None for vital in VITAL_RANGES}
+
+
+def classify_array(vital, values):
+    """Return outcome codes for an array of values of one vital sign; NaN is unrecorded."""
+    values = np.asarray(values, dtype=np.float64)
+    low, high, _ = VITAL_RANGES[vital]
+    codes = np.full(values.shape, NORMAL, dtype=np.int8)
+    if low is not None:
+        codes[values < low] = LOW
+    if high is not None:
+        codes[values > high] = HIGH
+    codes[np.isnan(values)] = UNRECORDED
+    return codes
+
+
+def classify_blood_pressure_array(systolic, diastolic):
+    """Array version of classify_blood_pressure."""
+    systolic = classify_array('systolic_bp', systolic)
+    diastolic = classify_array('diastolic_bp', diastolic)
+    codes = np.select(
+        [
+            (systolic == UNRECORDED) | (diastolic == UNRECORDED),
+            (systolic == HIGH) | (diastolic == HIGH),
+            (systolic == LOW) | (diastolic == LOW),
+        ],
+        [UNRECORDED, HIGH, LOW],
+        NORMAL,
+    )
+    return codes.astype(np.int8)
+
+
+def classify_columns(columns, temperature_unit='C'):
+    """Classify whole columns of vital signs at once.
+
+    ``columns`` maps vital sign names to equal-length sequences, with None or
+    NaN for missing values. Returns outcome code arrays for the reported
+    vitals that have columns, in report order.
+    """
+    codes = {}
+    for vital in REPORTED_VITALS:
+        if vital == 'blood_pressure':
+            if 'systolic_bp' in columns and 'diastolic_bp' in columns:
+                codes[vital] = classify_blood_pressure_array(columns['systolic_bp'], columns['diastolic_bp'])
+        elif vital in columns:
+            values = np.asarray(columns[vital], dtype=np.float64)
+            if vital == 'temperature':
+                values = to_celsius(values, temperature_unit)
+            codes[vital] = classify_array(vital, values)
+    return codes
@@ -0,0 +1,81 @@
+# Tiled X-ray image statistics with bounded working memory
+
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .config import AIConfig
+
+# Canny thresholds of the X-ray structure check
+EDGE_LOW, EDGE_HIGH = 30, 100
+
+# Rows of context above and below a tile, so the Sobel and non-maximum
+# suppression neighbourhoods at its border see the real image
+TILE_HALO = 8
+
+
+def tile_moments(tile):
+    """Return (count, mean, sum of squared deviations) of a tile's pixels.
+
+    Computed the way np.mean and np.std do, so a single tile gives exactly
+    their results.
+    """
+    mean = np.mean(tile)
+    deviations = tile - mean
+    return tile.size, float(mean), float(np.sum(deviations * deviations))
+
+
+def merge_moments(a, b):
+    """Combine the moments of two disjoint pixel sets (Chan et al.'s parallel Welford update)."""
+    count_a, mean_a, m2_a = a
+    count_b, mean_b, m2_b = b
+    if not count_a:
+        return b
+    if not count_b:
+        return a
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    return count, mean_a + delta * count_b / count, m2_a + m2_b + delta * delta * count_a * count_b / count
+
+
+def _tile_statistics(gray, start, stop):
+    """Moments and edge pixel count of rows ``start:stop``."""
+    top, bottom = max(0, start - TILE_HALO), min(gray.shape[0], stop + TILE_HALO)
+    edges = cv2.Canny(np.ascontiguousarray(gray[top:bottom]), EDGE_LOW, EDGE_HIGH)
+    edge_count = cv2.countNonZero(edges[start - top:stop - top])
+    return tile_moments(gray[start:stop]), edge_count
+
+
+def xray_statistics(gray, tile_pixels=None, workers=None):
+    """Return the mean and standard deviation of the intensities and the Canny edge density.
+
+    Images of up to ``tile_pixels`` pixels (XRAY_TILE_PIXELS by default)
+    are one tile and give exactly the full-image np.mean, np.std and
+    Canny results. Larger images are processed in bands of rows, on up to
+    ``workers`` threads (XRAY_TILE_WORKERS), with their moments merged in
+    band order. Edge hysteresis does not cross band borders, so the edge
+    density of a tiled image can differ slightly from the full-image value.
+    """
+    tile_pixels = AIConfig.XRAY_TILE_PIXELS if tile_pixels is None else tile_pixels
+    workers = AIConfig.XRAY_TILE_WORKERS if workers is None else workers
+    height, width = gray.shape
+    rows = max(1, tile_pixels // max(width, 1))
+    bands = [(start, min(start + rows, height)) for start in range(0, height, rows)]
+
+    if len(bands) > 1 and workers > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(bands))) as executor:
+            results = list(executor.map(lambda band: _tile_statistics(gray, *band), bands))
+    else:
+        results = [_tile_statistics(gray, *band) for band in bands]
+
+    moments, edge_count = (0, 0.0, 0.0), 0
+    for tile, tile_edges in results:
+        moments = merge_moments(moments, tile)
+        edge_count += tile_edges
+    count, mean, m2 = moments
+    return {
+        'mean': mean,
+        'std': float(np.sqrt(m2 / count)) if count else 0.0,
+        'edge_density': edge_count / count if count else 0.0,
+    }
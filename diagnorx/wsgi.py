@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'diagnorx.settings')
 
 application = get_wsgi_application()
+
+# Load the models named in MODEL_WARM_UP when the server loads the application, not on
+# the first request. TensorFlow is not fork-safe: with gunicorn --preload, warm up joblib models only.
+from core.model_registry import warm_up_configured_models  # noqa: E402
+
+warm_up_configured_models()